@@ -0,0 +1,104 @@
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .interactions import INTERACTIONS, UserInteractions
+from .metrics import get_timer, track_queries
+
+READ_METHODS = ('GET', 'HEAD')
+# Маршруты чтения, которые при ASYNC_READ_VIEWS обслуживаются
+# асинхронно, и флаги пользователя, которые им понадобятся.
+ASYNC_READ_ROUTES = {
+    'recipes-list': tuple(INTERACTIONS),
+    'recipes-detail': tuple(INTERACTIONS),
+    'tags-list': (),
+    'tags-detail': (),
+    'ingredients-list': (),
+    'ingredients-detail': (),
+    'users-subscriptions': ('following',),
+}
+
+
+def in_thread(request, function, *args, **kwargs):
+    """Вызов в пуле потоков со своим соединением с базой.
+
+    В Django 3.2 нет асинхронного ORM, а синхронные представления под
+    ASGI выполняются по очереди в одном потоке. Здесь каждый вызов
+    получает свой поток, так что ожидания базы идут параллельно.
+    Замеры MetricsMiddleware подключаются к соединениям этого потока.
+    """
+    timer = get_timer(request)
+
+    def call():
+        try:
+            with track_queries(timer):
+                return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)()
+
+
+def authenticate(request):
+    request = Request(request, authenticators=[
+        authentication() for authentication
+        in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    try:
+        return request.user
+    except APIException:
+        # Ошибку вернёт само представление.
+        return None
+
+
+def render(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    if callable(getattr(response, 'render', None)):
+        response.render()
+    return response
+
+
+def async_read(view, interactions=()):
+    """Асинхронная обёртка над синхронным представлением DRF.
+
+    GET выполняется в пуле потоков, и параллельно с ним загружаются
+    флаги пользователя (избранное, корзина, подписки), которые затем
+    берёт сериализатор. Остальные методы выполняются как обычно.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in READ_METHODS:
+            return await sync_to_async(view)(request, *args, **kwargs)
+        lookups = [
+            in_thread(request, render, view, request, *args, **kwargs)
+        ]
+        if interactions:
+            user = await in_thread(request, authenticate, request)
+            if user is not None and user.is_authenticated:
+                request._interactions = UserInteractions(user)
+                lookups.extend(
+                    in_thread(request, request._interactions.ids, kind)
+                    for kind in interactions
+                )
+        response, *_ = await asyncio.gather(*lookups)
+        return response
+    return wrapper
+
+
+def async_read_urls(urls):
+    return [
+        URLPattern(
+            url.pattern,
+            async_read(url.callback, ASYNC_READ_ROUTES[url.name]),
+            url.default_args,
+            url.name
+        )
+        if isinstance(url, URLPattern) and url.name in ASYNC_READ_ROUTES
+        else url
+        for url in urls
+    ]
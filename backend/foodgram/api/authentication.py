@@ -0,0 +1,92 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+KEY_PREFIX = 'auth-token'
+
+
+def shared_key(key):
+    # Сам токен в общий кеш не попадает.
+    return f'{KEY_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+class TokenCache:
+    """Пользователи по токенам: LRU в памяти процесса и общий кеш.
+
+    Локальная запись живёт TOKEN_CACHE_LOCAL_TTL секунд, запись
+    в общем кеше (при TOKEN_CACHE_SHARED_TTL > 0) — дольше. Сигналы
+    сбрасывают обе при выходе, смене пароля и деактивации; другие
+    процессы узнают об этом не позже чем через локальный TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self.stats = {'hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] > time.monotonic():
+                self._items.move_to_end(key)
+                self.stats['hits'] += 1
+                return copy.copy(item[1])
+        user = None
+        if settings.TOKEN_CACHE_SHARED_TTL:
+            user = cache.get(shared_key(key))
+        if user is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['shared_hits'] += 1
+        self._remember(key, user)
+        return copy.copy(user)
+
+    def set(self, key, user):
+        if settings.TOKEN_CACHE_SHARED_TTL:
+            cache.set(shared_key(key), user, settings.TOKEN_CACHE_SHARED_TTL)
+        self._remember(key, user)
+
+    def _remember(self, key, user):
+        if not settings.TOKEN_CACHE_SIZE:
+            return
+        with self._lock:
+            self._items[key] = (
+                time.monotonic() + settings.TOKEN_CACHE_LOCAL_TTL, user
+            )
+            self._items.move_to_end(key)
+            while len(self._items) > settings.TOKEN_CACHE_SIZE:
+                self._items.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._items.pop(key, None)
+        cache.delete_many([shared_key(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе на каждый запрос.
+
+    Представления получают копию пользователя из кеша; счётчики в ней
+    могут устареть, но FoodgramUser.save() их не перезаписывает.
+    """
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, _ = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+        return user, self.get_model()(key=key, user=user)
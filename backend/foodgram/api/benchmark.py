@@ -0,0 +1,277 @@
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment
+)
+from rest_framework.test import APIClient
+
+from recipes.feed import rebuild_feeds
+from recipes.ingredient_loader import load_ingredients_file
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredientAmount,
+    ShoppingCart,
+    Tag
+)
+from recipes.services import (
+    rebuild_shopping_lists,
+    refresh_recipe_counters,
+    refresh_recipes_count
+)
+from recipes.utils import batches
+from users.models import Follow
+from users.services import refresh_followers_count
+
+FoodgramUser = get_user_model()
+
+BATCH_SIZE = 1000
+DEFAULT_PAGE_SIZES = (1, 6, 24)
+INGREDIENTS_CSV = os.path.join(settings.BASE_DIR, 'ingredients.csv')
+FIXTURE_JSON = os.path.join(settings.BASE_DIR, 'data.json')
+
+# (name, method, url, paginated). Шаблоны заполняются значениями
+# из seed_context: recipe, author и т. д.
+ENDPOINTS = (
+    ('users-list', 'get', '/api/users/', True),
+    ('users-detail', 'get', '/api/users/{author}/', False),
+    ('users-me', 'get', '/api/users/me/', False),
+    ('users-subscriptions', 'get',
+     '/api/users/subscriptions/?recipes_limit=3', True),
+    ('users-subscribe', 'post', '/api/users/{stranger}/subscribe/', False),
+    ('users-unsubscribe', 'delete',
+     '/api/users/{stranger}/subscribe/', False),
+    ('tags-list', 'get', '/api/tags/', False),
+    ('tags-detail', 'get', '/api/tags/{tag}/', False),
+    ('ingredients-list', 'get', '/api/ingredients/?name=а', False),
+    ('ingredients-detail', 'get', '/api/ingredients/{ingredient}/', False),
+    ('recipes-list', 'get', '/api/recipes/', True),
+    ('recipes-list-favorited', 'get',
+     '/api/recipes/?is_favorited=1', True),
+    ('recipes-list-in-cart', 'get',
+     '/api/recipes/?is_in_shopping_cart=1', True),
+    ('recipes-feed', 'get', '/api/recipes/feed/', True),
+    ('recipes-detail', 'get', '/api/recipes/{recipe}/', False),
+    ('recipes-favorite', 'post', '/api/recipes/{recipe}/favorite/', False),
+    ('recipes-unfavorite', 'delete',
+     '/api/recipes/{recipe}/favorite/', False),
+    ('recipes-cart', 'post', '/api/recipes/{recipe}/shopping_cart/', False),
+    ('recipes-uncart', 'delete',
+     '/api/recipes/{recipe}/shopping_cart/', False),
+    ('recipes-download-cart', 'get',
+     '/api/recipes/download_shopping_cart/', False),
+)
+
+
+@contextmanager
+def temporary_database(keepdb=False):
+    """Создаёт тестовую базу рядом с рабочей и удаляет её после замеров."""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+        teardown_test_environment()
+
+
+def _bulk_create(model, objects):
+    for batch in batches(objects, BATCH_SIZE):
+        model.objects.bulk_create(batch)
+
+
+def load_ingredients():
+    if Ingredient.objects.exists():
+        return list(Ingredient.objects.values_list('id', flat=True))
+    load_ingredients_file(INGREDIENTS_CSV)
+    return list(Ingredient.objects.values_list('id', flat=True))
+
+
+def load_fixture_recipes():
+    with open(FIXTURE_JSON, encoding='utf8') as file:
+        fixture = json.load(file)
+    tags = [
+        item['fields'] for item in fixture if item['model'] == 'recipes.tag'
+    ]
+    recipes = [
+        item['fields'] for item in fixture
+        if item['model'] == 'recipes.recipe'
+    ]
+    return tags, recipes
+
+
+def seed_dataset(users=2000, recipes=5000, ingredients_per_recipe=8,
+                 follows_per_user=10, favorites_per_user=20,
+                 cart_per_user=5, seed=0):
+    """Наполняет базу синтетическими данными для бенчмарков.
+
+    Ингредиенты берутся из ingredients.csv, теги и тексты рецептов —
+    из фикстуры data.json. Возвращает первого пользователя, от имени
+    которого выполняются замеры.
+    """
+    rnd = random.Random(seed)
+    ingredient_ids = load_ingredients()
+    fixture_tags, fixture_recipes = load_fixture_recipes()
+    for tag in fixture_tags:
+        Tag.objects.get_or_create(slug=tag['slug'], defaults=tag)
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+
+    password = make_password(None)
+    offset = FoodgramUser.objects.count()
+    _bulk_create(FoodgramUser, [
+        FoodgramUser(
+            email=f'bench{offset + number}@example.com',
+            username=f'bench{offset + number}',
+            first_name='Бенч',
+            last_name=str(offset + number),
+            password=password,
+        ) for number in range(users)
+    ])
+    user_ids = list(FoodgramUser.objects.filter(
+        username__startswith='bench'
+    ).values_list('id', flat=True))
+
+    _bulk_create(Recipe, [
+        Recipe(
+            author_id=rnd.choice(user_ids),
+            name=f'{template["name"]} #{number}',
+            image=template['image'],
+            text=template['text'],
+            cooking_time=template['cooking_time'],
+        ) for number, template in enumerate(
+            rnd.choice(fixture_recipes) for _ in range(recipes)
+        )
+    ])
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    refresh_recipes_count()
+
+    recipe_tag = Recipe.tags.through
+    _bulk_create(recipe_tag, [
+        recipe_tag(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in rnd.sample(tag_ids, rnd.randint(1, len(tag_ids)))
+    ])
+    _bulk_create(RecipeIngredientAmount, [
+        RecipeIngredientAmount(
+            recipe_id_id=recipe_id,
+            ingredient_id_id=ingredient_id,
+            amount=rnd.randint(1, 500),
+        )
+        for recipe_id in recipe_ids
+        for ingredient_id in rnd.sample(
+            ingredient_ids, ingredients_per_recipe
+        )
+    ])
+
+    follows, favorites, carts = [], [], []
+    for user_id in user_ids:
+        follows.extend(
+            Follow(user_id=user_id, following_id=following_id)
+            for following_id in rnd.sample(user_ids, follows_per_user + 1)
+            if following_id != user_id
+        )
+        favorites.extend(
+            Favorite(user_id_id=user_id, recipe_id_id=recipe_id)
+            for recipe_id in rnd.sample(recipe_ids, favorites_per_user)
+        )
+        carts.extend(
+            ShoppingCart(user_id_id=user_id, recipe_id_id=recipe_id)
+            for recipe_id in rnd.sample(recipe_ids, cart_per_user)
+        )
+    _bulk_create(Follow, follows)
+    _bulk_create(Favorite, favorites)
+    _bulk_create(ShoppingCart, carts)
+    refresh_followers_count()
+    refresh_recipe_counters()
+    rebuild_shopping_lists()
+    rebuild_feeds()
+    return FoodgramUser.objects.get(id=user_ids[0])
+
+
+def seed_context(user):
+    followed = Follow.objects.filter(user=user).values('following')
+    stranger = FoodgramUser.objects.exclude(
+        id__in=followed
+    ).exclude(id=user.id).first()
+    recipe = Recipe.objects.exclude(
+        favorited__user_id=user
+    ).exclude(shopping_cart__user_id=user).first()
+    return {
+        'author': recipe.author_id,
+        'stranger': stranger.id,
+        'recipe': recipe.id,
+        'tag': Tag.objects.values_list('id', flat=True).first(),
+        'ingredient': Ingredient.objects.values_list(
+            'id', flat=True
+        ).first(),
+    }
+
+
+def response_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(client, method, url):
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = getattr(client, method)(url)
+        size = response_size(response)
+        elapsed = time.perf_counter() - start
+    return {
+        'status': response.status_code,
+        'queries': len(queries),
+        'time': elapsed,
+        'size': size,
+    }
+
+
+def with_limit(url, limit):
+    separator = '&' if '?' in url else '?'
+    return f'{url}{separator}limit={limit}'
+
+
+def run_benchmark(user, page_sizes=DEFAULT_PAGE_SIZES, endpoints=ENDPOINTS):
+    """Замеряет каждый эндпоинт и возвращает строки отчёта.
+
+    Для пагинированных эндпоинтов замер выполняется для каждого
+    размера страницы, для остальных — один раз.
+    """
+    client = APIClient()
+    client.force_authenticate(user)
+    context = seed_context(user)
+    rows = []
+    for name, method, url, paginated in endpoints:
+        url = url.format(**context)
+        for page_size in (page_sizes if paginated else (None,)):
+            target = url if page_size is None else with_limit(url, page_size)
+            rows.append({
+                'endpoint': name,
+                'page_size': page_size,
+                **measure(client, method, target),
+            })
+    return rows
+
+
+def query_growth(rows):
+    """Возвращает эндпоинты, число запросов которых растёт с лимитом."""
+    counts = {}
+    for row in rows:
+        if row['page_size'] is not None:
+            counts.setdefault(row['endpoint'], set()).add(row['queries'])
+    return sorted(name for name, values in counts.items() if len(values) > 1)
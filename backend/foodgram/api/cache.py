@@ -0,0 +1,113 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.response import Response
+
+from foodgram.db.routers import current_read_alias
+
+KEY_PREFIX = 'response-cache'
+CACHE_HEADER = 'X-Cache'
+STATS = ('hits', 'misses')
+
+
+def version_key(namespace):
+    return f'{KEY_PREFIX}:version:{namespace}'
+
+
+def namespace_version(namespace):
+    # Начальная версия берётся из времени: если ключ версии вытеснят
+    # из кеша, новая версия не совпадёт ни с одной из прежних.
+    return cache.get_or_set(version_key(namespace), time.time_ns, None)
+
+
+def bump_namespace(*namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(version_key(namespace))
+        except ValueError:
+            cache.set(version_key(namespace), time.time_ns(), None)
+
+
+def normalize_query(query_params):
+    return urlencode(sorted(
+        (key, value)
+        for key in query_params
+        for value in query_params.getlist(key)
+        if value != ''
+    ))
+
+
+def response_key(namespaces, request):
+    query = normalize_query(request.query_params)
+    digest = hashlib.md5(
+        f'{request.get_host()}{request.path}?{query}'.encode()
+    ).hexdigest()
+    versions = ':'.join(
+        f'{namespace}:{namespace_version(namespace)}'
+        for namespace in namespaces
+    )
+    return f'{KEY_PREFIX}:{versions}:{digest}'
+
+
+def count(stat):
+    key = f'{KEY_PREFIX}:stats:{stat}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def response_cache_stats():
+    return {
+        stat: cache.get(f'{KEY_PREFIX}:stats:{stat}', 0) for stat in STATS
+    }
+
+
+class AnonymousResponseCacheMixin:
+    """Кеширует list/retrieve для анонимных пользователей.
+
+    Ключ строится из пути, отсортированных параметров запроса
+    и версий пространств имён из get_cache_namespaces (по умолчанию
+    только cache_namespace). Версию повышают сигналы из api/signals.py
+    при любой записи в связанные модели, поэтому устаревшие записи
+    просто перестают читаться.
+    """
+    cache_namespace = None
+
+    def get_cache_namespaces(self, request):
+        return (self.cache_namespace,)
+
+    def cached(self, handler, request, *args, **kwargs):
+        if not (settings.RESPONSE_CACHE_TIMEOUT
+                and request.user.is_anonymous):
+            return handler(request, *args, **kwargs)
+        key = response_key(self.get_cache_namespaces(request), request)
+        data = cache.get(key)
+        if data is not None:
+            count('hits')
+            response = Response(data)
+            response[CACHE_HEADER] = 'HIT'
+            return response
+        count('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = settings.RESPONSE_CACHE_TIMEOUT
+            if current_read_alias() != DEFAULT_DB_ALIAS:
+                # Реплика могла ещё не получить запись, после которой
+                # сменилась версия, — такой ответ живёт не дольше
+                # окна чтения из основной базы.
+                timeout = min(timeout, settings.REPLICA_STICKY_SECONDS)
+            cache.set(key, response.data, timeout)
+        response[CACHE_HEADER] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
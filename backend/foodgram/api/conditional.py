@@ -0,0 +1,71 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import normalize_query
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def last_modified_timestamp(*dates):
+    dates = [date for date in dates if date is not None]
+    return int(max(dates).timestamp()) if dates else None
+
+
+class ConditionalResponseMixin:
+    """Отвечает 304 на If-None-Match/If-Modified-Since до сериализации.
+
+    Валидаторы считаются одним агрегирующим запросом в get_validators:
+    по умолчанию это число записей и максимальный updated_at.
+    get_validators возвращает части ETag и дату для Last-Modified
+    или None, если условный ответ для запроса не поддерживается.
+    """
+    vary_on_user = False
+
+    def get_validators(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.filter(pk=kwargs[self.lookup_field])
+        state = queryset.aggregate(
+            count=Count('pk'), updated_at=Max('updated_at')
+        )
+        if self.action == 'retrieve' and not state['count']:
+            return None
+        return (
+            (state['count'], state['updated_at'],
+             normalize_query(request.query_params)),
+            state['updated_at']
+        )
+
+    def conditional(self, handler, request, *args, **kwargs):
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        parts, last_modified = validators
+        etag = make_etag(
+            request.accepted_renderer.format, request.get_host(), *parts
+        )
+        timestamp = last_modified_timestamp(last_modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        if self.vary_on_user:
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,169 @@
+import json
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from recipes.models import (
+    Favorite,
+    FeedEntry,
+    Recipe,
+    RecipeIngredientAmount,
+    ShoppingCart,
+    ShoppingListItem,
+    SimilarRecipe,
+    Tag
+)
+from users.models import Follow
+
+
+def index(model, *alternatives):
+    """Ожидаемый индекс: модель и допустимые наборы полей ключа."""
+    return model, alternatives
+
+
+RECIPE_INGREDIENTS = index(
+    RecipeIngredientAmount, ['recipe_id'], ['recipe_id', 'ingredient_id']
+)
+# Запросы с горячих путей API и индексы, которые должны их обслуживать.
+CHECKS = (
+    ('recipes by tag',
+     lambda s: Recipe.objects.filter(tags__slug=s['slug']),
+     (index(Tag, ['slug']),)),
+    ('recipes by author',
+     lambda s: Recipe.objects.filter(author=s['author']).order_by('-id')[:6],
+     (index(Recipe, ['author', 'id']),)),
+    ('popular recipes',
+     lambda s: Recipe.objects.order_by(
+         '-favorites_count', '-cart_count', '-id'
+     )[:6],
+     (index(Recipe, ['favorites_count', 'cart_count', 'id']),)),
+    ('quickest recipes',
+     lambda s: Recipe.objects.order_by('cooking_time', '-id')[:6],
+     (index(Recipe, ['cooking_time', 'id']),)),
+    ('similar recipes',
+     lambda s: Recipe.objects.filter(
+         similar_to__recipe_id=s['recipe']
+     ).order_by('-similar_to__score'),
+     (index(SimilarRecipe, ['recipe_id', 'score']),)),
+    ('favorited by user',
+     lambda s: Recipe.objects.filter(favorited__user_id=s['user']),
+     (index(Favorite, ['user_id', 'recipe_id']),)),
+    ('cart by user',
+     lambda s: Recipe.objects.filter(shopping_cart__user_id=s['user']),
+     (index(ShoppingCart, ['user_id', 'recipe_id']),)),
+    ('carts with recipe',
+     lambda s: ShoppingCart.objects.filter(
+         recipe_id=s['recipe']
+     ).values('user_id'),
+     (index(ShoppingCart, ['recipe_id', 'user_id']),)),
+    ('favorites of recipe',
+     lambda s: Favorite.objects.filter(
+         recipe_id=s['recipe']
+     ).values('user_id'),
+     (index(Favorite, ['recipe_id', 'user_id']),)),
+    ('recipe ingredients',
+     lambda s: RecipeIngredientAmount.objects.filter(
+         recipe_id=s['recipe']
+     ).values('ingredient_id', 'amount'),
+     (RECIPE_INGREDIENTS,)),
+    ('cart totals',
+     lambda s: RecipeIngredientAmount.objects.filter(
+         recipe_id__shopping_cart__user_id=s['user']
+     ).values('ingredient_id').annotate(total=Sum('amount')).order_by(),
+     (index(ShoppingCart, ['user_id', 'recipe_id']), RECIPE_INGREDIENTS)),
+    ('shopping list',
+     lambda s: ShoppingListItem.objects.filter(
+         user_id=s['user']
+     ).values('ingredient_id', 'amount'),
+     (index(ShoppingListItem, ['user_id'], ['user_id', 'ingredient_id']),)),
+    ('subscriptions',
+     lambda s: Follow.objects.filter(user=s['user']).values('following'),
+     (index(Follow, ['user', 'following']),)),
+    ('followers',
+     lambda s: Follow.objects.filter(following=s['author']).values('user'),
+     (index(Follow, ['following', 'user']),)),
+    ('subscriptions feed',
+     lambda s: FeedEntry.objects.filter(user_id=s['user']).order_by(
+         '-recipe_id_id'
+     ).values('recipe_id')[:6],
+     (index(FeedEntry, ['user_id', 'recipe_id']),)),
+)
+
+
+def sample_values():
+    cart = ShoppingCart.objects.order_by('id').first()
+    follow = Follow.objects.order_by('id').first()
+    tag = Tag.objects.order_by('id').first()
+    if cart is None or follow is None or tag is None:
+        return None
+    return {
+        'user': cart.user_id_id,
+        'recipe': cart.recipe_id_id,
+        'author': follow.following_id,
+        'slug': tag.slug,
+    }
+
+
+def index_names(cursor, model, alternatives):
+    constraints = connection.introspection.get_constraints(
+        cursor, model._meta.db_table
+    )
+    columns = [
+        [model._meta.get_field(name).column for name in fields]
+        for fields in alternatives
+    ]
+    # Столбцы INCLUDE интроспекция возвращает вместе с ключом,
+    # поэтому ключ сравнивается как префикс.
+    return {
+        name for name, constraint in constraints.items()
+        if (constraint['index'] or constraint['unique'])
+        and not constraint['primary_key']
+        and any(
+            constraint['columns'][:len(key)] == key for key in columns
+        )
+    }
+
+
+def plan_indexes(plan):
+    names = set()
+    if 'Index Name' in plan:
+        names.add(plan['Index Name'])
+    for child in plan.get('Plans', ()):
+        names |= plan_indexes(child)
+    return names
+
+
+def check_index_usage(allow_seqscan=False):
+    """Проверяет по EXPLAIN, что запросы из CHECKS используют индексы.
+
+    Возвращает список (название, ожидаемые индексы, использованные
+    индексы, успех). На маленьких таблицах PostgreSQL предпочитает
+    последовательное чтение, поэтому по умолчанию оно запрещается
+    (enable_seqscan = off) и проверяется, подходит ли индекс к запросу.
+    Только для PostgreSQL.
+    """
+    samples = sample_values()
+    if samples is None:
+        return None
+    results = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not allow_seqscan:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for name, queryset, expected in CHECKS:
+            sql, params = queryset(samples).query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            used = plan_indexes(plan[0]['Plan'])
+            wanted = [
+                index_names(cursor, model, alternatives)
+                for model, alternatives in expected
+            ]
+            results.append((
+                name,
+                sorted(set().union(*wanted)),
+                sorted(used),
+                all(names & used for names in wanted),
+            ))
+    return results
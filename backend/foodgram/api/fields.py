@@ -0,0 +1,149 @@
+import binascii
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageFile
+from rest_framework import serializers
+
+BASE64_MARKER = ';base64,'
+# Размер куска base64 кратен 4, чтобы каждый кусок декодировался целиком.
+CHUNK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+
+def image_error(message):
+    return serializers.ValidationError(message)
+
+
+def size_error():
+    return image_error(
+        'Размер изображения превышает '
+        f'{settings.IMAGE_UPLOAD_MAX_BYTES // 2 ** 20} МБ.'
+    )
+
+
+def check_pixels(width, height):
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise image_error(
+            f'Слишком большое изображение: {width}x{height} пикселей.'
+        )
+
+
+class Base64ImageWriter:
+    """Декодирует base64 по частям во временный файл.
+
+    Размер файла и число пикселей проверяются по ходу записи:
+    размеры берутся из заголовка изображения, как только он получен,
+    поэтому слишком большая картинка отклоняется до конца декодирования.
+    """
+
+    def __init__(self, content_type=None):
+        # Небольшие изображения остаются в памяти, крупные уходят на диск.
+        self.file = UploadedFile(
+            tempfile.SpooledTemporaryFile(
+                max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+            ),
+            content_type=content_type
+        )
+        self.pending = ''
+        self.size = 0
+        self.parser = ImageFile.Parser()
+        self.image_format = None
+
+    def write(self, text):
+        text = self.pending + ''.join(text.split()).replace('\\', '')
+        usable = len(text) - len(text) % 4
+        self.pending = text[usable:]
+        for start in range(0, usable, CHUNK_SIZE):
+            self.write_bytes(text[start:min(start + CHUNK_SIZE, usable)])
+
+    def write_bytes(self, chunk):
+        try:
+            data = binascii.a2b_base64(chunk)
+        except binascii.Error:
+            raise image_error('Некорректная строка base64.')
+        self.size += len(data)
+        if self.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+            raise size_error()
+        if self.image_format is None:
+            self.read_header(data)
+        self.file.write(data)
+
+    def read_header(self, data):
+        try:
+            self.parser.feed(data)
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            raise image_error('Загрузите корректное изображение.')
+        if self.parser.image is not None:
+            check_pixels(*self.parser.image.size)
+            self.image_format = self.parser.image.format
+            self.parser = None
+
+    def close(self):
+        if self.pending:
+            self.write_bytes(self.pending + '=' * (-len(self.pending) % 4))
+        extension = IMAGE_EXTENSIONS.get(self.image_format)
+        if extension is None:
+            raise image_error(
+                'Загрузите изображение JPEG, PNG, GIF или WebP.'
+            )
+        self.file.name = f'{uuid.uuid4()}.{extension}'
+        self.file.size = self.size
+        self.file.seek(0)
+        return self.file
+
+
+def decode_base64_image(value):
+    """Файл из строки data:image/...;base64,... без копий всей строки."""
+    content_type = None
+    start = value.find(BASE64_MARKER, 0, 100)
+    if start != -1:
+        content_type = value[:start].replace('data:', '')
+        start += len(BASE64_MARKER)
+    else:
+        start = 0
+    if (len(value) - start) * 3 // 4 > settings.IMAGE_UPLOAD_MAX_BYTES:
+        raise size_error()
+    writer = Base64ImageWriter(content_type)
+    for offset in range(start, len(value), CHUNK_SIZE):
+        writer.write(value[offset:offset + CHUNK_SIZE])
+    return writer.close()
+
+
+class ImageUploadField(serializers.ImageField):
+    """Изображение строкой base64 или файлом из multipart/form-data.
+
+    Строки декодируются во временный файл по частям, а не целиком
+    в памяти; для всех загрузок действуют IMAGE_UPLOAD_MAX_BYTES
+    и IMAGE_UPLOAD_MAX_PIXELS.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = decode_base64_image(data)
+        if not isinstance(data, UploadedFile):
+            raise image_error('Ожидается изображение в base64 или файл.')
+        data = serializers.FileField.to_internal_value(self, data)
+        if data.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+            raise size_error()
+        # Проверка идёт по самому файлу: forms.ImageField скопировал бы
+        # в память всё содержимое загрузки, не сохранённой на диск.
+        try:
+            image = Image.open(data)
+            check_pixels(*image.size)
+            image.verify()
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            raise image_error('Загрузите корректное изображение.')
+        if image.format not in IMAGE_EXTENSIONS:
+            raise image_error(
+                'Загрузите изображение JPEG, PNG, GIF или WebP.'
+            )
+        data.seek(0)
+        return data
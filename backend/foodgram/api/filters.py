@@ -1,11 +1,14 @@
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
 
 from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
 
-
-class IngredientFilter(SearchFilter):
-    search_param = 'name'
+# Значения ?ordering= и соответствующий порядок; под каждый есть индекс.
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-cart_count', '-id'),
+    'newest': ('-id',),
+    'cooking_time': ('cooking_time', '-id'),
+}
 
 
 class RecipeFilter(FilterSet):
@@ -21,6 +24,11 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=[(value, value) for value in RECIPE_ORDERINGS],
+        method='filter_ordering'
+    )
 
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
@@ -32,6 +40,17 @@ class RecipeFilter(FilterSet):
             return queryset.filter(shopping_cart__user_id=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'search',
+            'ordering'
+        )
@@ -0,0 +1,87 @@
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+INTERACTIONS = {
+    'favorites': (Favorite, 'user_id', 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'user_id', 'recipe_id'),
+    'following': (Follow, 'user', 'following'),
+}
+
+
+def cache_key(user_id, kind):
+    return f'interactions:{user_id}:{kind}'
+
+
+class UserInteractions:
+    """Id избранных рецептов, рецептов в корзине и авторов в подписках.
+
+    Каждое множество загружается одним запросом при первом обращении
+    и дальше флаги is_favorited, is_in_shopping_cart и is_subscribed
+    проверяются членством в нём. При INTERACTIONS_CACHE_TIMEOUT > 0
+    множества дополнительно хранятся в кеше между запросами. Множества
+    могут загружаться параллельно из разных потоков (api/async_views.py),
+    но каждое — только один раз.
+    """
+
+    def __init__(self, user):
+        self.user_id = None if user.is_anonymous else user.pk
+        self._ids = {}
+        self._locks = {kind: threading.Lock() for kind in INTERACTIONS}
+
+    def ids(self, kind):
+        if self.user_id is None:
+            return frozenset()
+        if kind not in self._ids:
+            with self._locks[kind]:
+                if kind not in self._ids:
+                    self._ids[kind] = self._load(kind)
+        return self._ids[kind]
+
+    def _load(self, kind):
+        timeout = settings.INTERACTIONS_CACHE_TIMEOUT
+        if timeout:
+            ids = cache.get(cache_key(self.user_id, kind))
+            if ids is not None:
+                return ids
+        model, user_field, target_field = INTERACTIONS[kind]
+        ids = frozenset(model.objects.filter(
+            **{user_field: self.user_id}
+        ).values_list(target_field, flat=True))
+        if timeout:
+            cache.set(cache_key(self.user_id, kind), ids, timeout)
+        return ids
+
+    @property
+    def favorites(self):
+        return self.ids('favorites')
+
+    @property
+    def shopping_cart(self):
+        return self.ids('shopping_cart')
+
+    @property
+    def following(self):
+        return self.ids('following')
+
+
+def get_interactions(request):
+    if request is None:
+        return UserInteractions(AnonymousUser())
+    interactions = getattr(request, '_interactions', None)
+    if interactions is None:
+        interactions = UserInteractions(request.user)
+        request._interactions = interactions
+    return interactions
+
+
+def invalidate_interactions(request, kind):
+    cache.delete(cache_key(request.user.pk, kind))
+    interactions = getattr(request, '_interactions', None)
+    if interactions is not None:
+        interactions._ids.pop(kind, None)
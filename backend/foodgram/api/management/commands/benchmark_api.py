@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import (
+    DEFAULT_PAGE_SIZES,
+    query_growth,
+    run_benchmark,
+    seed_dataset,
+    temporary_database
+)
+
+
+class Command(BaseCommand):
+    help = ('Наполняет временную базу синтетическими данными и замеряет '
+            'число запросов, время и размер ответа каждого эндпоинта API.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument(
+            '--page-sizes', type=int, nargs='+',
+            default=list(DEFAULT_PAGE_SIZES)
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу после замеров.'
+        )
+
+    def handle(self, *args, **options):
+        with temporary_database(options['keepdb']):
+            user = seed_dataset(
+                users=options['users'], recipes=options['recipes']
+            )
+            rows = run_benchmark(user, page_sizes=options['page_sizes'])
+
+        self.stdout.write(
+            f'{"endpoint":<28}{"limit":>6}{"status":>7}'
+            f'{"queries":>9}{"ms":>10}{"bytes":>10}'
+        )
+        for row in rows:
+            self.stdout.write(
+                f'{row["endpoint"]:<28}{row["page_size"] or "-":>6}'
+                f'{row["status"]:>7}{row["queries"]:>9}'
+                f'{row["time"] * 1000:>10.1f}{row["size"]:>10}'
+            )
+        growing = query_growth(rows)
+        if growing:
+            raise CommandError(
+                'Число запросов растёт с размером страницы: '
+                + ', '.join(growing)
+            )
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from api.authentication import CachedTokenAuthentication, token_cache
+from api.benchmark import seed_dataset, temporary_database
+
+FoodgramUser = get_user_model()
+
+AUTHENTICATION_CLASSES = {
+    'token': TokenAuthentication,
+    'cached': CachedTokenAuthentication,
+}
+
+
+def authenticate_all(authentication, requests):
+    try:
+        for request in requests:
+            authentication.authenticate(Request(request))
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает TokenAuthentication и CachedTokenAuthentication '
+            'при параллельных запросах с разными токенами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def run(self, authentication, requests, concurrency):
+        threads = [
+            threading.Thread(
+                target=authenticate_all,
+                args=(authentication, requests[number::concurrency])
+            ) for number in range(concurrency)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        with temporary_database(options['keepdb']):
+            seed_dataset(
+                users=options['users'], recipes=10,
+                favorites_per_user=1, cart_per_user=1
+            )
+            keys = [
+                Token.objects.create(user=user).key
+                for user in FoodgramUser.objects.all()
+            ]
+            factory = RequestFactory()
+            requests = [
+                factory.get(
+                    '/api/users/me/',
+                    HTTP_AUTHORIZATION=f'Token {keys[number % len(keys)]}'
+                ) for number in range(options['requests'])
+            ]
+            self.stdout.write(
+                f'{connection.vendor}, токенов: {len(keys)}, запросов: '
+                f'{len(requests)}, потоков: {options["concurrency"]}'
+            )
+            self.stdout.write(
+                f'{"authentication":<16}{"queries/req":>12}'
+                f'{"req/s":>10}{"us/req":>10}'
+            )
+            for name, authentication_class in AUTHENTICATION_CLASSES.items():
+                token_cache.clear()
+                authentication = authentication_class()
+                # Первый проход прогревает кеш, второй замеряется.
+                authenticate_all(authentication, requests[:len(keys)])
+                with CaptureQueriesContext(connection) as queries:
+                    authenticate_all(authentication, requests[:len(keys)])
+                elapsed = self.run(
+                    authentication, requests, options['concurrency']
+                )
+                self.stdout.write(
+                    f'{name:<16}{len(queries) / len(keys):>12.2f}'
+                    f'{len(requests) / elapsed:>10.0f}'
+                    f'{elapsed / len(requests) * 1e6:>10.1f}'
+                )
@@ -0,0 +1,155 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from api.benchmark import seed_dataset, temporary_database
+from recipes.feed import (
+    fan_out_recipes,
+    feed_recipe_ids,
+    rebuild_feeds,
+    remove_author_from_feed
+)
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+from users.services import refresh_followers_count
+
+FoodgramUser = get_user_model()
+
+
+def naive_feed(user, limit):
+    return list(Recipe.objects.filter(
+        author__following__user=user
+    ).order_by('-id').values_list('id', flat=True)[:limit])
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает раскладку рецептов по лентам подписчиков '
+            '(fan-out on write) с чтением при запросе (fan-out on read) '
+            'для автора с большим числом подписчиков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=10000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--new-recipes', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def timed(self, function, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def seed_author(self, reader, followers):
+        password = make_password(None)
+        author = FoodgramUser.objects.create(
+            email='celebrity@example.com', username='celebrity',
+            first_name='Автор', last_name='Популярный', password=password
+        )
+        FoodgramUser.objects.bulk_create([
+            FoodgramUser(
+                email=f'fan{number}@example.com', username=f'fan{number}',
+                first_name='Подписчик', last_name=str(number),
+                password=password
+            ) for number in range(followers - 1)
+        ], batch_size=1000)
+        fans = FoodgramUser.objects.filter(
+            username__startswith='fan'
+        ).values_list('id', flat=True)
+        Follow.objects.bulk_create([
+            Follow(user_id=user_id, following=author)
+            for user_id in [reader.pk, *fans]
+        ], batch_size=1000)
+        refresh_followers_count(FoodgramUser.objects.filter(pk=author.pk))
+        return author
+
+    def seed_recipes(self, author, count):
+        template = Recipe.objects.first()
+        Recipe.objects.bulk_create([
+            Recipe(
+                author=author, name=f'Новинка #{number}',
+                text=template.text, image=template.image,
+                cooking_time=template.cooking_time
+            ) for number in range(count)
+        ])
+        return list(Recipe.objects.filter(author=author).order_by(
+            'id'
+        ).values_list('id', flat=True))
+
+    def handle(self, *args, **options):
+        followers = options['followers']
+        repeat = options['repeat']
+        page_size = options['page_size']
+        with temporary_database(options['keepdb']), override_settings(
+            FEED_FANOUT_MAX_FOLLOWERS=followers
+        ):
+            reader = seed_dataset(
+                users=options['users'], recipes=options['recipes'],
+                favorites_per_user=1, cart_per_user=1
+            )
+            author = self.seed_author(reader, followers)
+            rebuild_feeds([reader.pk])
+            recipe_ids = self.seed_recipes(author, options['new_recipes'])
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            self.stdout.write(
+                f'{connection.vendor}, рецептов: {Recipe.objects.count()}, '
+                f'подписчиков у автора: {followers}'
+            )
+
+            before = FeedEntry.objects.count()
+            start = time.perf_counter()
+            for recipe_id in recipe_ids:
+                fan_out_recipes([recipe_id])
+            push_write = (time.perf_counter() - start) / len(recipe_ids)
+            written = (FeedEntry.objects.count() - before) / len(recipe_ids)
+
+            def read():
+                ids = feed_recipe_ids(reader)
+                return list(Recipe.objects.filter(pk__in=ids).order_by(
+                    '-id'
+                ).values_list('id', flat=True)[:page_size])
+
+            expected = naive_feed(reader, page_size)
+            if read() != expected:
+                raise CommandError('Лента не совпадает с наивным запросом')
+            push_read = self.timed(read, repeat)
+            # Тот же читатель, но рецепты автора в ленте не хранятся
+            # и дочитываются при запросе.
+            remove_author_from_feed(reader.pk, author.pk)
+            with override_settings(FEED_FANOUT_MAX_FOLLOWERS=followers - 1):
+                if read() != expected:
+                    raise CommandError(
+                        'Лента не совпадает с наивным запросом'
+                    )
+                pull_read = self.timed(read, repeat)
+            naive_read = self.timed(
+                lambda: naive_feed(reader, page_size), repeat
+            )
+
+            self.stdout.write(
+                f'{"strategy":<16}{"write, ms/recipe":>18}'
+                f'{"rows/recipe":>14}{"read, ms":>12}'
+            )
+            self.stdout.write(
+                f'{"fan-out write":<16}{push_write * 1000:>18.1f}'
+                f'{written:>14.0f}{push_read * 1000:>12.2f}'
+            )
+            self.stdout.write(
+                f'{"fan-out read":<16}{0:>18.1f}'
+                f'{0:>14}{pull_read * 1000:>12.2f}'
+            )
+            self.stdout.write(
+                f'{"naive join":<16}{0:>18.1f}'
+                f'{0:>14}{naive_read * 1000:>12.2f}'
+            )
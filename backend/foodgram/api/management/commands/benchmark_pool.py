@@ -0,0 +1,102 @@
+import contextlib
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from api.benchmark import seed_dataset, temporary_database
+from foodgram.db.pool import close_pools, pool_stats
+from recipes.models import Recipe
+
+
+def serve(recipe_ids):
+    """Запросы как в API: соединение, один запрос по индексу, закрытие."""
+    try:
+        for recipe_id in recipe_ids:
+            Recipe.objects.filter(pk=recipe_id).values_list(
+                'name', flat=True
+            ).first()
+            connections['default'].close()
+    finally:
+        connections['default'].close()
+
+
+@contextlib.contextmanager
+def pool_size(size):
+    settings_dict = connection.settings_dict
+    old = settings_dict.get('POOL')
+    settings_dict['POOL'] = {**(old or {}), 'MAX_SIZE': size}
+    try:
+        yield
+    finally:
+        connection.close()
+        close_pools()
+        settings_dict['POOL'] = old
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает запросы с новым соединением на каждый запрос '
+            'и с пулом соединений foodgram.db. Нужен PostgreSQL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--threads', type=int, nargs='+', default=[1, 8]
+        )
+        parser.add_argument('--pool-size', type=int, default=4)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def run(self, recipe_ids, threads):
+        workers = [
+            threading.Thread(
+                target=serve, args=(recipe_ids[number::threads],)
+            ) for number in range(threads)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Пул соединений работает с PostgreSQL')
+        with temporary_database(options['keepdb']):
+            seed_dataset(users=50, recipes=500)
+            ids = list(Recipe.objects.values_list('id', flat=True))
+            recipe_ids = [
+                ids[number % len(ids)] for number in range(options['requests'])
+            ]
+            connection.close()
+            with pool_size(0):
+                connection.ensure_connection()
+                start = time.perf_counter()
+                for recipe_id in recipe_ids:
+                    Recipe.objects.filter(pk=recipe_id).values_list(
+                        'name', flat=True
+                    ).first()
+                query = (time.perf_counter() - start) / len(recipe_ids)
+            self.stdout.write(
+                f'запросов: {len(recipe_ids)}, размер пула: '
+                f'{options["pool_size"]}, сам запрос по индексу: '
+                f'{query * 1000:.2f} ms'
+            )
+            self.stdout.write(
+                f'{"mode":<10}{"threads":>8}{"req/s":>10}{"ms/req":>10}'
+                f'{"opened":>8}{"waits":>8}{"max wait ms":>13}'
+            )
+            for mode, size in (('connect', 0), ('pool', options['pool_size'])):
+                for threads in options['threads']:
+                    with pool_size(size):
+                        elapsed = self.run(recipe_ids, threads)
+                        stats = pool_stats().get('default', {})
+                    self.stdout.write(
+                        f'{mode:<10}{threads:>8}'
+                        f'{len(recipe_ids) / elapsed:>10.0f}'
+                        f'{elapsed / len(recipe_ids) * 1000:>10.2f}'
+                        f'{stats.get("opened", len(recipe_ids)):>8}'
+                        f'{stats.get("waits", 0):>8}'
+                        f'{stats.get("max_wait", 0) * 1000:>13.1f}'
+                    )
@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from api.benchmark import seed_dataset, temporary_database
+from recipes.models import Recipe
+from recipes.search import search_recipes
+
+DEFAULT_QUERIES = ('мука', 'сахар сливочное масло', 'пирожное', 'водка')
+
+
+def naive_search(queryset, query):
+    return queryset.filter(
+        Q(name__icontains=query)
+        | Q(text__icontains=query)
+        | Q(ingredients__name__icontains=query)
+    ).distinct()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск рецептов (?search=) с наивным icontains '
+            'на синтетической базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--query', nargs='+', default=list(DEFAULT_QUERIES)
+        )
+        parser.add_argument('--keepdb', action='store_true')
+
+    def timed(self, queryset, repeat, page_size):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = queryset.count()
+            list(queryset[:page_size])
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return count, best
+
+    def handle(self, *args, **options):
+        with temporary_database(options['keepdb']):
+            seed_dataset(
+                users=options['users'], recipes=options['recipes'],
+                favorites_per_user=1, cart_per_user=1
+            )
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            self.stdout.write(
+                f'{connection.vendor}, рецептов: {Recipe.objects.count()}'
+            )
+            self.stdout.write(
+                f'{"query":<28}{"search":>18}{"icontains":>18}'
+            )
+            for query in options['query']:
+                found, search_time = self.timed(
+                    search_recipes(Recipe.objects.all(), query),
+                    options['repeat'], options['page_size']
+                )
+                naive_found, naive_time = self.timed(
+                    naive_search(Recipe.objects.all(), query),
+                    options['repeat'], options['page_size']
+                )
+                self.stdout.write(
+                    f'{query:<28}'
+                    f'{search_time * 1000:>9.1f} ms {found:>6}'
+                    f'{naive_time * 1000:>9.1f} ms {naive_found:>6}'
+                )
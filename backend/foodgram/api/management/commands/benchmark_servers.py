@@ -0,0 +1,177 @@
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from api.benchmark import seed_dataset, temporary_database
+from recipes.models import Recipe
+
+SERVERS = {
+    'gunicorn': ['foodgram.wsgi:application'],
+    'uvicorn': [
+        'foodgram.asgi:application',
+        '--worker-class', 'uvicorn.workers.UvicornWorker'
+    ],
+}
+URLS = (
+    '/api/recipes/?limit=6',
+    '/api/recipes/{recipe}/',
+    '/api/tags/',
+    '/api/ingredients/?name=са',
+    '/api/users/subscriptions/?recipes_limit=3',
+)
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError('Сервер завершился при запуске')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError('Сервер не запустился')
+
+
+def load(port, urls, headers, deadline, latencies, errors):
+    """Один клиент с keep-alive соединением, запросы по кругу."""
+    client = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    number = 0
+    while time.monotonic() < deadline:
+        url = urls[number % len(urls)]
+        number += 1
+        start = time.perf_counter()
+        try:
+            client.request('GET', url, headers=headers)
+            response = client.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(url)
+            client.close()
+            continue
+        if response.status != 200:
+            errors.append(url)
+        latencies.append(time.perf_counter() - start)
+    client.close()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность синхронных воркеров '
+            'gunicorn (WSGI) и воркеров uvicorn (ASGI, '
+            'ASYNC_READ_VIEWS=True) на эндпоинтах чтения при '
+            'параллельных соединениях. Нужен PostgreSQL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--connections', type=int, nargs='+', default=[8, 32]
+        )
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def run_server(self, server, env, options):
+        port = free_port()
+        process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', *SERVERS[server],
+                '--workers', str(options['workers']),
+                '--bind', f'127.0.0.1:{port}',
+            ],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for(port, process)
+            for connections in options['connections']:
+                self.measure(server, port, connections, options)
+        finally:
+            process.terminate()
+            process.wait()
+
+    def measure(self, server, port, connections, options):
+        latencies, errors = [], []
+        # Прогрев: воркеры открывают соединения с базой и кеши.
+        load(
+            port, self.urls, self.headers, time.monotonic() + 1, [], []
+        )
+        deadline = time.monotonic() + options['duration']
+        threads = [
+            threading.Thread(target=load, args=(
+                port, self.urls[number % len(self.urls):] + self.urls,
+                self.headers, deadline, latencies, errors
+            )) for number in range(connections)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        self.stdout.write(
+            f'{server:<10}{connections:>12}{len(latencies) / elapsed:>10.0f}'
+            f'{statistics.median(latencies or [0]) * 1000:>10.1f}'
+            f'{p95 * 1000:>10.1f}{len(errors):>8}'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'Серверам нужна общая база, а тестовая база SQLite '
+                'создаётся в памяти процесса.'
+            )
+        with temporary_database(options['keepdb']):
+            user = seed_dataset(
+                users=options['users'], recipes=options['recipes']
+            )
+            token, _ = Token.objects.get_or_create(user=user)
+            self.headers = {'Authorization': f'Token {token.key}'}
+            recipe = Recipe.objects.order_by('-id').first()
+            self.urls = tuple(
+                quote(url.format(recipe=recipe.pk), safe='/?=&')
+                for url in URLS
+            )
+            database = connection.settings_dict
+            env = {
+                **os.environ,
+                'DEBUG': 'False',
+                'DB_NAME': database['NAME'],
+                'DB_HOST': database['HOST'],
+                'DB_PORT': str(database['PORT']),
+            }
+            self.stdout.write(
+                f'воркеров: {options["workers"]}, '
+                f'замер: {options["duration"]} с'
+            )
+            self.stdout.write(
+                f'{"server":<10}{"connections":>12}{"req/s":>10}'
+                f'{"p50 ms":>10}{"p95 ms":>10}{"errors":>8}'
+            )
+            self.run_server('gunicorn', {
+                **env, 'ASYNC_READ_VIEWS': 'False'
+            }, options)
+            self.run_server('uvicorn', {
+                **env, 'ASYNC_READ_VIEWS': 'True'
+            }, options)
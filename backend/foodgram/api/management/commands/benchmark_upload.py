@@ -0,0 +1,116 @@
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+
+from api.fields import ImageUploadField
+from api.parsers import StreamingJSONParser
+
+# Прежний путь загрузки и новый: парсер тела запроса и поле изображения.
+MODES = {
+    'base64': (JSONParser, Base64ImageField),
+    'streaming': (StreamingJSONParser, ImageUploadField),
+}
+
+
+def peak_rss_kb():
+    # ru_maxrss на Linux наследуется от родителя через fork/exec,
+    # а VmHWM считается только для текущего процесса.
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def write_payload(path, megabytes):
+    # Шум почти не сжимается, так что размер PNG близок к заданному.
+    side = int((megabytes * 2 ** 20 / 3) ** 0.5)
+    buffer = BytesIO()
+    Image.frombytes(
+        'RGB', (side, side), os.urandom(side * side * 3)
+    ).save(buffer, 'PNG', compress_level=0)
+    image = 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+    with open(path, 'w') as payload:
+        json.dump({'name': 'benchmark', 'image': image}, payload)
+    return side
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пиковое потребление памяти (RSS) при загрузке '
+            'изображения в base64 прежним и потоковым способом.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=float, default=10)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--child', choices=MODES, help='Служебный режим замера.'
+        )
+        parser.add_argument('--payload', help='Служебный режим замера.')
+
+    def handle(self, *args, **options):
+        if options['child']:
+            return self.measure(options['child'], options['payload'])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'payload.json')
+            side = write_payload(path, options['size_mb'])
+            self.stdout.write(
+                f'Изображение {side}x{side}, тело запроса '
+                f'{os.path.getsize(path) / 2 ** 20:.1f} МБ'
+            )
+            self.stdout.write(f'{"mode":<12}{"peak RSS, MB":>14}{"ms":>10}')
+            for mode in MODES:
+                rss, elapsed = [], []
+                for _ in range(options['repeat']):
+                    # Каждый замер в отдельном процессе: ru_maxrss
+                    # не сбрасывается в пределах одного процесса.
+                    result = json.loads(subprocess.run(
+                        [sys.executable, sys.argv[0], 'benchmark_upload',
+                         '--child', mode, '--payload', path],
+                        check=True, capture_output=True, text=True
+                    ).stdout)
+                    rss.append(result['rss_kb'])
+                    elapsed.append(result['time'])
+                self.stdout.write(
+                    f'{mode:<12}{min(rss) / 1024:>14.1f}'
+                    f'{min(elapsed) * 1000:>10.1f}'
+                )
+
+    def measure(self, mode, path):
+        parser_class, field_class = MODES[mode]
+        size = os.path.getsize(path)
+        with open(path, 'rb') as body:
+            # Тело читается из файла, как из сокета у gunicorn,
+            # и не попадает в память целиком до разбора.
+            request = Request(RequestFactory().request(**{
+                'REQUEST_METHOD': 'POST',
+                'PATH_INFO': '/api/recipes/',
+                'CONTENT_TYPE': 'application/json',
+                'CONTENT_LENGTH': str(size),
+                'wsgi.input': body,
+            }), parsers=[parser_class()])
+            baseline = peak_rss_kb()
+            started = time.perf_counter()
+            image = field_class().run_validation(request.data['image'])
+            image.seek(0, os.SEEK_END)
+            elapsed = time.perf_counter() - started
+        self.stdout.write(json.dumps({
+            'rss_kb': peak_rss_kb() - baseline, 'time': elapsed
+        }))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.benchmark import seed_dataset, temporary_database
+from api.explain import check_index_usage
+
+
+class Command(BaseCommand):
+    help = ('Проверяет по EXPLAIN, что фильтры и соединения API '
+            'используют индексы. Без --database-only наполняет '
+            'временную базу синтетическими данными.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument(
+            '--allow-seqscan', action='store_true',
+            help='Не запрещать планировщику последовательное чтение.'
+        )
+        parser.add_argument(
+            '--database-only', action='store_true',
+            help='Проверить рабочую базу, не создавая временную.'
+        )
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Проверка планов работает только с PostgreSQL.')
+        if options['database_only']:
+            results = self.explain(options)
+        else:
+            with temporary_database(options['keepdb']):
+                seed_dataset(
+                    users=options['users'], recipes=options['recipes']
+                )
+                results = self.explain(options)
+        if results is None:
+            raise CommandError(
+                'Нет корзин, подписок или тегов для подстановки в запросы.'
+            )
+        failed = [result for result in results if not result[3]]
+        for name, expected, used, ok in results:
+            self.stdout.write(
+                f'{"OK" if ok else "FAIL":<6}{name:<22}'
+                f'ожидается: {", ".join(expected)}; '
+                f'использованы: {", ".join(used) or "—"}'
+            )
+        if failed:
+            raise CommandError(
+                f'Индексы не используются в {len(failed)} запросах.'
+            )
+
+    def explain(self, options):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return check_index_usage(options['allow_seqscan'])
@@ -0,0 +1,284 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+from foodgram.db.pool import pool_stats
+
+from .authentication import token_cache
+from .cache import response_cache_stats
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+# Этапы запроса, которые отмечает TimingMixin; время SQL из них
+# вычитается и учитывается отдельно как db.
+PHASES = ('auth', 'view', 'render')
+# Метод приходит от клиента: остальные значения сводятся к 'other',
+# чтобы число серий не росло без ограничений.
+HTTP_METHODS = frozenset((
+    'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'CONNECT',
+    'TRACE'
+))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield f'{name}_bucket{format_labels(**labels, le=bound)} {total}'
+        yield f'{name}_sum{format_labels(**labels)} {self.sum}'
+        yield f'{name}_count{format_labels(**labels)} {self.count}'
+
+
+def format_labels(**labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"'
+        ))
+        for key, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+class RequestTimer:
+    """Замеры одного выбранного для выборки запроса.
+
+    Передаётся в connection.execute_wrapper и считает запросы и время
+    SQL, в том числе из потоков асинхронных представлений; этапы
+    (PHASES) отмечаются методами start/stop, и из их длительности
+    вычитается SQL, выполненный внутри этапа.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.phases = {}
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            with self._lock:
+                self.db_time += duration
+                self.queries += 1
+
+    def start(self, phase):
+        self._started[phase] = (time.perf_counter(), self.db_time)
+
+    def stop(self, phase):
+        if phase not in self._started:
+            return
+        started, db_time = self._started.pop(phase)
+        self.phases[phase] = self.phases.get(phase, 0) + (
+            time.perf_counter() - started - (self.db_time - db_time)
+        )
+
+    def server_timing(self, duration):
+        entries = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"'
+        ]
+        entries.extend(
+            f'{phase};dur={self.phases[phase] * 1000:.1f}'
+            for phase in PHASES if phase in self.phases
+        )
+        entries.append(f'total;dur={duration * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def get_timer(request):
+    return getattr(request, '_timer', None)
+
+
+@contextmanager
+def track_queries(timer):
+    """Подключает timer ко всем соединениям текущего потока."""
+    with ExitStack() as stack:
+        if timer is not None:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+        yield
+
+
+class TimingMixin:
+    """Отмечает этапы запроса DRF для RequestTimer из MetricsMiddleware.
+
+    auth — аутентификация, права и троттлинг, view — обработчик
+    с сериализацией, render — рендеринг ответа после представления.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        timer = get_timer(request)
+        if timer is None:
+            return super().initial(request, *args, **kwargs)
+        timer.start('auth')
+        try:
+            super().initial(request, *args, **kwargs)
+        finally:
+            timer.stop('auth')
+        timer.start('view')
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        timer = get_timer(request)
+        if timer is not None:
+            timer.stop('view')
+            if not getattr(response, 'is_rendered', True):
+                timer.start('render')
+                response.add_post_render_callback(
+                    lambda response: timer.stop('render')
+                )
+        return response
+
+
+class Registry:
+    """Метрики процесса в памяти; каждый воркер отдаёт свои."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.requests = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def observe(self, route, method, status, duration, timer=None):
+        if method not in HTTP_METHODS:
+            method = 'other'
+        with self.lock:
+            self.latency[(route, method)].observe(duration)
+            self.requests[(route, method, status)] += 1
+            if timer is None:
+                return
+            self.queries[route].observe(timer.queries)
+            self.seconds[(route, 'db')] += timer.db_time
+            for phase, seconds in timer.phases.items():
+                self.seconds[(route, phase)] += seconds
+
+    def collect(self):
+        with self.lock:
+            latency = list(self.latency.items())
+            queries = list(self.queries.items())
+            requests = list(self.requests.items())
+            seconds = list(self.seconds.items())
+        yield from header(
+            'foodgram_http_requests_total', 'counter',
+            'Запросы по маршруту, методу и статусу.'
+        )
+        for (route, method, status), count in sorted(requests):
+            yield 'foodgram_http_requests_total{} {}'.format(
+                format_labels(route=route, method=method, status=status),
+                count
+            )
+        yield from header(
+            'foodgram_http_request_duration_seconds', 'histogram',
+            'Длительность запроса по маршруту.'
+        )
+        for (route, method), histogram in sorted(latency):
+            yield from histogram.lines(
+                'foodgram_http_request_duration_seconds',
+                {'route': route, 'method': method}
+            )
+        yield from header(
+            'foodgram_db_queries', 'histogram',
+            'SQL-запросов на запрос (по выборке запросов).'
+        )
+        for route, histogram in sorted(queries):
+            yield from histogram.lines(
+                'foodgram_db_queries', {'route': route}
+            )
+        yield from header(
+            'foodgram_request_phase_seconds_total', 'counter',
+            'Время этапов запроса (по выборке): db — SQL, остальные — '
+            'без SQL.'
+        )
+        for (route, phase), value in sorted(seconds):
+            yield 'foodgram_request_phase_seconds_total{} {}'.format(
+                format_labels(route=route, phase=phase), value
+            )
+
+
+def header(name, kind, description):
+    yield f'# HELP {name} {description}'
+    yield f'# TYPE {name} {kind}'
+
+
+def collect_caches():
+    yield from header(
+        'foodgram_token_cache_total', 'counter',
+        'Обращения к кешу токенов процесса.'
+    )
+    for result, count in token_cache.stats.items():
+        yield 'foodgram_token_cache_total{} {}'.format(
+            format_labels(result=result), count
+        )
+    yield from header(
+        'foodgram_response_cache_total', 'counter',
+        'Обращения к кешу ответов для анонимов.'
+    )
+    for result, count in response_cache_stats().items():
+        yield 'foodgram_response_cache_total{} {}'.format(
+            format_labels(result=result), count
+        )
+
+
+POOL_GAUGES = ('in_use', 'idle', 'waiting', 'max_size')
+
+
+def collect_pools():
+    stats = pool_stats()
+    yield from header(
+        'foodgram_db_pool_connections', 'gauge',
+        'Соединения пула процесса по состоянию.'
+    )
+    for alias, values in sorted(stats.items()):
+        for state in POOL_GAUGES:
+            yield 'foodgram_db_pool_connections{} {}'.format(
+                format_labels(alias=alias, state=state), values[state]
+            )
+    for name in (
+        'opened', 'checkouts', 'waits', 'wait_time', 'timeouts',
+        'failed_checks', 'recycled'
+    ):
+        metric = (
+            'foodgram_db_pool_wait_seconds_total' if name == 'wait_time'
+            else f'foodgram_db_pool_{name}_total'
+        )
+        yield from header(metric, 'counter', f'Пул соединений: {name}.')
+        for alias, values in sorted(stats.items()):
+            yield f'{metric}{format_labels(alias=alias)} {values[name]}'
+
+
+registry = Registry()
+
+
+def render_metrics():
+    return '\n'.join((
+        *registry.collect(), *collect_caches(), *collect_pools()
+    )) + '\n'
@@ -0,0 +1,87 @@
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from foodgram.db.routers import read_from
+
+from .metrics import RequestTimer, registry, track_queries
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+KEY_PREFIX = 'replica-sticky'
+
+
+def sticky_key(request):
+    """Ключ клиента: токен или сессия; анонимам записывать нечего."""
+    credentials = request.META.get('HTTP_AUTHORIZATION') or (
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    return f'{KEY_PREFIX}:{hashlib.sha256(credentials.encode()).hexdigest()}'
+
+
+class ReplicaMiddleware:
+    """Направляет безопасные запросы к API на реплики.
+
+    После успешной записи клиент REPLICA_STICKY_SECONDS секунд читает
+    из основной базы, чтобы увидеть свои изменения (is_favorited,
+    is_in_shopping_cart, новый рецепт), пока реплика догоняет.
+    Отметка хранится в общем кеше, поэтому действует во всех воркерах,
+    если кеш общий (Redis).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not request.path.startswith(
+            settings.REPLICA_READ_PATHS
+        ):
+            return self.get_response(request)
+        key = sticky_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if key is not None and response.status_code < 400:
+                cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+            return response
+        if key is not None and cache.get(key):
+            return self.get_response(request)
+        with read_from(random.choice(replicas)):
+            return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """Длительность каждого запроса и подробные замеры по выборке.
+
+    Гистограмма длительности пополняется для всех запросов. Для доли
+    METRICS_SAMPLE_RATE запросов дополнительно считаются SQL-запросы
+    и их время во всех базах, а TimingMixin отмечает этапы DRF.
+    Итог уходит в заголовок Server-Timing и в /metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        timer = None
+        if random.random() < settings.METRICS_SAMPLE_RATE:
+            timer = request._timer = RequestTimer()
+        with track_queries(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        registry.observe(
+            match.view_name if match else 'unmatched', request.method,
+            response.status_code, duration, timer
+        )
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = (
+                timer.server_timing(duration) if timer is not None
+                else f'total;dur={duration * 1000:.1f}'
+            )
+        return response
@@ -1,6 +1,136 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+COUNT_NONE = 'none'
+
+
+def estimate_count(queryset):
+    """Оценка числа строк без полного COUNT(*).
+
+    Для нефильтрованной таблицы на PostgreSQL берётся статистика
+    планировщика pg_class.reltuples, для остальных запросов — точный
+    COUNT, закешированный на PAGINATION_COUNT_CACHE_TIMEOUT секунд.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return int(row[0])
+    sql, params = queryset.query.sql_with_params()
+    key = 'pagination-count:' + hashlib.md5(
+        f'{sql}{params}'.encode()
+    ).hexdigest()
+    return cache.get_or_set(
+        key, queryset.count, settings.PAGINATION_COUNT_CACHE_TIMEOUT
+    )
+
+
+class FoodgramCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        # Порядок, заданный фильтром ?ordering=, сохраняется.
+        if 'ordering' in request.query_params and queryset.query.order_by:
+            return tuple(queryset.query.order_by)
+        return super().get_ordering(request, queryset, view)
 
 
 class FoodgramPagePagination(PageNumberPagination):
+    """Постраничная пагинация с дополнительными режимами.
+
+    ?cursor= включает курсорную пагинацию по id (без OFFSET и COUNT),
+    ?count=estimate|none позволяет оценить число записей или вовсе
+    не считать его. Без этих параметров поведение прежнее.
+    """
     page_size = 6
     page_size_query_param = 'limit'
+    count_query_param = 'count'
+    count_modes = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+    cursor_pagination_class = FoodgramCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        self.count_mode = request.query_params.get(
+            self.count_query_param, COUNT_EXACT
+        )
+        if self.count_mode not in self.count_modes:
+            self.count_mode = COUNT_EXACT
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        if self.count_mode == COUNT_EXACT:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+        except ValueError:
+            self.number = 0
+        if self.number < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=self.number, message='Invalid page.'
+            ))
+        offset = (self.number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.count = (
+            estimate_count(queryset)
+            if self.count_mode == COUNT_ESTIMATE else None
+        )
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.count_mode == COUNT_EXACT:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.page_query_param, self.number + 1
+        )
+
+    def get_previous_link(self):
+        if self.count_mode == COUNT_EXACT:
+            return super().get_previous_link()
+        if self.number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.number - 1
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        if self.count_mode == COUNT_EXACT:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -0,0 +1,134 @@
+import codecs
+import re
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+from .fields import BASE64_MARKER, CHUNK_SIZE, Base64ImageWriter
+
+DATA_URI = '"data:'
+# Сколько символов после кавычки может занимать заголовок data URI.
+HEADER_LIMIT = 100
+PLACEHOLDER = '\x00upload:{}'
+KEY_BEFORE_VALUE = re.compile(r'"([^"\\]+)"\s*:\s*$')
+
+
+def replace_placeholders(data, uploads):
+    if isinstance(data, dict):
+        return {
+            key: replace_placeholders(value, uploads)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [replace_placeholders(value, uploads) for value in data]
+    if isinstance(data, str):
+        return uploads.get(data, data)
+    return data
+
+
+class StreamingJSONParser(JSONParser):
+    """JSON, в котором изображения data:...;base64 не держатся в памяти.
+
+    Тело читается кусками, строки data URI по мере чтения декодируются
+    во временные файлы, а в JSON на их месте остаются метки, которые
+    после разбора заменяются файлами. Остальной JSON ограничен
+    DATA_UPLOAD_MAX_MEMORY_SIZE.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.parts = []
+        self.size = 0
+        self.uploads = {}
+        self.writer = None
+        buffer = ''
+        while True:
+            chunk = stream.read(CHUNK_SIZE) if stream is not None else b''
+            buffer = self.consume(
+                buffer + self.decoder.decode(chunk, final=not chunk),
+                final=not chunk
+            )
+            if not chunk:
+                break
+        if self.writer is not None:
+            raise ParseError('JSON parse error - незакрытая строка base64')
+        try:
+            data = json.loads(''.join(self.parts))
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+        return replace_placeholders(data, self.uploads)
+
+    def consume(self, buffer, final):
+        """Обрабатывает buffer и возвращает хвост, ждущий следующего куска."""
+        while buffer:
+            if self.writer is not None:
+                end = buffer.find('"')
+                self.decode(buffer if end == -1 else buffer[:end])
+                if end == -1:
+                    return ''
+                self.uploads[self.placeholder] = self.finish()
+                buffer = buffer[end + 1:]
+                continue
+            start = buffer.find(DATA_URI)
+            if start == -1:
+                keep = 0 if final else len(DATA_URI) - 1
+                self.flush(buffer[:len(buffer) - keep])
+                return buffer[len(buffer) - keep:]
+            marker = buffer.find(
+                BASE64_MARKER, start, start + HEADER_LIMIT
+            )
+            if marker == -1 or self.escaped(buffer, start) or (
+                '"' in buffer[start + 1:marker]
+            ):
+                if not final and marker == -1 and (
+                    len(buffer) - start < HEADER_LIMIT
+                ):
+                    self.flush(buffer[:start])
+                    return buffer[start:]
+                self.flush(buffer[:start + 1])
+                buffer = buffer[start + 1:]
+                continue
+            self.flush(buffer[:start])
+            match = KEY_BEFORE_VALUE.search(
+                self.parts[-1][-HEADER_LIMIT:] if self.parts else ''
+            )
+            self.field = match.group(1) if match else 'non_field_errors'
+            self.placeholder = PLACEHOLDER.format(len(self.uploads))
+            self.parts.append(json.dumps(self.placeholder))
+            self.writer = Base64ImageWriter(
+                buffer[start + len(DATA_URI):marker]
+            )
+            buffer = buffer[marker + len(BASE64_MARKER):]
+        return ''
+
+    def escaped(self, buffer, start):
+        previous = buffer[:start] or (self.parts[-1] if self.parts else '')
+        return previous.endswith('\\')
+
+    def flush(self, text):
+        if not text:
+            return
+        self.size += len(text)
+        limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        if limit is not None and self.size > limit:
+            raise ParseError('Слишком большой запрос.')
+        self.parts.append(text)
+
+    def decode(self, text):
+        try:
+            self.writer.write(text)
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError({self.field: error.detail})
+
+    def finish(self):
+        try:
+            upload = self.writer.close()
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError({self.field: error.detail})
+        self.writer = None
+        return upload
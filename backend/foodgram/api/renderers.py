@@ -0,0 +1,31 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = '\n'.join(
+                f'{key}: {value}' for key, value in data.items()
+            )
+        return str(data).encode(self.charset)
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+SHOPPING_CART_RENDERERS = (
+    ShoppingCartCSVRenderer,
+    ShoppingCartTextRenderer,
+    JSONRenderer,
+)
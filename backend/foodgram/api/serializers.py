@@ -1,9 +1,13 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
+from rest_framework.utils import html, json
 
+from recipes.images import FORMATS
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -12,12 +16,28 @@ from recipes.models import (
     ShoppingCart,
     Tag
 )
+from recipes.services import update_shopping_lists
 from users.models import Follow
+from .fields import ImageUploadField
+from .interactions import get_interactions
 
 
 FoodgramUser = get_user_model()
 
 
+def media_url(request, name):
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def get_recipes_limit(request):
+    try:
+        recipes_limit = int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return None
+    return max(recipes_limit, 0)
+
+
 class FoodgramUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
@@ -36,12 +56,7 @@ class FoodgramUserSerializer(UserSerializer):
 
     def get_is_subscribed(self, following):
         request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return Follow.objects.filter(
-            user=request.user,
-            following=following
-        ).exists()
+        return following.id in get_interactions(request).following
 
 
 class FoodgramUserCreateSerializer(UserCreateSerializer):
@@ -102,26 +117,25 @@ class ListFollowRecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_recipes_count(self, following):
-        return Recipe.objects.filter(author=following).count()
+        return following.recipes_count
 
     def get_recipes(self, following):
-        queryset = self.context['request']
-        recipes_limit = queryset.query_params.get('recipes_limit')
-        if not recipes_limit:
-            return FollowRecipeSerializer(
-                following.author.all(),
-                many=True, context={'request': queryset}
-            ).data
+        request = self.context['request']
+        recipes = self.context.get('recipes')
+        if recipes is not None:
+            recipes = recipes.get(following.id, [])
+        else:
+            recipes = following.author.all()
+            recipes_limit = get_recipes_limit(request)
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return FollowRecipeSerializer(
-            following.author.all()[:int(recipes_limit)], many=True,
-            context={'request': self.context['request']}
+            recipes, many=True, context={'request': request}
         ).data
 
     def get_is_subscribed(self, following):
-        return Follow.objects.filter(
-            user=self.context.get('request').user,
-            following=following
-        ).exists()
+        request = self.context.get('request')
+        return following.id in get_interactions(request).following
 
 
 class FollowRecipeSerializer(serializers.ModelSerializer):
@@ -135,6 +149,20 @@ class FollowRecipeSerializer(serializers.ModelSerializer):
         )
 
 
+class SimilarRecipeSerializer(serializers.ModelSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id',
+            'name',
+            'image',
+            'cooking_time',
+            'score'
+        )
+
+
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
@@ -180,6 +208,10 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         method_name='get_is_in_shopping_cart',
         read_only=True
     )
+    thumbnail = serializers.SerializerMethodField(
+        method_name='get_thumbnail'
+    )
+    srcset = serializers.SerializerMethodField(method_name='get_srcset')
 
     class Meta:
         model = Recipe
@@ -192,33 +224,40 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'thumbnail',
+            'srcset',
             'text',
             'cooking_time'
         )
 
+    def get_thumbnail(self, recipe):
+        request = self.context.get('request')
+        variants = recipe.image_variants.get('webp')
+        if variants:
+            return media_url(request, variants[0][1])
+        return media_url(request, recipe.image.name) if recipe.image else None
+
+    def get_srcset(self, recipe):
+        request = self.context.get('request')
+        return {
+            FORMATS[variant][2]: ', '.join(
+                f'{media_url(request, name)} {width}w'
+                for width, name in recipe.image_variants[variant]
+            )
+            for variant in FORMATS if variant in recipe.image_variants
+        }
+
     def get_is_favorited(self, recipe):
         request = self.context.get('request')
-        if request.user.is_anonymous:
-            return False
-        is_favorited = Favorite.objects.filter(
-            user_id=request.user,
-            recipe_id=recipe
-        ).exists()
-        return is_favorited
+        return recipe.id in get_interactions(request).favorites
 
     def get_is_in_shopping_cart(self, recipe):
         request = self.context.get('request')
-        if request.user.is_anonymous:
-            return False
-        is_in_shopping_cart = ShoppingCart.objects.filter(
-            user_id=request.user,
-            recipe_id=recipe
-        ).exists()
-        return is_in_shopping_cart
+        return recipe.id in get_interactions(request).shopping_cart
 
     def get_ingredients(self, recipe):
         return RecipeIngredientAmountSerializer(
-            RecipeIngredientAmount.objects.filter(recipe_id=recipe),
+            recipe.recipeingredientamount_set.all(),
             many=True
         ).data
 
@@ -230,7 +269,7 @@ class RecipePostSerializer(serializers.ModelSerializer):
         queryset=Tag.objects.all(),
         many=True
     )
-    image = Base64ImageField()
+    image = ImageUploadField()
 
     class Meta:
         model = Recipe
@@ -245,61 +284,169 @@ class RecipePostSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def to_internal_value(self, data):
+        # В multipart/form-data списки ingredients и tags приходят
+        # строкой JSON (tags можно передать и повторяющимся полем).
+        if html.is_html_input(data):
+            form = {key: values[-1] for key, values in data.lists()}
+            for key in ('ingredients', 'tags'):
+                if key not in data:
+                    continue
+                values = data.getlist(key)
+                if len(values) == 1:
+                    try:
+                        values = json.loads(values[0])
+                    except ValueError:
+                        raise serializers.ValidationError({
+                            key: 'Ожидается список в формате JSON.'
+                        })
+                form[key] = values if isinstance(values, list) else [values]
+            data = self.initial_data = form
+        return super().to_internal_value(data)
+
     def validate(self, data):
         ingredients = self.initial_data.get('ingredients')
-        ingredients_list = []
+        if ingredients is None:
+            if self.partial:
+                return data
+            raise serializers.ValidationError({
+                'ingredients': 'Обязательное поле.'
+            })
+        amounts = {}
         for ingredient in ingredients:
-            if ingredient['id'] in ingredients_list:
+            try:
+                ingredient_id = int(ingredient['id'])
+                amount = float(ingredient['amount'])
+            except (KeyError, TypeError, ValueError):
+                raise serializers.ValidationError({
+                    'ingredients': 'Укажите id и количество ингредиента.'
+                })
+            if ingredient_id in amounts:
                 raise serializers.ValidationError({
                     'ingredients': 'Ингредиенты не должны повторяться'
                 })
-            ingredients_list.append(ingredient['id'])
-        data['ingredients'] = ingredients
+            if amount <= 0:
+                raise serializers.ValidationError({
+                    'ingredients': 'Ингредиента не может быть 0.'
+                })
+            amounts[ingredient_id] = amount
+        found = Ingredient.objects.in_bulk(list(amounts))
+        missing = amounts.keys() - found.keys()
+        if missing:
+            raise serializers.ValidationError({
+                'ingredients': 'Ингредиенты не найдены: {}.'.format(
+                    ', '.join(map(str, sorted(missing)))
+                )
+            })
+        data['ingredients'] = amounts
         return data
 
-    def ingredient_tags_create(self, recipe, ingredients, tags):
-        RecipeIngredientAmount.objects.bulk_create(
-            [RecipeIngredientAmount(
-                ingredient_id=get_object_or_404(
-                    Ingredient,
-                    id=ingredient_item.get('id')
-                ),
-                recipe_id=recipe,
-                amount=ingredient_item.get('amount')
-            ) for ingredient_item in ingredients]
-        )
-        for tag in tags:
-            recipe.tags.add(tag)
+    def save_ingredients(self, recipe, amounts, current=None):
+        """Приводит состав рецепта к amounts {ingredient_id: количество}.
+
+        current — уже сохранённые строки {ingredient_id: строка};
+        вставляются, обновляются и удаляются только отличающиеся.
+        """
+        current = current or {}
+        RecipeIngredientAmount.objects.bulk_create([
+            RecipeIngredientAmount(
+                recipe_id=recipe, ingredient_id_id=ingredient_id,
+                amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        ])
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            RecipeIngredientAmount.objects.bulk_update(changed, ['amount'])
+        removed = [
+            item.pk for ingredient_id, item in current.items()
+            if ingredient_id not in amounts
+        ]
+        if removed:
+            RecipeIngredientAmount.objects.filter(pk__in=removed).delete()
+
+    def save_tags(self, recipe, tags, current=()):
+        recipe_tag = Recipe.tags.through
+        tag_ids = {tag.pk for tag in tags}
+        recipe_tag.objects.bulk_create([
+            recipe_tag(recipe_id=recipe.pk, tag_id=tag_id)
+            for tag_id in tag_ids - set(current)
+        ])
+        removed = set(current) - tag_ids
+        if removed:
+            recipe_tag.objects.filter(
+                recipe_id=recipe.pk, tag_id__in=removed
+            ).delete()
 
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(
-            author=self.context.get('request').user,
-            **validated_data
-        )
-        self.ingredient_tags_create(recipe, ingredients, tags)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(
+                author=self.context.get('request').user,
+                **validated_data
+            )
+            self.save_ingredients(recipe, ingredients)
+            self.save_tags(recipe, tags)
         return recipe
 
     def update(self, recipe, validated_data):
+        # Связи пишутся напрямую, без сигналов: кеш ответов и дата
+        # изменения рецепта обновятся при recipe.save(). Счётчики
+        # и similar_computed_at меняются параллельно через UPDATE,
+        # поэтому сохраняются только редактируемые поля.
         recipe.name = validated_data.get('name', recipe.name)
         recipe.text = validated_data.get('text', recipe.text)
         recipe.image = validated_data.get('image', recipe.image)
         recipe.cooking_time = validated_data.get(
             'cooking_time', recipe.cooking_time
         )
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        recipe.tags.clear()
-        recipe.ingredients.clear()
-        recipe.tags.set(tags)
-        self.ingredient_tags_create(recipe, ingredients, tags)
-        recipe.save()
+        with transaction.atomic():
+            if 'tags' in validated_data:
+                self.save_tags(
+                    recipe, validated_data['tags'],
+                    Recipe.tags.through.objects.filter(
+                        recipe_id=recipe.pk
+                    ).values_list('tag_id', flat=True)
+                )
+            if 'ingredients' in validated_data:
+                current = {
+                    item.ingredient_id_id: item for item in
+                    RecipeIngredientAmount.objects.filter(recipe_id=recipe)
+                }
+                old_amounts = {
+                    pk: item.amount for pk, item in current.items()
+                }
+                self.save_ingredients(
+                    recipe, validated_data['ingredients'], current
+                )
+                update_shopping_lists(
+                    recipe, old_amounts, validated_data['ingredients']
+                )
+            recipe.save(update_fields=(
+                'name', 'text', 'image', 'cooking_time', 'updated_at'
+            ))
         return recipe
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'recipeingredientamount_set',
+                queryset=RecipeIngredientAmount.objects.select_related(
+                    'ingredient_id'
+                )
+            ),
+        )
         return RecipeGetSerializer(
             instance, context=context).data
 
@@ -0,0 +1,128 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredientAmount,
+    ShoppingCart,
+    Tag
+)
+from recipes.signals import ingredients_imported, recipes_imported
+from .authentication import token_cache
+from .cache import bump_namespace
+
+FoodgramUser = get_user_model()
+
+# Поля пользователя, которые входят в ответы с рецептами.
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+# Какие кешированные ответы зависят от какой модели.
+DEPENDENT_NAMESPACES = {
+    Recipe: ('recipes',),
+    RecipeIngredientAmount: ('recipes',),
+    Recipe.tags.through: ('recipes',),
+    Tag: ('tags', 'recipes'),
+    Ingredient: ('ingredients', 'recipes'),
+    FoodgramUser: ('recipes',),
+    # Избранное и корзина меняют счётчики для ?ordering=popular.
+    Favorite: ('popularity',),
+    ShoppingCart: ('popularity',),
+}
+
+
+def invalidate_responses(sender, **kwargs):
+    # Повторное повышение версии после коммита отбрасывает ответы,
+    # закешированные параллельными запросами до фиксации транзакции.
+    namespaces = DEPENDENT_NAMESPACES[sender]
+    bump_namespace(*namespaces)
+    transaction.on_commit(partial(bump_namespace, *namespaces))
+
+
+for model in DEPENDENT_NAMESPACES:
+    if model is not FoodgramUser:
+        post_save.connect(
+            invalidate_responses, sender=model, weak=False,
+            dispatch_uid=f'invalidate_responses_save_{model._meta.label}'
+        )
+    post_delete.connect(
+        invalidate_responses, sender=model, weak=False,
+        dispatch_uid=f'invalidate_responses_delete_{model._meta.label}'
+    )
+
+
+@receiver(pre_save, sender=FoodgramUser)
+def author_fields_changing(sender, instance, update_fields, **kwargs):
+    # Вход (last_login), регистрация и смена пароля не меняют ответы
+    # с рецептами: сбрасывать их нужно, только если изменились поля
+    # автора.
+    instance._author_changed = False
+    if instance._state.adding or update_fields is not None and not (
+        set(AUTHOR_FIELDS) & set(update_fields)
+    ):
+        return
+    stored = FoodgramUser.objects.filter(pk=instance.pk).values_list(
+        *AUTHOR_FIELDS
+    ).first()
+    instance._author_changed = stored != tuple(
+        getattr(instance, field) for field in AUTHOR_FIELDS
+    )
+
+
+@receiver(post_save, sender=FoodgramUser)
+def author_changed(sender, instance, **kwargs):
+    if instance.__dict__.pop('_author_changed', False):
+        invalidate_responses(sender)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_responses(sender)
+
+
+@receiver(recipes_imported)
+def recipes_imported_handler(sender, **kwargs):
+    bump_namespace('recipes', 'tags', 'ingredients')
+
+
+@receiver(ingredients_imported)
+def ingredients_imported_handler(sender, **kwargs):
+    bump_namespace('ingredients')
+
+
+def invalidate_tokens(*keys):
+    # Как и с ответами: второй сброс после коммита убирает пользователя,
+    # закешированного параллельным запросом до фиксации изменений.
+    token_cache.invalidate(*keys)
+    transaction.on_commit(partial(token_cache.invalidate, *keys))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=FoodgramUser)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    # Вход обновляет только last_login, токены при этом не сбрасываются.
+    if created or update_fields is not None and not (
+        {'password', 'is_active'} & set(update_fields)
+    ):
+        return
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
+    if keys:
+        invalidate_tokens(*keys)
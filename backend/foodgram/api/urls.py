@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
+from .async_views import async_read_urls
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet
 from .views import FoodgramUserViewSet
 
@@ -10,8 +12,12 @@ router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
 
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_read_urls(router_urls)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
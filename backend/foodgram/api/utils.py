@@ -1,21 +1,116 @@
 import csv
+import json
 
-from django.db.models import Sum
-from django.http.response import HttpResponse
+from django.db.models import F, Sum
+from django.http.response import StreamingHttpResponse
 
+from recipes.models import RecipeIngredientAmount, ShoppingListItem
 
-def download_csv_shopping_cart(recipe_ingredient):
-    ingredients = recipe_ingredient.values(
-        'ingredient_id__name', 'ingredient_id__measurement_unit'
-    ).annotate(ingredient_amount=Sum('amount')).values_list(
-        'ingredient_id__name', 'ingredient_amount',
-        'ingredient_id__measurement_unit',
+EXPORT_CHUNK_SIZE = 500
+SHOPPING_CART_GROUPS = ('unit', 'recipe')
+SHOPPING_LIST_FIELDS = {
+    None: ('ingredient_id__name', 'ingredient_id__measurement_unit'),
+    'unit': ('ingredient_id__measurement_unit', 'ingredient_id__name'),
+}
+RECIPE_BREAKDOWN_FIELDS = (
+    'recipe_id__name',
+    'recipe_id',
+    'ingredient_id__name',
+    'ingredient_id__measurement_unit'
+)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def format_amount(amount):
+    return f'{amount:g}'
+
+
+def shopping_cart_rows(user, group=None):
+    if group == 'recipe':
+        rows = RecipeIngredientAmount.objects.filter(
+            recipe_id__shopping_cart__user_id=user
+        ).values(*RECIPE_BREAKDOWN_FIELDS).annotate(
+            ingredient_amount=Sum('amount')
+        ).order_by(*RECIPE_BREAKDOWN_FIELDS)
+    else:
+        fields = SHOPPING_LIST_FIELDS[group]
+        rows = ShoppingListItem.objects.filter(user_id=user).values(
+            *fields, ingredient_amount=F('amount')
+        ).order_by(*fields)
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'recipe': row.get('recipe_id__name'),
+            'name': row['ingredient_id__name'],
+            'amount': row['ingredient_amount'],
+            'measurement_unit': row['ingredient_id__measurement_unit'],
+        }
+
+
+def render_csv(rows, group):
+    writer = csv.writer(Echo())
+    yield '\ufeff'
+    for row in rows:
+        line = [
+            row['name'],
+            format_amount(row['amount']),
+            row['measurement_unit']
+        ]
+        if group == 'recipe':
+            line.insert(0, row['recipe'])
+        yield writer.writerow(line)
+
+
+def render_txt(rows, group):
+    section_key = 'recipe' if group == 'recipe' else 'measurement_unit'
+    section = None
+    for row in rows:
+        if group is not None and row[section_key] != section:
+            if section is not None:
+                yield '\n'
+            section = row[section_key]
+            yield f'{section}:\n'
+        yield (f'{row["name"]} — {format_amount(row["amount"])} '
+               f'{row["measurement_unit"]}\n')
+
+
+def render_json(rows, group):
+    yield '['
+    separator = ''
+    for row in rows:
+        if group != 'recipe':
+            del row['recipe']
+        yield separator + json.dumps(row, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+SHOPPING_CART_FORMATS = {
+    'csv': ('text/csv', render_csv),
+    'txt': ('text/plain', render_txt),
+    'json': ('application/json', render_json),
+}
+
+
+def download_shopping_cart(user, export_format='csv', group=None):
+    """Отдаёт список покупок потоком, не собирая его в памяти.
+
+    Сводный список читается из ShoppingListItem, разбивка по рецептам
+    считается одним GROUP BY запросом. Строки читаются порциями через
+    iterator(), поэтому размер корзины не влияет на потребление памяти
+    воркером.
+    """
+    content_type, render = SHOPPING_CART_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        (chunk.encode('utf8') for chunk in render(
+            shopping_cart_rows(user, group), group
+        )),
+        content_type=f'{content_type}; charset=utf-8'
+    )
+    response['Content-Disposition'] = (
+        f'attachment;filename="Shoppingcart.{export_format}"'
     )
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = ('attachment;'
-                                       'filename="Shoppingcart.csv"')
-    response.write(u'\ufeff'.encode('utf8'))
-    writer = csv.writer(response)
-    for item in list(ingredients):
-        writer.writerow(item)
     return response
@@ -1,15 +1,28 @@
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Prefetch
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 from djoser.views import UserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .filters import IngredientFilter, RecipeFilter
+from .cache import AnonymousResponseCacheMixin
+from .conditional import ConditionalResponseMixin
+from .filters import RecipeFilter
+from .interactions import invalidate_interactions
+from .metrics import TimingMixin, render_metrics
 from .paginator import FoodgramPagePagination
+from .parsers import StreamingJSONParser
 from .permissions import OwnerOrAdminOrReadOnly
+from .renderers import SHOPPING_CART_RENDERERS
 from .serializers import (
     FoodgramUserSerializer,
     FollowSerializer,
@@ -21,7 +34,9 @@ from .serializers import (
     RecipePostSerializer,
     ShoppingCartSerializer,
     ShoppingCartValidationSerializer,
-    TagSerializer
+    SimilarRecipeSerializer,
+    TagSerializer,
+    get_recipes_limit
 )
 from recipes.models import (
     Favorite,
@@ -31,14 +46,21 @@ from recipes.models import (
     ShoppingCart,
     Tag
 )
+from recipes.feed import feed_recipe_ids
+from recipes.ingredient_index import ingredient_index
+from recipes.services import (
+    add_to_shopping_list,
+    latest_recipes_by_author,
+    remove_from_shopping_list
+)
 from users.models import Follow
-from .utils import download_csv_shopping_cart
+from .utils import SHOPPING_CART_GROUPS, download_shopping_cart
 
 
 FoodgramUser = get_user_model()
 
 
-class FoodgramUserViewSet(UserViewSet):
+class FoodgramUserViewSet(TimingMixin, UserViewSet):
     queryset = FoodgramUser.objects.all()
     serializer_class = FoodgramUserSerializer
     pagination_class = FoodgramPagePagination
@@ -60,6 +82,7 @@ class FoodgramUserViewSet(UserViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            invalidate_interactions(request, 'following')
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         subscription = get_object_or_404(
@@ -68,6 +91,7 @@ class FoodgramUserViewSet(UserViewSet):
             user=request.user
         )
         subscription.delete()
+        invalidate_interactions(request, 'following')
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -78,38 +102,148 @@ class FoodgramUserViewSet(UserViewSet):
         user = request.user
         queryset = FoodgramUser.objects.filter(following__user=user)
         pages = self.paginate_queryset(queryset)
+        recipes = latest_recipes_by_author(
+            [author.id for author in pages], get_recipes_limit(request)
+        )
         serializer = ListFollowRecipeSerializer(
             pages,
             many=True,
-            context={'request': request}
+            context={'request': request, 'recipes': recipes}
         )
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientIndexListMixin:
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return Response(ingredient_index.all())
+
+
+class IngredientViewSet(TimingMixin,
+                        ConditionalResponseMixin,
+                        AnonymousResponseCacheMixin,
+                        IngredientIndexListMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientFilter,)
-    search_fields = ('^name',)
+    cache_namespace = 'ingredients'
+
+    def get_validators(self, request, *args, **kwargs):
+        if self.action != 'list':
+            return super().get_validators(request, *args, **kwargs)
+        # Список отдаётся из индекса, поэтому и валидаторы берутся
+        # из него, без запроса к базе.
+        count, updated_at = ingredient_index.last_modified()
+        return (
+            (count, updated_at, request.query_params.get('name', '')),
+            updated_at
+        )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(TimingMixin,
+                 ConditionalResponseMixin,
+                 AnonymousResponseCacheMixin,
+                 viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    cache_namespace = 'tags'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(TimingMixin,
+                    ConditionalResponseMixin,
+                    AnonymousResponseCacheMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
+    cache_namespace = 'recipes'
+    vary_on_user = True
     pagination_class = FoodgramPagePagination
+    parser_classes = (StreamingJSONParser, FormParser, MultiPartParser)
     permission_classes = (OwnerOrAdminOrReadOnly,)
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    def get_cache_namespaces(self, request):
+        # Счётчики популярности меняются без записи в рецепт, их
+        # изменения сбрасывают только ответы с этой сортировкой.
+        if request.query_params.get('ordering') == 'popular':
+            return (self.cache_namespace, 'popularity')
+        return super().get_cache_namespaces(request)
+
+    def get_queryset(self):
+        if self.action not in ('list', 'retrieve', 'feed'):
+            return self.queryset.all()
+        return self.queryset.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipeingredientamount_set',
+                queryset=RecipeIngredientAmount.objects.select_related(
+                    'ingredient_id'
+                )
+            ),
+        )
+
+    def get_validators(self, request, *args, **kwargs):
+        if self.action != 'retrieve':
+            return None
+        user = request.user
+        flags = {}
+        if user.is_authenticated:
+            flags = {
+                'is_favorited': Exists(Favorite.objects.filter(
+                    user_id=user, recipe_id=OuterRef('pk')
+                )),
+                'is_in_shopping_cart': Exists(ShoppingCart.objects.filter(
+                    user_id=user, recipe_id=OuterRef('pk')
+                )),
+                'is_subscribed': Exists(Follow.objects.filter(
+                    user=user, following=OuterRef('author')
+                )),
+            }
+        state = Recipe.objects.filter(pk=kwargs['pk']).values(
+            'updated_at', 'author__email', 'author__username',
+            'author__first_name', 'author__last_name'
+        ).annotate(
+            tags_updated_at=Max('tags__updated_at'),
+            tags_count=Count('tags', distinct=True),
+            ingredients_updated_at=Max('ingredients__updated_at'),
+            ingredients_count=Count('ingredients', distinct=True),
+            **flags
+        ).first()
+        if state is None:
+            return None
+        last_modified = max(filter(None, (
+            state['updated_at'],
+            state['tags_updated_at'],
+            state['ingredients_updated_at']
+        )))
+        # Для авторизованных ответ зависит от флагов пользователя,
+        # которые Last-Modified не учитывает: им отдаётся только ETag.
+        return (
+            tuple(sorted(state.items())),
+            None if user.is_authenticated else last_modified
+        )
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeGetSerializer
         return RecipePostSerializer
 
+    @action(detail=True)
+    def similar(self, request, pk):
+        # Соседи рассчитаны заранее: один запрос по индексу
+        # (recipe_id, -score), второй — только если соседей нет.
+        recipes = Recipe.objects.filter(similar_to__recipe_id=pk).annotate(
+            score=F('similar_to__score')
+        ).order_by('-score', '-id')
+        serializer = SimilarRecipeSerializer(
+            recipes, many=True, context={'request': request}
+        )
+        if not serializer.data:
+            get_object_or_404(Recipe, pk=pk)
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=('POST', 'DELETE'),
@@ -132,6 +266,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         if request.method == 'POST':
             Favorite.objects.create(user_id=user, recipe_id=recipe)
+            invalidate_interactions(request, 'favorites')
             serializer = FavoriteSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -140,6 +275,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             recipe_id=recipe
         )
         favorite_recipe.delete()
+        invalidate_interactions(request, 'favorites')
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -163,7 +299,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         if request.method == 'POST':
-            ShoppingCart.objects.create(user_id=user, recipe_id=recipe)
+            with transaction.atomic():
+                ShoppingCart.objects.create(user_id=user, recipe_id=recipe)
+                add_to_shopping_list(user, recipe)
+            invalidate_interactions(request, 'shopping_cart')
             serializer = ShoppingCartSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -171,15 +310,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
             user_id=user,
             recipe_id=recipe
         )
-        shopping_cart_recipe.delete()
+        with transaction.atomic():
+            shopping_cart_recipe.delete()
+            remove_from_shopping_list(user, recipe)
+        invalidate_interactions(request, 'shopping_cart')
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=False,
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+    )
+    def feed(self, request):
+        queryset = self.filter_queryset(self.get_queryset().filter(
+            pk__in=feed_recipe_ids(request.user)
+        ))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=SHOPPING_CART_RENDERERS
     )
     def download_shopping_cart(self, request):
-        recipe_ingredient = RecipeIngredientAmount.objects.filter(
-            recipe_id__shopping_cart__user_id=request.user
+        group = request.query_params.get('group')
+        if group is not None and group not in SHOPPING_CART_GROUPS:
+            raise ValidationError({
+                'group': 'Допустимые значения: '
+                         + ', '.join(SHOPPING_CART_GROUPS)
+            })
+        return download_shopping_cart(
+            request.user, request.accepted_renderer.format, group
         )
-        return download_csv_shopping_cart(recipe_ingredient)
+
+
+def metrics(request):
+    """Метрики процесса в текстовом формате Prometheus."""
+    if settings.METRICS_TOKEN and not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {settings.METRICS_TOKEN}'
+    ):
+        return HttpResponse(status=401)
+    return HttpResponse(
+        render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,66 @@
+import psycopg2.extras
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+
+from .pool import close_pools, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    # Базу нельзя удалить или скопировать, пока к ней есть соединения.
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        close_pools(self.connection.settings_dict['NAME'])
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений процесса.
+
+    Вместо открытия соединения на каждый запрос Django берёт его
+    из пула (foodgram/db/pool.py), а при закрытии возвращает обратно.
+    Пул настраивается ключом POOL в DATABASES; без него или
+    с MAX_SIZE = 0 бэкенд работает как django.db.backends.postgresql.
+    """
+
+    creation_class = DatabaseCreation
+    pool = None
+
+    def get_pool_options(self):
+        options = self.settings_dict.get('POOL') or {}
+        # Служебные соединения к базе postgres (создание и удаление
+        # тестовых баз) не держатся открытыми.
+        if not options.get('MAX_SIZE') or self.alias == NO_DB_ALIAS:
+            return None
+        return options
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        options = self.get_pool_options()
+        if options is None:
+            return super().get_new_connection(conn_params)
+        self.pool = get_pool(self.alias, conn_params, options)
+        connection = self.pool.getconn()
+        # Дальше — как в django.db.backends.postgresql.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        if isolation_level is None:
+            self.isolation_level = connection.isolation_level
+        else:
+            self.isolation_level = isolation_level
+            if isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        pool, self.pool = self.pool, None
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
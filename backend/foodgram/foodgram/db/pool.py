@@ -0,0 +1,268 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_UNKNOWN,
+    make_dsn,
+    parse_dsn
+)
+
+_lock = threading.Lock()
+_pools = {}
+_pid = None
+
+
+class Waiter:
+    """Поток, ждущий соединения; getconn обслуживает их по очереди."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        # Переданное соединение или None — место для нового соединения.
+        self.conn = None
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений процесса с проверкой перед выдачей.
+
+    Свободные соединения выдаются в порядке LIFO, чтобы лишние дольше
+    простаивали и закрывались через idle_timeout. Если все max_size
+    соединений заняты, getconn ждёт до timeout секунд, а возвращённое
+    соединение передаётся первому из ожидающих. Соединение, простоявшее
+    без дела дольше check_interval, проверяется запросом SELECT 1,
+    а прожившее дольше max_lifetime закрывается при возврате. В stats
+    копятся счётчики выдач, ожиданий и отброшенных соединений.
+    """
+
+    def __init__(self, dsn, max_size, min_size=1, timeout=10,
+                 idle_timeout=300, check_interval=30, max_lifetime=3600):
+        self.dsn = dsn
+        self.max_size = max_size
+        self.min_size = min(min_size, max_size)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.max_lifetime = max_lifetime
+        self.closing = False
+        self.lock = threading.Lock()
+        # Свободные соединения: (соединение, время возврата).
+        self.idle = []
+        self.in_use = set()
+        self.created = {}
+        self.opening = 0
+        self.waiters = deque()
+        self.stats = {
+            'opened': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'max_wait': 0.0,
+            'timeouts': 0,
+            'failed_checks': 0,
+            'recycled': 0,
+        }
+
+    @property
+    def size(self):
+        return len(self.idle) + len(self.in_use) + self.opening
+
+    def getconn(self):
+        started = time.monotonic()
+        while True:
+            conn, idle = self._checkout(started)
+            if conn is None:
+                conn = self._connect()
+                break
+            if idle < self.check_interval or self._ping(conn):
+                break
+            self._discard(conn, 'failed_checks')
+        waited = time.monotonic() - started
+        with self.lock:
+            self.stats['checkouts'] += 1
+            self.stats['wait_time'] += waited
+            self.stats['max_wait'] = max(self.stats['max_wait'], waited)
+        return conn
+
+    def _checkout(self, started):
+        """Соединение и время его простоя или (None, 0).
+
+        None означает, что место в пуле зарезервировано и соединение
+        нужно открыть — это делается вне блокировки.
+        """
+        with self.lock:
+            # Пока есть очередь, новые запросы встают в её конец.
+            if not self.waiters:
+                now = time.monotonic()
+                while self.idle:
+                    conn, returned = self.idle.pop()
+                    if conn.closed or now - returned > self.idle_timeout:
+                        self._forget(conn)
+                        continue
+                    self.in_use.add(conn)
+                    return conn, now - returned
+                if self.size < self.max_size:
+                    self.opening += 1
+                    return None, 0
+            waiter = Waiter()
+            self.waiters.append(waiter)
+            self.stats['waits'] += 1
+        if not waiter.event.wait(started + self.timeout - time.monotonic()):
+            with self.lock:
+                if not waiter.event.is_set():
+                    self.waiters.remove(waiter)
+                    self.stats['timeouts'] += 1
+                    raise psycopg2.OperationalError(
+                        f'Пул соединений исчерпан: все {self.max_size} '
+                        f'заняты дольше {self.timeout} с'
+                    )
+        return waiter.conn, 0
+
+    def _hand_over(self, conn):
+        """Передаёт соединение или освободившееся место первому в очереди."""
+        if not self.waiters:
+            return False
+        waiter = self.waiters.popleft()
+        if conn is None:
+            self.opening += 1
+        waiter.conn = conn
+        waiter.event.set()
+        return True
+
+    def _connect(self):
+        try:
+            conn = psycopg2.connect(self.dsn)
+        except BaseException:
+            with self.lock:
+                self.opening -= 1
+                self._hand_over(None)
+            raise
+        with self.lock:
+            self.opening -= 1
+            self.in_use.add(conn)
+            self.created[conn] = time.monotonic()
+            self.stats['opened'] += 1
+        return conn
+
+    @staticmethod
+    def _ping(conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _forget(self, conn):
+        self.created.pop(conn, None)
+        if not conn.closed:
+            conn.close()
+
+    def _discard(self, conn, reason=None):
+        with self.lock:
+            if reason:
+                self.stats[reason] += 1
+            self.in_use.discard(conn)
+            self._forget(conn)
+            self._hand_over(None)
+
+    def putconn(self, conn):
+        now = time.monotonic()
+        if self.closing or conn.closed:
+            return self._discard(conn)
+        if now - self.created.get(conn, now) > self.max_lifetime:
+            return self._discard(conn, 'recycled')
+        status = conn.info.transaction_status
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return self._discard(conn)
+        if status != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                return self._discard(conn)
+        with self.lock:
+            if self._hand_over(conn):
+                return
+            self.in_use.discard(conn)
+            self.idle.append((conn, now))
+            # Самые давние свободные соединения закрываются, пока
+            # их больше min_size.
+            while len(self.idle) > self.min_size and (
+                now - self.idle[0][1] > self.idle_timeout
+            ):
+                self._forget(self.idle.pop(0)[0])
+
+    def clear(self):
+        """Закрывает свободные соединения сразу, занятые — при возврате."""
+        with self.lock:
+            self.closing = True
+            for conn, _ in self.idle:
+                self._forget(conn)
+            self.idle = []
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                **self.stats,
+                'in_use': len(self.in_use),
+                'idle': len(self.idle),
+                'waiting': len(self.waiters),
+                'max_size': self.max_size,
+            }
+
+
+def get_pool(alias, conn_params, options):
+    """Пул процесса для базы alias с такими параметрами подключения.
+
+    После fork (воркеры gunicorn с --preload) пулы родителя
+    забываются, не закрываясь: их сокеты принадлежат родителю.
+    """
+    global _pid
+    dsn = make_dsn(**conn_params)
+    with _lock:
+        if _pid != os.getpid():
+            _pools.clear()
+            _pid = os.getpid()
+        pool = _pools.get((alias, dsn))
+        if pool is None:
+            pool = _pools[(alias, dsn)] = ConnectionPool(
+                dsn=dsn,
+                max_size=options['MAX_SIZE'],
+                min_size=options.get('MIN_SIZE', 1),
+                timeout=options.get('TIMEOUT', 10),
+                idle_timeout=options.get('IDLE_TIMEOUT', 300),
+                check_interval=options.get('CHECK_INTERVAL', 30),
+                max_lifetime=options.get('MAX_LIFETIME', 3600),
+            )
+        return pool
+
+
+def close_pools(database=None):
+    """Закрывает пулы процесса (все или к базе database)."""
+    with _lock:
+        for key, pool in list(_pools.items()):
+            if database is None or (
+                parse_dsn(key[1])['dbname'] == database
+            ):
+                pool.clear()
+                del _pools[key]
+
+
+def pool_stats():
+    """Метрики пулов процесса по алиасам баз."""
+    with _lock:
+        pools = list(_pools.items())
+    stats = {}
+    for (alias, _), pool in pools:
+        snapshot = pool.snapshot()
+        if alias in stats:
+            snapshot = {
+                key: max(value, stats[alias][key])
+                if key in ('max_wait', 'max_size')
+                else value + stats[alias][key]
+                for key, value in snapshot.items()
+            }
+        stats[alias] = snapshot
+    return stats
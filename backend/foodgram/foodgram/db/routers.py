@@ -0,0 +1,60 @@
+import contextlib
+import contextvars
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.authtoken.models import Token
+
+# Реплика, из которой читает текущий запрос; None — основная база.
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+# Токены создаются при входе и сразу же используются: их чтение
+# с отстающей реплики давало бы 401.
+PRIMARY_MODELS = (Token,)
+
+
+@contextlib.contextmanager
+def read_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def current_read_alias():
+    return _read_alias.get() or DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """Чтение с реплики, выбранной для запроса, запись — в основную базу.
+
+    Реплику выбирает api.middleware.ReplicaMiddleware только для
+    безопасных запросов к API; вне запроса (команды, сигналы, фоновые
+    потоки) всё идёт в основную базу. Внутри транзакции основной базы
+    чтение тоже идёт в неё, чтобы видеть собственные изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if (
+            alias is None or issubclass(model, PRIMARY_MODELS)
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе Django записал бы объект, прочитанный с реплики,
+        # обратно в неё.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему реплик меняет репликация с основной базы.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,10 +39,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
 
+# Асинхронные представления чтения (api/async_views.py) для запуска
+# под ASGI: foodgram.asgi и воркеры uvicorn.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='False') == 'True'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -61,14 +67,77 @@ TEMPLATES = [
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 
+# foodgram.db — PostgreSQL с пулом соединений процесса (см. POOL).
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
+        'ENGINE': os.getenv('DB_ENGINE', default='foodgram.db'),
         'NAME': os.getenv('DB_NAME', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # С пулом соединение возвращается в него в конце запроса,
+        # поэтому CONN_MAX_AGE > 0 нужен только без пула.
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', default='0')),
+        # pgbouncer в режиме transaction не сохраняет серверные курсоры
+        # между транзакциями, поэтому .iterator() читает всё сразу.
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_PGBOUNCER', default='False') == 'True'
+        ),
+        # Соединений на процесс: MAX_SIZE = 0 отключает пул. Ожидание
+        # свободного соединения — до TIMEOUT секунд, проверка SELECT 1 —
+        # после CHECK_INTERVAL секунд простоя.
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default='10')),
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', default='1')),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default='10')),
+            'IDLE_TIMEOUT': int(
+                os.getenv('DB_POOL_IDLE_TIMEOUT', default='300')
+            ),
+            'CHECK_INTERVAL': int(
+                os.getenv('DB_POOL_CHECK_INTERVAL', default='30')
+            ),
+            'MAX_LIFETIME': int(
+                os.getenv('DB_POOL_MAX_LIFETIME', default='3600')
+            ),
+        },
+    }
+}
+
+# Реплики только для чтения: DB_REPLICAS — хосты PostgreSQL через
+# запятую (для SQLite — файлы баз). В тестах реплики совпадают
+# с основной базой.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', default='').split(',')), 1
+):
+    alias = f'replica{number}'
+    location = 'NAME' if 'sqlite3' in DATABASES['default']['ENGINE'] else 'HOST'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        location: replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.db.routers.ReplicaRouter']
+# Безопасные запросы к этим разделам API читают с реплик, а после
+# записи клиент столько секунд читает из основной базы.
+REPLICA_READ_PATHS = (
+    '/api/recipes/', '/api/tags/', '/api/ingredients/', '/api/users/'
+)
+REPLICA_STICKY_SECONDS = int(
+    os.getenv('REPLICA_STICKY_SECONDS', default='15')
+)
+
+# Покрывающие индексы (INCLUDE) создаются только в PostgreSQL;
+# при запуске на SQLite они пропускаются, о чём предупреждать не нужно.
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
     }
 }
 
@@ -116,10 +185,65 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ]
 }
 
+# Кеш пользователей по токенам: число записей и время жизни в памяти
+# процесса, время жизни в общем кеше CACHES (0 — не использовать).
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default='10000'))
+TOKEN_CACHE_LOCAL_TTL = int(os.getenv('TOKEN_CACHE_LOCAL_TTL', default='10'))
+TOKEN_CACHE_SHARED_TTL = int(
+    os.getenv('TOKEN_CACHE_SHARED_TTL', default='0')
+)
+
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.getenv('IMAGE_UPLOAD_MAX_BYTES', default=str(10 * 2 ** 20))
+)
+
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.getenv('IMAGE_UPLOAD_MAX_PIXELS', default='40000000')
+)
+
+IMAGE_PROCESSING_WORKERS = int(
+    os.getenv('IMAGE_PROCESSING_WORKERS', default='2')
+)
+
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+
+IMAGE_VARIANT_QUALITY = 80
+
+RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_TIMEOUT', default='300')
+)
+
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', default='60')
+)
+
+INTERACTIONS_CACHE_TIMEOUT = int(
+    os.getenv('INTERACTIONS_CACHE_TIMEOUT', default='0')
+)
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', default='300'))
+
+# Лента подписок: сколько последних рецептов хранится у пользователя,
+# с какого числа подписчиков рецепты автора не раскладываются по лентам,
+# а читаются при запросе, и как часто ленты обрезаются до FEED_MAX_LENGTH
+# (раз в FEED_TRIM_INTERVAL рецептов).
+FEED_MAX_LENGTH = int(os.getenv('FEED_MAX_LENGTH', default='500'))
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv('FEED_FANOUT_MAX_FOLLOWERS', default='5000')
+)
+FEED_TRIM_INTERVAL = int(os.getenv('FEED_TRIM_INTERVAL', default='20'))
+
+# Похожие рецепты: сколько соседей хранится у рецепта и какой вес
+# в сходстве у совместных добавлений в избранное (остальное — состав).
+SIMILAR_RECIPES_COUNT = int(os.getenv('SIMILAR_RECIPES_COUNT', default='10'))
+SIMILAR_RECIPES_FAVORITES_WEIGHT = float(
+    os.getenv('SIMILAR_RECIPES_FAVORITES_WEIGHT', default='0.5')
+)
+
 DJOSER = {
     'PERMISSIONS': {
         'user_list': ['rest_framework.permissions.AllowAny'],
@@ -132,3 +256,11 @@ DJOSER = {
     },
     'HIDE_USERS': False,
 }
+
+# Доля запросов, для которых считаются SQL-запросы и этапы DRF;
+# длительность пишется для всех. Метрики отдаются по /metrics
+# (nginx его наружу не проксирует), при METRICS_TOKEN — только
+# с заголовком Authorization: Bearer <METRICS_TOKEN>.
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', default='0.1'))
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', default='True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
@@ -6,25 +6,21 @@ from .models import (
     Recipe,
     RecipeIngredientAmount,
     ShoppingCart,
+    ShoppingListItem,
     Tag
 )
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author', 'image')
-    readonly_fields = ('added_to_favorite_count',)
+    list_display = (
+        'id', 'name', 'author', 'image', 'favorites_count', 'cart_count'
+    )
+    readonly_fields = ('favorites_count', 'cart_count')
     search_fields = ('name', 'author')
     list_filter = ('author', 'name', 'tags')
     empty_value_display = '-пусто-'
 
-    def added_to_favorite_count(self, obj):
-        return obj.favorited.count()
-
-    added_to_favorite_count.short_description = (
-        'Количество добавлений в избранное'
-    )
-
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -58,3 +54,10 @@ class RecipeIngredientAmountAdmin(admin.ModelAdmin):
     list_display = ('id', 'recipe_id', 'ingredient_id', 'amount')
     search_fields = ('recipe_id', 'ingredient_id')
     empty_value_display = '-пусто-'
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user_id', 'ingredient_id', 'amount')
+    search_fields = ('user_id__email', 'ingredient_id__name')
+    empty_value_display = '-пусто-'
@@ -0,0 +1,166 @@
+from collections import defaultdict
+from heapq import merge
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from users.models import Follow, FoodgramUser
+
+from .models import FeedEntry, Recipe
+from .utils import batches
+
+BATCH_SIZE = 1000
+
+
+def _bulk_create(entries):
+    for batch in batches(entries, BATCH_SIZE):
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def trim_feeds(user_ids):
+    """Оставляет в лентах пользователей FEED_MAX_LENGTH последних рецептов.
+
+    Лишние записи находятся оконной функцией ROW_NUMBER в разрезе
+    пользователя и удаляются одним DELETE на пачку пользователей.
+    """
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        ranked = FeedEntry.objects.filter(
+            user_id__in=user_ids[start:start + BATCH_SIZE]
+        ).annotate(feed_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('user_id')],
+            order_by=F('recipe_id').desc(),
+        )).order_by().values('id', 'feed_rank')
+        sql, params = ranked.query.sql_with_params()
+        FeedEntry.objects.filter(pk__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            'WHERE ranked.feed_rank > %s',
+            (*params, settings.FEED_MAX_LENGTH)
+        )).delete()
+
+
+def fan_out_recipes(recipe_ids):
+    """Раскладывает новые рецепты по лентам подписчиков автора.
+
+    Рецепты авторов, у которых больше FEED_FANOUT_MAX_FOLLOWERS
+    подписчиков, не раскладываются: такие ленты дочитываются
+    при запросе (см. feed_recipe_ids). Обрезка лент до FEED_MAX_LENGTH
+    идёт раз в FEED_TRIM_INTERVAL рецептов, так что лента может
+    ненадолго превысить предел.
+    """
+    recipes = defaultdict(list)
+    for recipe_id, author_id in Recipe.objects.filter(
+        pk__in=recipe_ids,
+        author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values_list('id', 'author_id'):
+        recipes[author_id].append(recipe_id)
+    if not recipes:
+        return
+    follows = Follow.objects.filter(following__in=recipes).values_list(
+        'following_id', 'user_id'
+    ).order_by('following_id')
+    trimmed = set()
+
+    def entries():
+        for author_id, rows in groupby(
+            follows.iterator(chunk_size=BATCH_SIZE), key=lambda row: row[0]
+        ):
+            user_ids = [user_id for _, user_id in rows]
+            author_recipes = recipes[author_id]
+            if len(author_recipes) > 1 or (
+                author_recipes[0] % settings.FEED_TRIM_INTERVAL == 0
+            ):
+                trimmed.update(user_ids)
+            for recipe_id in author_recipes:
+                for user_id in user_ids:
+                    yield FeedEntry(user_id_id=user_id, recipe_id_id=recipe_id)
+
+    # Одна вставка на BATCH_SIZE записей, а не на каждого автора.
+    _bulk_create(entries())
+    if trimmed:
+        trim_feeds(trimmed)
+
+
+def schedule_fan_out(recipe_id):
+    transaction.on_commit(lambda: fan_out_recipes([recipe_id]))
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту подписчика последние рецепты автора."""
+    if FoodgramUser.objects.filter(
+        pk=author_id,
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).exists():
+        return
+    recipe_ids = Recipe.objects.filter(author_id=author_id).order_by(
+        '-id'
+    ).values_list('id', flat=True)[:settings.FEED_MAX_LENGTH]
+    _bulk_create(
+        FeedEntry(user_id_id=user_id, recipe_id_id=recipe_id)
+        for recipe_id in recipe_ids
+    )
+    trim_feeds([user_id])
+
+
+def remove_author_from_feed(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe_id__author_id=author_id
+    ).delete()
+
+
+def rebuild_feeds(user_ids=None):
+    """Заполняет ленты заново по текущим подпискам."""
+    with transaction.atomic():
+        entries = FeedEntry.objects.all()
+        follows = Follow.objects.filter(
+            following__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS
+        )
+        if user_ids is not None:
+            entries = entries.filter(user_id__in=user_ids)
+            follows = follows.filter(user__in=user_ids)
+        entries.delete()
+        latest = defaultdict(list)
+        for author_id, recipe_id in Recipe.objects.filter(
+            author__in=follows.values('following')
+        ).order_by('author_id', '-id').values_list('author_id', 'id'):
+            if len(latest[author_id]) < settings.FEED_MAX_LENGTH:
+                latest[author_id].append(recipe_id)
+        follows = list(follows.values_list('user_id', 'following_id'))
+        _bulk_create(
+            FeedEntry(user_id_id=user_id, recipe_id_id=recipe_id)
+            for user_id, author_id in follows
+            for recipe_id in latest[author_id]
+        )
+        trim_feeds({user_id for user_id, _ in follows})
+
+
+def feed_recipe_ids(user):
+    """id рецептов ленты подписок, от новых к старым.
+
+    Сохранённая лента (fan-out on write) сливается с последними
+    рецептами авторов, у которых слишком много подписчиков для
+    раскладки по лентам (fan-out on read). Оба запроса идут по
+    индексам и ограничены FEED_MAX_LENGTH.
+    """
+    limit = settings.FEED_MAX_LENGTH
+    stored = FeedEntry.objects.filter(user_id=user).order_by(
+        '-recipe_id_id'
+    ).values_list('recipe_id', flat=True)[:limit]
+    pulled = Recipe.objects.filter(author__in=Follow.objects.filter(
+        user=user,
+        following__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values('following')).order_by('-id').values_list(
+        'id', flat=True
+    )[:limit]
+    ids = []
+    for recipe_id in merge(stored, pulled, reverse=True):
+        if not ids or ids[-1] != recipe_id:
+            ids.append(recipe_id)
+        if len(ids) == limit:
+            break
+    return ids
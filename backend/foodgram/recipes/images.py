@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+from .utils import batches
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+VARIANTS_DIR = 'images/variants'
+# Формат варианта -> (формат Pillow, расширение, MIME-тип).
+FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def available_formats():
+    # AVIF появился в Pillow 11, для старых версий его добавляет
+    # pillow-avif-plugin. Без поддержки формат просто пропускается.
+    extensions = Image.registered_extensions()
+    return [
+        name for name, (_, extension, _) in FORMATS.items()
+        if f'.{extension}' in extensions
+    ]
+
+
+def content_hash(name):
+    digest = hashlib.sha256()
+    with default_storage.open(name, 'rb') as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_widths(width):
+    widths = [size for size in settings.IMAGE_VARIANT_WIDTHS if size < width]
+    return widths or [width]
+
+
+def save_variant(image, name, pillow_format):
+    # Имя зависит только от содержимого исходника, поэтому одинаковые
+    # загрузки переиспользуют уже готовые файлы.
+    if not default_storage.exists(name):
+        buffer = BytesIO()
+        image.save(
+            buffer, pillow_format, quality=settings.IMAGE_VARIANT_QUALITY
+        )
+        default_storage.save(name, ContentFile(buffer.getvalue()))
+    return name
+
+
+def build_variants(name):
+    """Уменьшенные копии изображения name во всех доступных форматах.
+
+    Возвращает словарь, который сохраняется в Recipe.image_variants:
+    исходное имя, его размеры и списки пар (ширина, имя файла)
+    для каждого формата.
+    """
+    digest = content_hash(name)[:32]
+    with default_storage.open(name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    width, height = image.size
+    variants = {'source': name, 'width': width, 'height': height}
+    for width_limit in variant_widths(width):
+        resized = image.resize(
+            (width_limit, max(1, round(height * width_limit / width))),
+            Image.LANCZOS
+        )
+        for variant in available_formats():
+            pillow_format, extension, _ = FORMATS[variant]
+            variants.setdefault(variant, []).append([
+                width_limit,
+                save_variant(resized, os.path.join(
+                    VARIANTS_DIR, f'{digest}-{width_limit}.{extension}'
+                ), pillow_format)
+            ])
+    return variants
+
+
+def process_recipe_image(recipe_id):
+    try:
+        recipe = Recipe.objects.only('image').get(pk=recipe_id)
+        name = recipe.image.name
+        if not name:
+            return
+        variants = build_variants(name)
+        with transaction.atomic():
+            recipe = Recipe.objects.select_for_update().only(
+                'image', 'image_variants'
+            ).get(pk=recipe_id)
+            # Пока шла обработка, изображение могли заменить.
+            if recipe.image.name != name:
+                return
+            recipe.image_variants = variants
+            recipe.save(update_fields=('image_variants', 'updated_at'))
+    except Recipe.DoesNotExist:
+        pass
+    except FileNotFoundError:
+        logger.warning('Нет файла изображения рецепта %s', recipe_id)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s',
+                         recipe_id)
+
+
+def process_in_worker(recipe_id):
+    # Соединения потока пула закрываются сами только при его завершении,
+    # а потоки живут долго. Вызывающий process_recipe_image напрямую
+    # (команда, тесты) своими соединениями управляет сам.
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                thread_name_prefix='recipe-images'
+            )
+    return _executor
+
+
+def schedule_image_processing(recipe_id):
+    """Ставит обработку изображения в очередь после коммита.
+
+    При IMAGE_PROCESSING_WORKERS = 0 обработка идёт в том же потоке,
+    это удобно для тестов и management-команд.
+    """
+    def submit():
+        if settings.IMAGE_PROCESSING_WORKERS:
+            get_executor().submit(process_in_worker, recipe_id)
+        else:
+            process_recipe_image(recipe_id)
+
+    transaction.on_commit(submit)
+
+
+def schedule_images_processing(recipe_ids):
+    """То же для рецептов, созданных через bulk_create без post_save."""
+    for batch in batches(recipe_ids, BATCH_SIZE):
+        for recipe_id in Recipe.objects.filter(pk__in=batch).exclude(
+            image=''
+        ).values_list('id', flat=True):
+            schedule_image_processing(recipe_id)
@@ -0,0 +1,114 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .models import Ingredient
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+def prefix_distance(query, word):
+    """Расстояние Левенштейна между query и началом word той же длины."""
+    word = word[:len(query)]
+    previous = list(range(len(word) + 1))
+    for row, query_char in enumerate(query, 1):
+        current = [row]
+        for column, word_char in enumerate(word, 1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (query_char != word_char),
+            ))
+        previous = current
+    return previous[-1]
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Справочник небольшой и меняется редко, поэтому держим его целиком:
+    отсортированный список нормализованных названий даёт поиск
+    по префиксу бинарным поиском. Индекс сбрасывается сигналами
+    при изменении Ingredient и по истечении INGREDIENT_INDEX_TTL,
+    чтобы подхватить изменения из других процессов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    def invalidate(self):
+        self._state = None
+
+    def _load(self):
+        rows = Ingredient.objects.order_by('name', 'id').values_list(
+            'id', 'name', 'measurement_unit', 'updated_at'
+        )
+        ingredients = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for pk, name, unit, _ in rows
+        ]
+        keys = sorted(
+            (normalize(item['name']), position)
+            for position, item in enumerate(ingredients)
+        )
+        updated_at = max((row[3] for row in rows), default=None)
+        return time.monotonic(), ingredients, keys, updated_at
+
+    def _get_state(self):
+        state = self._state
+        if state is None or (
+            time.monotonic() - state[0] > settings.INGREDIENT_INDEX_TTL
+        ):
+            with self._lock:
+                if self._state is state:
+                    self._state = self._load()
+                state = self._state
+        return state
+
+    def all(self):
+        return self._get_state()[1]
+
+    def last_modified(self):
+        """Число ингредиентов и последнее изменение на момент загрузки."""
+        _, ingredients, _, updated_at = self._get_state()
+        return len(ingredients), updated_at
+
+    def search(self, query, limit=None):
+        """Префиксные совпадения, затем вхождения подстроки.
+
+        Если ничего не нашлось, допускаются опечатки: одна для коротких
+        запросов, две для запросов длиннее пяти символов.
+        """
+        _, ingredients, keys, _ = self._get_state()
+        query = normalize(query)
+        if not query:
+            return ingredients[:limit]
+        start = bisect_left(keys, (query,))
+        prefix = []
+        for key, position in keys[start:]:
+            if not key.startswith(query):
+                break
+            prefix.append(position)
+        matched = set(prefix)
+        substring = [
+            position for key, position in keys
+            if query in key and position not in matched
+        ]
+        positions = prefix + substring
+        if not positions:
+            max_typos = 1 if len(query) <= 5 else 2
+            positions = [position for _, position in sorted(
+                (distance, position) for distance, position in (
+                    (prefix_distance(query, key), position)
+                    for key, position in keys
+                ) if distance <= max_typos
+            )]
+        return [ingredients[position] for position in positions[:limit]]
+
+
+ingredient_index = IngredientIndex()
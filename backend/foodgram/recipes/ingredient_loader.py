@@ -0,0 +1,118 @@
+import csv
+import json
+import os
+import time
+
+from .models import Ingredient
+from .signals import ingredients_imported
+from .utils import batches
+
+BATCH_SIZE = 1000
+FORMATS = ('csv', 'json')
+HEADER = ('name', 'measurement_unit')
+SAMPLE_SIZE = 4096
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+class DefaultDialect(csv.excel):
+    # Если разделитель не угадан, файл читается как ingredients.csv.
+    delimiter = ';'
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return 'json' if extension in ('json', 'jsonl') else 'csv'
+
+
+def read_csv(file):
+    """Пары (название, единица) из CSV с автоопределением разделителя."""
+    sample = file.read(SAMPLE_SIZE)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+    except csv.Error:
+        dialect = DefaultDialect
+    for row in csv.reader(file, dialect):
+        if not row:
+            continue
+        if tuple(value.strip().lower() for value in row) == HEADER:
+            continue
+        yield row
+
+
+def read_json(file):
+    """Объекты из JSON-массива или JSONL, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    started = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started and buffer:
+            # Внешняя скобка массива снимается один раз: строки-пары
+            # сами начинаются с «[».
+            started = True
+            if buffer.startswith('['):
+                buffer = buffer[1:]
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']') or (eof and not buffer):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            if eof:
+                raise
+            chunk = file.read(JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def read_rows(file, file_format):
+    if file_format == 'csv':
+        yield from read_csv(file)
+        return
+    for item in read_json(file):
+        if isinstance(item, dict):
+            yield [item.get('name'), item.get('measurement_unit')]
+        else:
+            yield item
+
+
+def load_ingredients(rows, batch_size=BATCH_SIZE):
+    """Идемпотентно загружает ингредиенты пачками.
+
+    Повторы отбрасывает уникальное ограничение (name, measurement_unit)
+    через ON CONFLICT DO NOTHING: в Django 3.2 нет update_conflicts,
+    но обновлять и нечего — вся строка и есть естественный ключ.
+    Возвращает статистику: прочитано, создано, некорректных строк
+    и затраченное время.
+    """
+    started = time.perf_counter()
+    before = Ingredient.objects.count()
+    stats = {'read': 0, 'invalid': 0}
+    for rows_batch in batches(rows, batch_size):
+        batch = []
+        for row in rows_batch:
+            if len(row) != 2 or not all(
+                isinstance(value, str) and value.strip() for value in row
+            ):
+                stats['invalid'] += 1
+                continue
+            name, unit = (value.strip() for value in row)
+            batch.append(Ingredient(name=name, measurement_unit=unit))
+        stats['read'] += len(rows_batch)
+        Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+    stats['created'] = Ingredient.objects.count() - before
+    stats['time'] = time.perf_counter() - started
+    if stats['created']:
+        ingredients_imported.send(Ingredient)
+    return stats
+
+
+def load_ingredients_file(path, file_format=None, batch_size=BATCH_SIZE):
+    file_format = file_format or detect_format(path)
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        return load_ingredients(read_rows(file, file_format), batch_size)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import BATCH_SIZE, build_similar_recipes
+
+
+class Command(BaseCommand):
+    help = ('Рассчитывает похожие рецепты по составу и совместным '
+            'добавлениям в избранное. По умолчанию пересчитываются '
+            'только новые и изменённые рецепты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все рецепты.'
+        )
+        parser.add_argument(
+            '--count', type=int,
+            help='Сколько соседей хранить; по умолчанию '
+                 'SIMILAR_RECIPES_COUNT.'
+        )
+        parser.add_argument(
+            '--favorites-weight', type=float,
+            help='Вес избранного от 0 до 1; по умолчанию '
+                 'SIMILAR_RECIPES_FAVORITES_WEIGHT.'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        stats = build_similar_recipes(
+            full=options['full'],
+            count=options['count'],
+            favorites_weight=options['favorites_weight'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            f'Пересчитано рецептов: {stats["computed"]}, обновлено '
+            f'списков соседей: {stats["merged"]}, {stats["time"]:.2f} с'
+        )
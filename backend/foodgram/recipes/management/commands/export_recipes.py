@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from recipes.transfer import BATCH_SIZE, export_recipes
+
+
+class Command(BaseCommand):
+    help = ('Выгружает рецепты с тегами, ингредиентами и авторами '
+            'в формате JSONL (один рецепт на строку).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки, по умолчанию stdout.'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--embed-images', action='store_true',
+            help='Встроить изображения в выгрузку в виде data URI.'
+        )
+
+    def handle(self, *args, **options):
+        output = (
+            self.stdout if options['output'] == '-'
+            else open(options['output'], 'w', encoding='utf8')
+        )
+        exported = 0
+        try:
+            for recipe in export_recipes(
+                options['batch_size'], options['embed_images']
+            ):
+                output.write(json.dumps(recipe, ensure_ascii=False) + '\n')
+                exported += 1
+        finally:
+            if output is not self.stdout:
+                output.close()
+        self.stderr.write(f'Выгружено рецептов: {exported}')
@@ -1,23 +1,40 @@
-import csv
+import os
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
-from recipes.models import Ingredient
+from recipes.ingredient_loader import (BATCH_SIZE, FORMATS, detect_format,
+                                       load_ingredients_file)
 
 
 class Command(BaseCommand):
+    help = ('Загружает ингредиенты из CSV или JSON. Повторный запуск '
+            'не создаёт дубликатов.')
 
-    def handle(self, *args, **options):
-        with open('ingredients.csv', encoding='utf8') as file:
-            reader = csv.reader(file, delimiter=';')
-            next(reader)
-            ingredients = []
-            for row in reader:
-                ingredients.append(
-                    Ingredient(
-                        name=row[0],
-                        measurement_unit=row[1]
-                    )
-                )
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'ingredients.csv'),
+            help='Файл с ингредиентами.'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
 
-        Ingredient.objects.bulk_create(ingredients)
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        stats = load_ingredients_file(
+            options['path'], file_format, options['batch_size']
+        )
+        valid = stats['read'] - stats['invalid']
+        self.stdout.write(
+            f'Прочитано строк: {stats["read"]}, создано: '
+            f'{stats["created"]}, уже было: {valid - stats["created"]}, '
+            f'некорректных: {stats["invalid"]}'
+        )
+        self.stdout.write(
+            f'{stats["time"]:.2f} с, '
+            f'{stats["read"] / max(stats["time"], 1e-9):.0f} строк/с'
+        )
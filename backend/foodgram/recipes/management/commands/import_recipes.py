@@ -0,0 +1,44 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.transfer import BATCH_SIZE, RecipeImporter
+
+
+class Command(BaseCommand):
+    help = ('Загружает рецепты из JSONL, созданного export_recipes. '
+            'Уже загруженные рецепты (тот же автор и название) '
+            'пропускаются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл JSONL, по умолчанию stdin.'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число потоков для декодирования изображений.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        source = (
+            sys.stdin if options['path'] == '-'
+            else open(options['path'], encoding='utf8')
+        )
+        try:
+            stats = RecipeImporter(
+                options['batch_size'], options['workers']
+            ).run(source)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {stats["imported"]}, пропущено: '
+            f'{stats["skipped"]}, ошибок: {stats["errors"]} '
+            f'за {elapsed:.1f} с '
+            f'({stats["imported"] / max(elapsed, 1e-9):.0f} рецептов/с)'
+        ))
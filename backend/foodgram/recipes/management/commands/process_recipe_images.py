@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Создаёт уменьшенные копии изображений для рецептов, '
+            'у которых их ещё нет или они устарели.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Обработать все рецепты, а не только необработанные.'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').values_list(
+            'id', 'image', 'image_variants'
+        )
+        processed = 0
+        for recipe_id, image, variants in recipes.iterator():
+            if options['all'] or variants.get('source') != image:
+                process_recipe_image(recipe_id)
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {processed}'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_feeds
+from users.services import refresh_followers_count
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает число подписчиков авторов и заново '
+            'заполняет ленты подписок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, nargs='+', dest='user_ids',
+            help='Ограничиться лентами пользователей с указанными id.'
+        )
+
+    def handle(self, *args, **options):
+        refresh_followers_count()
+        rebuild_feeds(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны'))
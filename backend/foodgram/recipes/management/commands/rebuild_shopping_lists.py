@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.services import rebuild_shopping_lists, shopping_lists_drift
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает сводные списки покупок из корзин или, '
+            'с флагом --check, только проверяет их на расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить расхождения, ничего не изменяя.'
+        )
+        parser.add_argument(
+            '--user', type=int, nargs='+', dest='user_ids',
+            help='Ограничиться пользователями с указанными id.'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        drift = shopping_lists_drift(user_ids)
+        for (user_id, ingredient_id), (expected, stored) in sorted(
+            drift.items()
+        )[:options['verbosity'] * 10]:
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'ожидается {expected}, хранится {stored}'
+            )
+        if options['check']:
+            if drift:
+                raise CommandError(f'Расхождений: {len(drift)}')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        rebuild_shopping_lists(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны, исправлено расхождений: '
+            f'{len(drift)}'
+        ))
@@ -0,0 +1,103 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_TRIGGERS = """
+CREATE FUNCTION recipes_recipe_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B')
+        || setweight(to_tsvector('russian', coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_recipeingredientamount amount
+            JOIN recipes_ingredient ingredient
+                ON ingredient.id = amount.ingredient_id_id
+            WHERE amount.recipe_id_id = NEW.id
+        ), '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_vector
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector();
+
+CREATE FUNCTION recipes_amount_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE recipes_recipe SET name = name WHERE id IN (
+        SELECT recipe_id_id FROM changed_amounts
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_amount_insert_search_vector
+    AFTER INSERT ON recipes_recipeingredientamount
+    REFERENCING NEW TABLE AS changed_amounts
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_amount_search_vector();
+
+CREATE TRIGGER recipes_amount_delete_search_vector
+    AFTER DELETE ON recipes_recipeingredientamount
+    REFERENCING OLD TABLE AS changed_amounts
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_amount_search_vector();
+
+CREATE FUNCTION recipes_ingredient_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE recipes_recipe SET name = name WHERE id IN (
+        SELECT recipe_id_id FROM recipes_recipeingredientamount
+        WHERE ingredient_id_id = NEW.id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_ingredient_search_vector
+    AFTER UPDATE OF name ON recipes_ingredient
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION recipes_ingredient_search_vector();
+
+UPDATE recipes_recipe SET name = name;
+
+CREATE INDEX recipes_recipe_search_vector_gin
+    ON recipes_recipe USING gin (search_vector);
+"""
+
+DROP_SEARCH_TRIGGERS = """
+DROP INDEX IF EXISTS recipes_recipe_search_vector_gin;
+DROP TRIGGER IF EXISTS recipes_ingredient_search_vector
+    ON recipes_ingredient;
+DROP TRIGGER IF EXISTS recipes_amount_delete_search_vector
+    ON recipes_recipeingredientamount;
+DROP TRIGGER IF EXISTS recipes_amount_insert_search_vector
+    ON recipes_recipeingredientamount;
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector ON recipes_recipe;
+DROP FUNCTION IF EXISTS recipes_ingredient_search_vector();
+DROP FUNCTION IF EXISTS recipes_amount_search_vector();
+DROP FUNCTION IF EXISTS recipes_recipe_search_vector();
+"""
+
+
+def run_on_postgresql(sql):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(SEARCH_TRIGGERS),
+            run_on_postgresql(DROP_SEARCH_TRIGGERS),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Оставляет по одному ингредиенту на пару (название, единица).
+
+    Ссылки из рецептов и списков покупок переносятся на оставшуюся
+    запись; если она там уже есть, количества складываются.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep=Min('id'), total=Count('id')).filter(total__gt=1)
+    for group in duplicates:
+        extra = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep']).values_list('id', flat=True))
+        for model_name, owner in (
+            ('RecipeIngredientAmount', 'recipe_id'),
+            ('ShoppingListItem', 'user_id'),
+        ):
+            model = apps.get_model('recipes', model_name)
+            for item in model.objects.filter(ingredient_id__in=extra):
+                kept = model.objects.filter(**{
+                    owner: getattr(item, f'{owner}_id'),
+                    'ingredient_id': group['keep'],
+                }).first()
+                if kept is None:
+                    item.ingredient_id_id = group['keep']
+                    item.save(update_fields=['ingredient_id'])
+                else:
+                    kept.amount += item.amount
+                    kept.save(update_fields=['amount'])
+                    item.delete()
+        Ingredient.objects.filter(id__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique ingredient name'
+            ),
+        ),
+    ]
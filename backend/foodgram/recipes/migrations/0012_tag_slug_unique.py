@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def fill_tag_slugs(apps, schema_editor):
+    """Пустые slug заполняются из названия, повторы получают суффикс id."""
+    Tag = apps.get_model('recipes', 'Tag')
+    seen = set()
+    for tag in Tag.objects.order_by('id'):
+        slug = tag.slug or slugify(tag.name) or f'tag-{tag.id}'
+        if slug in seen:
+            slug = f'{slug[:40]}-{tag.id}'
+        seen.add(slug)
+        if slug != tag.slug:
+            tag.slug = slug
+            tag.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_ingredient_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_tag_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tag',
+            name='slug',
+            field=models.SlugField(unique=True, verbose_name='Slug'),
+        ),
+    ]
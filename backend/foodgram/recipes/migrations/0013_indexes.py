@@ -0,0 +1,132 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Составные индексы под фильтры и соединения API.
+
+    Сначала создаются новые индексы, затем удаляются одиночные индексы
+    внешних ключей, которые они покрывают.
+    """
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0012_tag_slug_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['author', '-id'], name='recipe_author_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(
+                fields=['recipe_id', 'user_id'],
+                name='favorite_recipe_user_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(
+                fields=['recipe_id', 'user_id'], name='cart_recipe_user_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredientamount',
+            index=models.Index(
+                fields=['recipe_id'], include=('ingredient_id', 'amount'),
+                name='ria_recipe_covering_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglistitem',
+            index=models.Index(
+                fields=['user_id'], include=('ingredient_id', 'amount'),
+                name='shopping_list_covering_idx'
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredientamount',
+            constraint=models.UniqueConstraint(
+                fields=('recipe_id', 'ingredient_id'),
+                name='unique recipe ingredient'
+            ),
+        ),
+        migrations.RemoveConstraint(
+            model_name='recipeingredientamount',
+            name='unique ingredient',
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='author', to=settings.AUTH_USER_MODEL,
+                verbose_name='Автор'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredientamount',
+            name='recipe_id',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to='recipes.recipe', verbose_name='Рецепт'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='recipe_id',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='favorited', to='recipes.recipe',
+                verbose_name='Рецепт'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='user_id',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='favorited', to=settings.AUTH_USER_MODEL,
+                verbose_name='Пользователь'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='recipe_id',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='shopping_cart', to='recipes.recipe',
+                verbose_name='Рецепт'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='user_id',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='shopping_cart', to=settings.AUTH_USER_MODEL,
+                verbose_name='Пользователь'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='shoppinglistitem',
+            name='user_id',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='shopping_list', to=settings.AUTH_USER_MODEL,
+                verbose_name='Пользователь'
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_recipe_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    counters = {}
+    for model_name, field in (
+        ('Favorite', 'favorites_count'), ('ShoppingCart', 'cart_count')
+    ):
+        model = apps.get_model('recipes', model_name)
+        counters[field] = Coalesce(Subquery(
+            model.objects.filter(recipe_id=OuterRef('pk')).order_by().values(
+                'recipe_id'
+            ).annotate(total=Count('id')).values('total')
+        ), 0)
+    Recipe.objects.update(**counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False,
+                verbose_name='Добавлений в избранное'
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False,
+                verbose_name='Добавлений в корзину'
+            ),
+        ),
+        migrations.RunPython(fill_recipe_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-favorites_count', '-cart_count', '-id'],
+                name='recipe_popular_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['cooking_time', '-id'],
+                name='recipe_cooking_time_idx'
+            ),
+        ),
+    ]
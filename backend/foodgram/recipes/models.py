@@ -1,4 +1,5 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -8,7 +9,11 @@ from users.models import FoodgramUser
 class Tag(models.Model):
     name = models.CharField(max_length=50, verbose_name='Тег')
     color = ColorField(default='#FF0000', verbose_name='Цвет')
-    slug = models.CharField(max_length=50, null=True, verbose_name='Slug')
+    slug = models.SlugField(max_length=50, unique=True, verbose_name='Slug')
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -25,22 +30,40 @@ class Ingredient(models.Model):
         max_length=50,
         verbose_name='Единица измерения'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
+        constraints = (
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique ingredient name'
+            ),
+        )
 
     def __str__(self):
         return self.name
 
 
+class RecipeManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
 class Recipe(models.Model):
     tags = models.ManyToManyField(Tag, verbose_name='Теги')
+    # Одиночные индексы внешних ключей не создаются там, где ключ
+    # первым столбцом входит в составной индекс или ограничение.
     author = models.ForeignKey(
         FoodgramUser,
         on_delete=models.CASCADE,
         related_name='author',
+        db_index=False,
         verbose_name='Автор'
     )
     ingredients = models.ManyToManyField(
@@ -58,6 +81,12 @@ class Recipe(models.Model):
         upload_to='images/',
         verbose_name='Изображение'
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения'
+    )
     text = models.TextField(verbose_name='Текст')
     cooking_time = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(
@@ -66,11 +95,51 @@ class Recipe(models.Model):
         )],
         verbose_name='Время приготовления'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное'
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в корзину'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    similar_computed_at = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name='Дата расчёта похожих рецептов'
+    )
+
+    objects = RecipeManager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-id']
+        indexes = (
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_id_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-cart_count', '-id'],
+                name='recipe_popular_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', '-id'],
+                name='recipe_cooking_time_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -80,6 +149,7 @@ class RecipeIngredientAmount(models.Model):
     recipe_id = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Рецепт'
     )
     ingredient_id = models.ForeignKey(
@@ -102,8 +172,18 @@ class RecipeIngredientAmount(models.Model):
         verbose_name_plural = 'Количество ингредиентов'
         constraints = (
             models.UniqueConstraint(
-                fields=['ingredient_id', 'recipe_id'],
-                name='unique ingredient'
+                fields=['recipe_id', 'ingredient_id'],
+                name='unique recipe ingredient'
+            ),
+        )
+        # Состав рецепта и суммирование по корзине читаются только
+        # из индекса. INCLUDE поддерживает PostgreSQL, в SQLite индекс
+        # не создаётся.
+        indexes = (
+            models.Index(
+                fields=['recipe_id'],
+                include=['ingredient_id', 'amount'],
+                name='ria_recipe_covering_idx'
             ),
         )
 
@@ -117,12 +197,14 @@ class Favorite(models.Model):
         FoodgramUser,
         on_delete=models.CASCADE,
         related_name='favorited',
+        db_index=False,
         verbose_name='Пользователь'
     )
     recipe_id = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
         related_name='favorited',
+        db_index=False,
         verbose_name='Рецепт'
     )
 
@@ -135,6 +217,12 @@ class Favorite(models.Model):
                 name='unique favorite'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=['recipe_id', 'user_id'],
+                name='favorite_recipe_user_idx'
+            ),
+        )
 
     def __str__(self):
         return (f'{self.user_id.first_name} {self.user_id.last_name} '
@@ -146,12 +234,14 @@ class ShoppingCart(models.Model):
         FoodgramUser,
         on_delete=models.CASCADE,
         related_name='shopping_cart',
+        db_index=False,
         verbose_name='Пользователь'
     )
     recipe_id = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
         related_name='shopping_cart',
+        db_index=False,
         verbose_name='Рецепт'
     )
 
@@ -164,7 +254,118 @@ class ShoppingCart(models.Model):
                 name='unique shopping сart'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=['recipe_id', 'user_id'],
+                name='cart_recipe_user_idx'
+            ),
+        )
 
     def __str__(self):
         return (f'{self.user_id.first_name} {self.user_id.last_name} '
                 f'добавил в корзину {self.recipe_id.name}')
+
+
+class ShoppingListItem(models.Model):
+    user_id = models.ForeignKey(
+        FoodgramUser,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        db_index=False,
+        verbose_name='Пользователь'
+    )
+    ingredient_id = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    amount = models.FloatField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Сводные списки покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user_id', 'ingredient_id'],
+                name='unique shopping list item'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=['user_id'],
+                include=['ingredient_id', 'amount'],
+                name='shopping_list_covering_idx'
+            ),
+        )
+
+    def __str__(self):
+        return (f'{self.user_id_id}: {self.ingredient_id.name} - '
+                f'{self.amount} {self.ingredient_id.measurement_unit}')
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя (fan-out on write)."""
+    user_id = models.ForeignKey(
+        FoodgramUser,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        db_index=False,
+        verbose_name='Пользователь'
+    )
+    recipe_id = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user_id', 'recipe_id'],
+                name='unique feed entry'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id_id}: {self.recipe_id_id}'
+
+
+class SimilarRecipe(models.Model):
+    """Один из ближайших соседей рецепта, рассчитанных заранее."""
+    recipe_id = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        db_index=False,
+        verbose_name='Рецепт'
+    )
+    similar_id = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['recipe_id', 'similar_id'],
+                name='unique similar recipe'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=['recipe_id', '-score'],
+                name='similar_recipe_score_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe_id_id} ~ {self.similar_id_id}: {self.score:.3f}'
@@ -0,0 +1,36 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import Recipe
+
+SEARCH_CONFIG = 'russian'
+
+
+def search_recipes(queryset, query):
+    """Фильтрует рецепты по запросу и упорядочивает по релевантности.
+
+    На PostgreSQL используется полнотекстовый поиск по search_vector
+    (название, описание и ингредиенты; вектор поддерживают триггеры
+    из миграции 0008, по нему построен GIN-индекс). На остальных
+    базах — поиск подстроки с ранжированием: совпадение в названии
+    выше совпадения в описании и ингредиентах.
+    """
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-id')
+    matches = Recipe.objects.filter(
+        Q(name__icontains=query)
+        | Q(text__icontains=query)
+        | Q(ingredients__name__icontains=query)
+    ).values('pk')
+    return queryset.filter(pk__in=matches).annotate(rank=Case(
+        When(name__icontains=query, then=Value(2)),
+        When(text__icontains=query, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )).order_by('-rank', '-id')
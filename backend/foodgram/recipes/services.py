@@ -0,0 +1,229 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from users.models import FoodgramUser
+
+from .models import (
+    Favorite,
+    Recipe,
+    RecipeIngredientAmount,
+    ShoppingCart,
+    ShoppingListItem
+)
+
+BATCH_SIZE = 1000
+AMOUNT_PRECISION = 6
+
+
+def change_recipes_count(author_id, delta):
+    FoodgramUser.objects.filter(pk=author_id).update(
+        recipes_count=F('recipes_count') + delta
+    )
+
+
+def change_recipe_counter(recipe_id, field, delta, **changes):
+    Recipe.objects.filter(pk=recipe_id).update(
+        **{field: F(field) + delta}, **changes
+    )
+
+
+def refresh_recipe_counters(recipes=None):
+    """Пересчитывает favorites_count и cart_count одним UPDATE."""
+    if recipes is None:
+        recipes = Recipe.objects.all()
+    recipes.update(**{
+        field: Coalesce(Subquery(
+            model.objects.filter(recipe_id=OuterRef('pk')).order_by().values(
+                'recipe_id'
+            ).annotate(total=Count('id')).values('total')
+        ), 0)
+        for model, field in (
+            (Favorite, 'favorites_count'), (ShoppingCart, 'cart_count')
+        )
+    })
+
+
+def refresh_recipes_count(authors=None):
+    """Пересчитывает счётчик рецептов одним UPDATE.
+
+    Нужен после массовых вставок (bulk_create), которые не вызывают
+    сигналы.
+    """
+    counts = Recipe.objects.filter(author=OuterRef('pk')).order_by().values(
+        'author'
+    ).annotate(total=Count('id')).values('total')
+    if authors is None:
+        authors = FoodgramUser.objects.all()
+    authors.update(recipes_count=Coalesce(Subquery(counts), 0))
+
+
+def latest_recipes_by_author(author_ids, limit=None):
+    """Возвращает {author_id: [рецепты]} одним запросом.
+
+    При заданном limit у каждого автора остаются только limit
+    последних рецептов: они нумеруются оконной функцией ROW_NUMBER
+    в разрезе автора, а отсечение делается во внешнем запросе.
+    """
+    recipes = Recipe.objects.filter(author__in=author_ids)
+    if limit is not None:
+        ranked = recipes.annotate(recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=F('id').desc(),
+        )).order_by()
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked '
+            'WHERE ranked.recipe_rank <= %s '
+            'ORDER BY ranked.recipe_rank',
+            (*params, limit)
+        )
+    grouped = defaultdict(list)
+    for recipe in recipes:
+        grouped[recipe.author_id].append(recipe)
+    return grouped
+
+
+def recipe_amounts(recipe):
+    return dict(RecipeIngredientAmount.objects.filter(
+        recipe_id=recipe
+    ).values_list('ingredient_id', 'amount'))
+
+
+def amounts_delta(old, new):
+    delta = {
+        ingredient: new.get(ingredient, 0) - old.get(ingredient, 0)
+        for ingredient in old.keys() | new.keys()
+    }
+    return {
+        ingredient: amount for ingredient, amount in delta.items()
+        if round(amount, AMOUNT_PRECISION)
+    }
+
+
+def change_shopping_lists(user_ids, delta):
+    """Прибавляет delta {ingredient_id: количество} к спискам покупок.
+
+    Существующие позиции обновляются одним bulk_update, новые
+    создаются одним bulk_create, обнулившиеся удаляются.
+    """
+    user_ids = list(user_ids)
+    if not user_ids or not delta:
+        return
+    with transaction.atomic():
+        items = {
+            (item.user_id_id, item.ingredient_id_id): item
+            for item in ShoppingListItem.objects.select_for_update().filter(
+                user_id__in=user_ids, ingredient_id__in=delta.keys()
+            )
+        }
+        created, updated, deleted = [], [], []
+        for user_id in user_ids:
+            for ingredient_id, amount in delta.items():
+                item = items.get((user_id, ingredient_id))
+                if item is None:
+                    item = ShoppingListItem(
+                        user_id_id=user_id,
+                        ingredient_id_id=ingredient_id,
+                        amount=0
+                    )
+                    created.append(item)
+                else:
+                    updated.append(item)
+                item.amount = round(item.amount + amount, AMOUNT_PRECISION)
+        for item in created + updated:
+            if item.amount <= 0:
+                deleted.append(item)
+        created = [item for item in created if item.amount > 0]
+        updated = [item for item in updated if item.amount > 0]
+        ShoppingListItem.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        ShoppingListItem.objects.bulk_update(
+            updated, ['amount'], batch_size=BATCH_SIZE
+        )
+        ShoppingListItem.objects.filter(
+            pk__in=[item.pk for item in deleted if item.pk]
+        ).delete()
+
+
+def add_to_shopping_list(user, recipe):
+    change_shopping_lists([user.pk], recipe_amounts(recipe))
+
+
+def remove_from_shopping_list(user, recipe):
+    change_shopping_lists([user.pk], amounts_delta(recipe_amounts(recipe), {}))
+
+
+def update_shopping_lists(recipe, old_amounts, new_amounts=None):
+    """Переносит изменение состава рецепта в списки покупок.
+
+    Затрагивает только пользователей, у которых рецепт в корзине,
+    и только ингредиенты, количество которых изменилось. Если
+    new_amounts не передан, новый состав читается из базы.
+    """
+    if new_amounts is None:
+        new_amounts = recipe_amounts(recipe)
+    delta = amounts_delta(old_amounts, new_amounts)
+    if delta:
+        change_shopping_lists(
+            ShoppingCart.objects.filter(
+                recipe_id=recipe
+            ).values_list('user_id', flat=True),
+            delta
+        )
+
+
+def expected_shopping_lists(user_ids=None):
+    if user_ids is None:
+        lookup = {'recipe_id__shopping_cart__isnull': False}
+    else:
+        lookup = {'recipe_id__shopping_cart__user_id__in': user_ids}
+    rows = RecipeIngredientAmount.objects.filter(**lookup).values_list(
+        'recipe_id__shopping_cart__user_id', 'ingredient_id'
+    ).annotate(total=Sum('amount')).order_by()
+    return {
+        (user_id, ingredient_id): round(total, AMOUNT_PRECISION)
+        for user_id, ingredient_id, total in rows.iterator(
+            chunk_size=BATCH_SIZE
+        )
+    }
+
+
+def shopping_lists_drift(user_ids=None):
+    """Сравнивает сводные списки с корзинами.
+
+    Возвращает словарь {(user_id, ingredient_id): (ожидается, хранится)}
+    для всех расхождений.
+    """
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    stored = {
+        (user_id, ingredient_id): round(amount, AMOUNT_PRECISION)
+        for user_id, ingredient_id, amount in items.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        ).iterator(chunk_size=BATCH_SIZE)
+    }
+    expected = expected_shopping_lists(user_ids)
+    return {
+        key: (expected.get(key), stored.get(key))
+        for key in expected.keys() | stored.keys()
+        if expected.get(key) != stored.get(key)
+    }
+
+
+def rebuild_shopping_lists(user_ids=None):
+    with transaction.atomic():
+        items = ShoppingListItem.objects.all()
+        if user_ids is not None:
+            items = items.filter(user_id__in=user_ids)
+        items.delete()
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(
+                user_id_id=user_id, ingredient_id_id=ingredient_id,
+                amount=amount
+            ) for (user_id, ingredient_id), amount
+            in expected_shopping_lists(user_ids).items()
+        ], batch_size=BATCH_SIZE)
@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from users.models import Follow
+
+from .feed import (
+    backfill_feed,
+    fan_out_recipes,
+    remove_author_from_feed,
+    schedule_fan_out
+)
+from .images import schedule_image_processing, schedule_images_processing
+from .ingredient_index import ingredient_index
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredientAmount,
+    ShoppingCart
+)
+from .services import (
+    amounts_delta,
+    change_recipe_counter,
+    change_recipes_count,
+    change_shopping_lists,
+    recipe_amounts
+)
+
+# Отправляются после массовой загрузки (bulk_create не вызывает
+# post_save). Аргумент recipes_imported: recipe_ids.
+recipes_imported = Signal()
+ingredients_imported = Signal()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_recipes_count(instance.author_id, 1)
+        schedule_fan_out(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, update_fields, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if instance.image and (
+        instance.image.name != instance.image_variants.get('source')
+    ):
+        schedule_image_processing(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_recipes_count(instance.author_id, -1)
+
+
+@receiver(recipes_imported)
+def imported_recipes_fan_out(sender, recipe_ids, **kwargs):
+    fan_out_recipes(recipe_ids)
+
+
+@receiver(recipes_imported)
+def imported_recipes_images(sender, recipe_ids, **kwargs):
+    schedule_images_processing(recipe_ids)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: backfill_feed(
+            instance.user_id, instance.following_id
+        ))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    remove_author_from_feed(instance.user_id, instance.following_id)
+
+
+# Счётчики популярности рецепта по моделям взаимодействий.
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'cart_count',
+}
+
+
+def interaction_changes(sender):
+    # Избранное не меняет updated_at, а от него зависит сходство
+    # рецептов: тем же UPDATE рецепт отмечается для пересчёта похожих.
+    return {'similar_computed_at': None} if sender is Favorite else {}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_interaction_added(sender, instance, created, **kwargs):
+    if created:
+        change_recipe_counter(
+            instance.recipe_id_id, RECIPE_COUNTERS[sender], 1,
+            **interaction_changes(sender)
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_interaction_removed(sender, instance, **kwargs):
+    change_recipe_counter(
+        instance.recipe_id_id, RECIPE_COUNTERS[sender], -1,
+        **interaction_changes(sender)
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_lists(sender, instance, **kwargs):
+    change_shopping_lists(
+        ShoppingCart.objects.filter(
+            recipe_id=instance
+        ).values_list('user_id', flat=True),
+        amounts_delta(recipe_amounts(instance), {})
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(ingredients_imported)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+def touch_recipes(recipe_ids):
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_recipes([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(pk_set)
+    elif action == 'pre_clear':
+        touch_recipes(instance.recipe_set.values('pk'))
+
+
+@receiver(post_save, sender=RecipeIngredientAmount)
+def recipe_amount_changed(sender, instance, created, **kwargs):
+    # Добавление и удаление ингредиента меняют их число в валидаторе
+    # ETag, а изменение количества нужно отметить на самом рецепте.
+    if not created:
+        touch_recipes([instance.recipe_id_id])
@@ -0,0 +1,215 @@
+import heapq
+import math
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Favorite, Recipe, RecipeIngredientAmount, SimilarRecipe
+from .utils import batches
+
+BATCH_SIZE = 1000
+# Ингредиенты, которые есть больше чем в такой доле рецептов (соль,
+# вода, сахар), почти ничего не говорят о сходстве, а обходить их
+# списки дороже всего. На маленьких базах не отбрасываются.
+MAX_INGREDIENT_SHARE = 0.2
+MIN_COMMON_INGREDIENT_RECIPES = 1000
+
+
+class SimilarityModel:
+    """Разреженные векторы рецептов в памяти.
+
+    Рецепт описывается набором ингредиентов с весами IDF и множеством
+    пользователей, добавивших его в избранное. Сходство — взвешенная
+    сумма косинусов по обоим векторам. Скалярные произведения
+    считаются через обратные индексы (ингредиент -> рецепты,
+    пользователь -> избранное), поэтому перебираются только рецепты
+    с общими ингредиентами или поклонниками.
+    """
+
+    def __init__(self, favorites_weight=None):
+        if favorites_weight is None:
+            favorites_weight = settings.SIMILAR_RECIPES_FAVORITES_WEIGHT
+        self.favorites_weight = favorites_weight
+        self.ingredients = defaultdict(list)
+        self.recipes_by_ingredient = defaultdict(list)
+        for recipe_id, ingredient_id in (
+            RecipeIngredientAmount.objects.order_by().values_list(
+                'recipe_id', 'ingredient_id'
+            ).iterator(chunk_size=BATCH_SIZE)
+        ):
+            self.ingredients[recipe_id].append(ingredient_id)
+            self.recipes_by_ingredient[ingredient_id].append(recipe_id)
+        self.fans = defaultdict(list)
+        self.favorites = defaultdict(list)
+        for recipe_id, user_id in Favorite.objects.order_by().values_list(
+            'recipe_id', 'user_id'
+        ).iterator(chunk_size=BATCH_SIZE):
+            self.fans[recipe_id].append(user_id)
+            self.favorites[user_id].append(recipe_id)
+
+        total = len(self.ingredients)
+        common = max(
+            MAX_INGREDIENT_SHARE * total, MIN_COMMON_INGREDIENT_RECIPES
+        )
+        self.weights = {
+            ingredient_id: math.log(1 + total / len(recipe_ids)) ** 2
+            for ingredient_id, recipe_ids in self.recipes_by_ingredient.items()
+            if len(recipe_ids) <= common
+        }
+        self.norms = {
+            recipe_id: math.sqrt(sum(
+                self.weights.get(ingredient_id, 0)
+                for ingredient_id in ingredient_ids
+            ))
+            for recipe_id, ingredient_ids in self.ingredients.items()
+        }
+
+    def scores(self, recipe_id):
+        """Сходство рецепта со всеми рецептами, где оно больше нуля."""
+        weight = self.favorites_weight
+        scores = defaultdict(float)
+        norm = self.norms.get(recipe_id)
+        if norm and weight < 1:
+            products = defaultdict(float)
+            for ingredient_id in self.ingredients[recipe_id]:
+                ingredient_weight = self.weights.get(ingredient_id)
+                if ingredient_weight is None:
+                    continue
+                for other in self.recipes_by_ingredient[ingredient_id]:
+                    products[other] += ingredient_weight
+            for other, product in products.items():
+                scores[other] += (1 - weight) * product / (
+                    norm * self.norms[other]
+                )
+        fans = self.fans.get(recipe_id)
+        if fans and weight:
+            common = defaultdict(int)
+            for user_id in fans:
+                for other in self.favorites[user_id]:
+                    common[other] += 1
+            for other, count in common.items():
+                scores[other] += weight * count / math.sqrt(
+                    len(fans) * len(self.fans[other])
+                )
+        scores.pop(recipe_id, None)
+        return scores
+
+
+def top(scores, count):
+    """count лучших пар (сходство, id); при равенстве — более новые."""
+    return heapq.nlargest(
+        count, ((score, other) for other, score in scores.items())
+    )
+
+
+def save_neighbours(neighbours, computed_at=None):
+    """Заменяет списки соседей рецептов одной транзакцией."""
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=neighbours).delete()
+        SimilarRecipe.objects.bulk_create([
+            SimilarRecipe(
+                recipe_id_id=recipe_id, similar_id_id=other, score=score
+            )
+            for recipe_id, pairs in neighbours.items()
+            for score, other in pairs
+        ], batch_size=BATCH_SIZE)
+        if computed_at is not None:
+            Recipe.objects.filter(pk__in=neighbours).update(
+                similar_computed_at=computed_at
+            )
+
+
+def stale_recipes():
+    """Рецепты без рассчитанных соседей или изменённые после расчёта.
+
+    Добавление в избранное и удаление из него сбрасывают
+    similar_computed_at (recipes.signals), поэтому такие рецепты тоже
+    попадают сюда.
+    """
+    return Recipe.objects.filter(
+        Q(similar_computed_at__isnull=True)
+        | Q(updated_at__gt=F('similar_computed_at'))
+    )
+
+
+def build_similar_recipes(full=False, count=None, favorites_weight=None,
+                          batch_size=BATCH_SIZE):
+    """Рассчитывает похожие рецепты и возвращает статистику.
+
+    По умолчанию пересчитываются только рецепты из stale_recipes(),
+    а сами они вливаются в списки остальных рецептов; с full=True —
+    все рецепты. Каждая пачка из batch_size рецептов записывается
+    своей транзакцией, поэтому API продолжает отдавать прежние
+    списки, пока идёт расчёт. Веса IDF меняются при любом изменении
+    состава, так что списки, не затронутые изменениями, уточняются
+    только полным пересчётом.
+    """
+    count = count or settings.SIMILAR_RECIPES_COUNT
+    started = time.perf_counter()
+    # Рецепты, изменённые во время расчёта, останутся устаревшими.
+    computed_at = timezone.now()
+    recipes = Recipe.objects.all() if full else stale_recipes()
+    recipe_ids = list(recipes.order_by('id').values_list('id', flat=True))
+    stats = {'computed': len(recipe_ids), 'merged': 0}
+    if recipe_ids:
+        model = SimilarityModel(favorites_weight)
+        changed = set(recipe_ids)
+        candidates = defaultdict(dict)
+        for batch in batches(recipe_ids, batch_size):
+            neighbours = {}
+            for recipe_id in batch:
+                scores = model.scores(recipe_id)
+                neighbours[recipe_id] = top(scores, count)
+                if not full:
+                    for other, score in scores.items():
+                        if other not in changed:
+                            candidates[other][recipe_id] = score
+            save_neighbours(neighbours, computed_at)
+        if not full:
+            stats['merged'] = merge_changed(
+                model, changed, candidates, count, batch_size
+            )
+    stats['time'] = time.perf_counter() - started
+    return stats
+
+
+def merge_changed(model, changed, candidates, count, batch_size):
+    """Вливает пересчитанные рецепты в списки остальных рецептов.
+
+    Список, из которого изменённый рецепт выпал или где его сходство
+    снизилось, пересчитывается целиком: иначе место занял бы не тот,
+    кто был следующим. Возвращает число изменённых списков.
+    """
+    for batch in batches(changed, batch_size):
+        for recipe_id in SimilarRecipe.objects.filter(
+            similar_id__in=batch
+        ).values_list('recipe_id', flat=True):
+            if recipe_id not in changed:
+                candidates.setdefault(recipe_id, {})
+    merged = 0
+    for batch in batches(sorted(candidates), batch_size):
+        current = defaultdict(dict)
+        for recipe_id, other, score in SimilarRecipe.objects.filter(
+            recipe_id__in=batch
+        ).values_list('recipe_id', 'similar_id', 'score'):
+            current[recipe_id][other] = score
+        neighbours = {}
+        for recipe_id in batch:
+            pairs = current[recipe_id]
+            updates = candidates[recipe_id]
+            if any(
+                updates.get(other, 0) < score
+                for other, score in pairs.items() if other in changed
+            ):
+                result = top(model.scores(recipe_id), count)
+            else:
+                result = top({**pairs, **updates}, count)
+            if result != top(pairs, count):
+                neighbours[recipe_id] = result
+        save_neighbours(neighbours)
+        merged += len(neighbours)
+    return merged
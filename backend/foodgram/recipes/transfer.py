@@ -0,0 +1,322 @@
+import base64
+import binascii
+import hashlib
+import json
+import math
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .models import Ingredient, Recipe, RecipeIngredientAmount, Tag
+from .services import refresh_recipes_count
+from .signals import ingredients_imported, recipes_imported
+from .utils import batches
+
+FoodgramUser = get_user_model()
+
+BATCH_SIZE = 1000
+IMAGES_DIR = 'images'
+BASE64_MARKER = ';base64,'
+# Верхняя граница PositiveSmallIntegerField.
+MAX_COOKING_TIME = 32767
+
+
+def image_to_data_uri(name):
+    content_type = mimetypes.guess_type(name)[0] or 'image/jpeg'
+    with default_storage.open(name, 'rb') as image:
+        encoded = base64.b64encode(image.read()).decode()
+    return f'data:{content_type};base64,{encoded}'
+
+
+def store_image(value):
+    """Сохраняет изображение из data URI под именем по хешу содержимого.
+
+    Повторный импорт тех же данных не плодит копии файлов. Значения,
+    не являющиеся data URI, считаются путями в хранилище и не меняются.
+    Для некорректного base64 возвращает None.
+    """
+    if not value or not value.startswith('data:'):
+        return value
+    header, _, encoded = value.partition(BASE64_MARKER)
+    try:
+        content = base64.b64decode(encoded)
+    except (binascii.Error, ValueError):
+        return None
+    extension = mimetypes.guess_extension(header[len('data:'):]) or '.jpg'
+    name = os.path.join(
+        IMAGES_DIR, hashlib.sha256(content).hexdigest()[:32] + extension
+    )
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def export_recipes(batch_size=BATCH_SIZE, embed_images=False):
+    """Рецепты построчно в виде словарей для JSONL.
+
+    Рецепты читаются итератором (на PostgreSQL — серверным курсором),
+    теги и ингредиенты подгружаются двумя запросами на пачку.
+    """
+    rows = Recipe.objects.order_by('id').values(
+        'id', 'name', 'text', 'cooking_time', 'image',
+        'author__email', 'author__username',
+        'author__first_name', 'author__last_name'
+    ).iterator(chunk_size=batch_size)
+    for batch in batches(rows, batch_size):
+        ids = [row['id'] for row in batch]
+        tags, ingredients = {}, {}
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id__in=ids
+        ).order_by('tag_id').values_list(
+            'recipe_id', 'tag__name', 'tag__color', 'tag__slug'
+        )
+        for recipe_id, name, color, slug in recipe_tags:
+            tags.setdefault(recipe_id, []).append(
+                {'name': name, 'color': color, 'slug': slug}
+            )
+        for recipe_id, name, unit, amount in (
+            RecipeIngredientAmount.objects.filter(
+                recipe_id__in=ids
+            ).order_by('id').values_list(
+                'recipe_id', 'ingredient_id__name',
+                'ingredient_id__measurement_unit', 'amount'
+            )
+        ):
+            ingredients.setdefault(recipe_id, []).append(
+                {'name': name, 'measurement_unit': unit, 'amount': amount}
+            )
+        for row in batch:
+            yield {
+                'name': row['name'],
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+                'image': (
+                    image_to_data_uri(row['image'])
+                    if embed_images and row['image'] else row['image']
+                ),
+                'author': {
+                    'email': row['author__email'],
+                    'username': row['author__username'],
+                    'first_name': row['author__first_name'],
+                    'last_name': row['author__last_name'],
+                },
+                'tags': tags.get(row['id'], []),
+                'ingredients': ingredients.get(row['id'], []),
+            }
+
+
+class RecipeImporter:
+    """Загружает рецепты пачками через bulk_create.
+
+    Теги, ингредиенты и авторы сопоставляются через словари в памяти,
+    недостающие создаются одним bulk_create на пачку. Рецепт с тем же
+    автором и названием считается уже загруженным и пропускается.
+    Изображения из data URI декодируются и сохраняются в workers
+    потоках: работа упирается в запись файлов, а потоки, в отличие от
+    процессов, не зависят от способа их запуска на платформе.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, workers=1):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.stats = {'imported': 0, 'skipped': 0, 'errors': 0}
+        self.author_ids = set()
+        self.recipe_ids = []
+        self.ingredients = {
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        }
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.users = dict(FoodgramUser.objects.values_list('email', 'id'))
+
+    def run(self, lines):
+        pool = ThreadPoolExecutor(self.workers) if self.workers > 1 else None
+        try:
+            for batch in batches(lines, self.batch_size):
+                self.import_batch(self.parse(batch), pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if self.recipe_ids:
+            refresh_recipes_count(
+                FoodgramUser.objects.filter(pk__in=self.author_ids)
+            )
+            recipes_imported.send(Recipe, recipe_ids=self.recipe_ids)
+        return self.stats
+
+    def parse(self, lines):
+        recipes = []
+        for line in lines:
+            if not line.strip():
+                continue
+            # Строка с неверными значениями отбрасывается здесь: в
+            # bulk_create она прервала бы транзакцию всей пачки.
+            try:
+                recipe = json.loads(line)
+                recipe['author']['email'], recipe['name']
+                recipe['cooking_time'] = int(recipe['cooking_time'])
+                if not 1 <= recipe['cooking_time'] <= MAX_COOKING_TIME:
+                    raise ValueError(recipe['cooking_time'])
+                for tag in recipe.get('tags', []):
+                    tag['slug'], tag['name']
+                for item in recipe.get('ingredients', []):
+                    item['name'], item['measurement_unit']
+                    item['amount'] = float(item['amount'])
+                    if not 0 < item['amount'] < math.inf:
+                        raise ValueError(item['amount'])
+            except (ValueError, KeyError, TypeError):
+                self.stats['errors'] += 1
+                continue
+            recipes.append(recipe)
+        return recipes
+
+    def ensure_tags(self, recipes):
+        missing = {}
+        for recipe in recipes:
+            for tag in recipe.get('tags', []):
+                if tag['slug'] not in self.tags:
+                    missing[tag['slug']] = tag
+        if missing:
+            Tag.objects.bulk_create([
+                Tag(
+                    name=tag['name'],
+                    color=tag.get('color', '#FF0000'),
+                    slug=slug
+                )
+                for slug, tag in missing.items()
+            ], ignore_conflicts=True)
+            self.tags.update(Tag.objects.filter(
+                slug__in=missing
+            ).values_list('slug', 'id'))
+
+    def ensure_ingredients(self, recipes):
+        missing = {
+            (item['name'], item['measurement_unit'])
+            for recipe in recipes for item in recipe.get('ingredients', [])
+        } - self.ingredients.keys()
+        if missing:
+            Ingredient.objects.bulk_create([
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in missing
+            ], ignore_conflicts=True)
+            self.ingredients.update({
+                (name, unit): pk for pk, name, unit in
+                Ingredient.objects.filter(
+                    name__in={name for name, _ in missing}
+                ).values_list('id', 'name', 'measurement_unit')
+                if (name, unit) in missing
+            })
+            # bulk_create не вызывает post_save: индекс ингредиентов
+            # и кеш ответов сбрасываются сигналом.
+            ingredients_imported.send(Ingredient)
+
+    def ensure_authors(self, recipes):
+        missing = {}
+        for recipe in recipes:
+            author = recipe['author']
+            if author['email'] not in self.users:
+                missing[author['email']] = author
+        if missing:
+            password = make_password(None)
+            FoodgramUser.objects.bulk_create([
+                FoodgramUser(
+                    email=email,
+                    username=author.get('username') or email,
+                    first_name=author.get('first_name', ''),
+                    last_name=author.get('last_name', ''),
+                    password=password,
+                ) for email, author in missing.items()
+            ], ignore_conflicts=True)
+            self.users.update(FoodgramUser.objects.filter(
+                email__in=missing
+            ).values_list('email', 'id'))
+
+    def new_recipes(self, recipes):
+        # Автор мог не создаться, если его username уже занят.
+        for recipe in recipes:
+            if recipe['author']['email'] not in self.users:
+                self.stats['errors'] += 1
+        recipes = [
+            recipe for recipe in recipes
+            if recipe['author']['email'] in self.users
+        ]
+        existing = set(Recipe.objects.filter(
+            author_id__in={self.users[r['author']['email']] for r in recipes},
+            name__in={recipe['name'] for recipe in recipes}
+        ).values_list('author_id', 'name'))
+        new = {}
+        for recipe in recipes:
+            key = (self.users[recipe['author']['email']], recipe['name'])
+            if key in existing or key in new:
+                self.stats['skipped'] += 1
+            else:
+                new[key] = recipe
+        return new
+
+    def import_batch(self, recipes, pool):
+        self.ensure_tags(recipes)
+        self.ensure_ingredients(recipes)
+        self.ensure_authors(recipes)
+        new = self.new_recipes(recipes)
+        images = [recipe.get('image', '') for recipe in new.values()]
+        images = list(
+            pool.map(store_image, images) if pool is not None
+            else map(store_image, images)
+        )
+        # Рецепт с повреждённым изображением считается ошибочной строкой.
+        new = {
+            key: (recipe, image)
+            for (key, recipe), image in zip(new.items(), images)
+            if image is not None
+        }
+        self.stats['errors'] += len(images) - len(new)
+        with transaction.atomic():
+            created = Recipe.objects.bulk_create([
+                Recipe(
+                    author_id=author_id,
+                    name=name,
+                    text=recipe.get('text', ''),
+                    cooking_time=recipe['cooking_time'],
+                    image=image,
+                )
+                for (author_id, name), (recipe, image) in new.items()
+            ])
+            if connection.features.can_return_rows_from_bulk_insert:
+                ids = {
+                    (recipe.author_id, recipe.name): recipe.pk
+                    for recipe in created
+                }
+            else:
+                ids = {
+                    (author_id, name): pk
+                    for pk, author_id, name in Recipe.objects.filter(
+                        author_id__in={key[0] for key in new},
+                        name__in={key[1] for key in new}
+                    ).values_list('id', 'author_id', 'name')
+                }
+            recipe_tag = Recipe.tags.through
+            recipe_tag.objects.bulk_create([
+                recipe_tag(recipe_id=ids[key], tag_id=self.tags[tag['slug']])
+                for key, (recipe, _) in new.items()
+                for tag in recipe.get('tags', [])
+            ], ignore_conflicts=True)
+            RecipeIngredientAmount.objects.bulk_create([
+                RecipeIngredientAmount(
+                    recipe_id_id=ids[key],
+                    ingredient_id_id=self.ingredients[
+                        (item['name'], item['measurement_unit'])
+                    ],
+                    amount=item['amount'],
+                )
+                for key, (recipe, _) in new.items()
+                for item in recipe.get('ingredients', [])
+            ], ignore_conflicts=True)
+        self.author_ids.update(key[0] for key in new)
+        self.recipe_ids.extend(ids[key] for key in new)
+        self.stats['imported'] += len(new)
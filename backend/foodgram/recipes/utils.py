@@ -0,0 +1,11 @@
+from itertools import islice
+
+
+def batches(iterable, size):
+    """Списки по size элементов из любого итерируемого объекта."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
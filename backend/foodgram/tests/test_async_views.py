@@ -0,0 +1,88 @@
+import re
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import include, path
+from rest_framework.test import APIClient
+
+from api.async_views import async_read_urls
+from api.benchmark import seed_dataset
+from api.urls import router
+from recipes.models import Recipe
+
+# Те же маршруты API, что при ASYNC_READ_VIEWS=True.
+urlpatterns = [
+    path('api/', include(async_read_urls(router.urls))),
+]
+
+URLS = (
+    '/api/recipes/?limit=10',
+    '/api/recipes/{recipe}/',
+    '/api/tags/',
+    '/api/tags/{tag}/',
+    '/api/ingredients/?name=а',
+    '/api/users/subscriptions/?recipes_limit=2',
+)
+
+
+class AsyncReadViewsTest(TransactionTestCase):
+    # Представления выполняются в других потоках со своими
+    # соединениями, поэтому данные должны быть зафиксированы.
+
+    def setUp(self):
+        cache.clear()
+        self.user = seed_dataset(
+            users=8, recipes=20, follows_per_user=3,
+            favorites_per_user=3, cart_per_user=3
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        recipe = Recipe.objects.filter(favorited__user_id=self.user).first()
+        self.context = {
+            'recipe': recipe.pk,
+            'tag': recipe.tags.first().pk,
+        }
+
+    def test_responses_match_sync_views(self):
+        for url in URLS:
+            url = url.format(**self.context)
+            with self.subTest(url=url):
+                expected = self.client.get(url)
+                with override_settings(
+                    ROOT_URLCONF='tests.test_async_views'
+                ):
+                    actual = self.client.get(url)
+                self.assertEqual(actual.status_code, 200)
+                self.assertEqual(actual.json(), expected.json())
+
+    @override_settings(ROOT_URLCONF='tests.test_async_views')
+    def test_user_flags(self):
+        response = self.client.get(f'/api/recipes/{self.context["recipe"]}/')
+        self.assertTrue(response.json()['is_favorited'])
+        anonymous = APIClient().get(f'/api/recipes/{self.context["recipe"]}/')
+        self.assertFalse(anonymous.json()['is_favorited'])
+
+    @override_settings(ROOT_URLCONF='tests.test_async_views')
+    def test_writes_stay_sync(self):
+        response = APIClient().post('/api/recipes/', {}, format='json')
+        self.assertEqual(response.status_code, 401)
+        recipe = Recipe.objects.exclude(author=self.user).first()
+        response = self.client.delete(f'/api/recipes/{recipe.pk}/')
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Recipe.objects.filter(pk=recipe.pk).exists())
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_sql_from_threads_is_measured(self):
+        url = '/api/recipes/?limit=10'
+        counts = []
+        for urlconf in ('foodgram.urls', 'tests.test_async_views'):
+            with override_settings(ROOT_URLCONF=urlconf):
+                response = self.client.get(url)
+            counts.append(int(re.search(
+                r'db;dur=[0-9.]+;desc="(\d+) queries"',
+                response['Server-Timing']
+            ).group(1)))
+        sync, async_ = counts
+        self.assertGreater(sync, 0)
+        # Асинхронный путь отдельно читает флаги пользователя.
+        self.assertGreaterEqual(async_, sync)
@@ -0,0 +1,111 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredientAmount,
+    Tag
+)
+
+
+class ConditionalRequestTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=6, recipes=10, follows_per_user=2,
+            favorites_per_user=0, cart_per_user=0
+        )
+        cls.recipe = Recipe.objects.exclude(author=cls.user).first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def revalidate(self, url, response, status=304):
+        revalidated = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(revalidated.status_code, status)
+        return revalidated
+
+    def test_not_modified_from_one_query(self):
+        for url in (
+            f'/api/recipes/{self.recipe.id}/',
+            '/api/tags/',
+            f'/api/tags/{Tag.objects.first().id}/',
+            f'/api/ingredients/{Ingredient.objects.first().id}/',
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+                with self.assertNumQueries(1):
+                    self.revalidate(url, response)
+
+    def test_ingredient_list_revalidates_from_index(self):
+        url = '/api/ingredients/?name=со'
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.revalidate(url, response)
+        self.revalidate('/api/ingredients/?name=мо', response, 200)
+
+    def test_if_modified_since(self):
+        url = '/api/tags/'
+        response = self.client.get(url)
+        revalidated = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_recipe_changes_change_etag(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        response = self.client.get(url)
+        amount = RecipeIngredientAmount.objects.filter(
+            recipe_id=self.recipe
+        ).first()
+        amount.amount += 1
+        amount.save()
+        response = self.revalidate(url, response, 200)
+
+        tag = Tag.objects.exclude(recipe=self.recipe).first()
+        self.recipe.tags.add(tag)
+        response = self.revalidate(url, response, 200)
+
+        ingredient = amount.ingredient_id
+        ingredient.name = 'переименованный'
+        ingredient.save()
+        response = self.revalidate(url, response, 200)
+        self.revalidate(url, response)
+
+    def test_user_flags_are_part_of_etag(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('Authorization', response['Vary'])
+        Favorite.objects.create(user_id=self.user, recipe_id=self.recipe)
+        response = self.revalidate(url, response, 200)
+        self.assertTrue(response.data['is_favorited'])
+
+        self.client.credentials()
+        self.revalidate(url, response, 200)
+
+    def test_deleted_ingredient_changes_list_etag(self):
+        url = '/api/ingredients/'
+        response = self.client.get(url)
+        Ingredient.objects.filter(
+            recipeingredientamount__isnull=True
+        ).first().delete()
+        self.revalidate(url, response, 200)
+
+    def test_missing_recipe(self):
+        response = self.client.get('/api/recipes/0/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
@@ -0,0 +1,86 @@
+import threading
+import unittest
+
+from django.db import OperationalError, connection, connections
+from django.test import SimpleTestCase
+from psycopg2.extensions import make_dsn
+
+from foodgram.db.base import DatabaseWrapper
+from foodgram.db.pool import ConnectionPool
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql', 'Пул работает только с PostgreSQL'
+)
+class ConnectionPoolTest(SimpleTestCase):
+    databases = {'default'}
+
+    def make_pool(self, **options):
+        pool = ConnectionPool(
+            dsn=make_dsn(**connection.get_connection_params()),
+            **{'max_size': 2, 'min_size': 0, **options}
+        )
+        self.addCleanup(pool.clear)
+        return pool
+
+    @staticmethod
+    def backend_pid(conn):
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            pid = cursor.fetchone()[0]
+        conn.rollback()
+        return pid
+
+    def test_django_connection_is_reused(self):
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'POOL': {'MAX_SIZE': 1}}, 'default'
+        )
+        self.addCleanup(wrapper.close)
+        pids = []
+        for _ in range(3):
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                pids.append(cursor.fetchone()[0])
+            wrapper.close()
+        self.assertEqual(len(set(pids)), 1)
+        self.assertIsNone(wrapper.pool)
+
+    def test_waits_for_released_connection(self):
+        pool = self.make_pool(max_size=1, timeout=5)
+        conn = pool.getconn()
+        threading.Timer(0.1, pool.putconn, [conn]).start()
+        self.assertIs(pool.getconn(), conn)
+        stats = pool.snapshot()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['max_wait'], 0)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_timeout_when_exhausted(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.getconn()
+        with self.assertRaises(OperationalError):
+            with connections['default'].wrap_database_errors:
+                pool.getconn()
+        self.assertEqual(pool.snapshot()['timeouts'], 1)
+
+    def test_broken_connection_is_replaced(self):
+        pool = self.make_pool(check_interval=0)
+        conn, other = pool.getconn(), pool.getconn()
+        pid = self.backend_pid(conn)
+        with other.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        other.rollback()
+        pool.putconn(conn)
+        pool.putconn(other)
+        pids = {self.backend_pid(pool.getconn()) for _ in range(2)}
+        self.assertNotIn(pid, pids)
+        self.assertEqual(len(pids), 2)
+        self.assertEqual(pool.snapshot()['failed_checks'], 1)
+
+    def test_old_connection_is_recycled(self):
+        pool = self.make_pool(max_lifetime=0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.snapshot()['recycled'], 1)
+        self.assertIsNot(pool.getconn(), conn)
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from recipes.feed import fan_out_recipes
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow, FoodgramUser
+
+from .utils import PaginationMixin
+
+URL = '/api/recipes/feed/'
+
+
+class FeedTest(PaginationMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=12, recipes=40, follows_per_user=3,
+            favorites_per_user=1, cart_per_user=1
+        )
+        cls.stranger = FoodgramUser.objects.exclude(
+            following__user=cls.user
+        ).exclude(pk=cls.user.pk).filter(recipes_count__gt=0).first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def naive_feed(self, user):
+        return list(Recipe.objects.filter(
+            author__following__user=user
+        ).order_by('-id').values_list('id', flat=True))
+
+    def create_recipe(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recipe.objects.create(
+                author=author, name='Новый рецепт', text='Текст',
+                cooking_time=10
+            )
+
+    def test_feed_matches_subscriptions(self):
+        self.assertEqual(self.walk(URL), self.naive_feed(self.user))
+
+    def test_anonymous(self):
+        self.assertEqual(APIClient().get(URL).status_code, 401)
+
+    def test_new_recipe_fanned_out(self):
+        author = Follow.objects.filter(user=self.user).first().following
+        recipe = self.create_recipe(author)
+        self.assertEqual(self.walk(URL)[0], recipe.pk)
+        self.assertEqual(
+            FeedEntry.objects.filter(recipe_id=recipe).count(),
+            author.following.count()
+        )
+
+    def test_subscribe_and_unsubscribe(self):
+        subscribe = f'/api/users/{self.stranger.pk}/subscribe/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(subscribe)
+        self.assertEqual(self.walk(URL), self.naive_feed(self.user))
+        self.assertTrue(FeedEntry.objects.filter(
+            user_id=self.user, recipe_id__author=self.stranger
+        ).exists())
+        self.client.delete(subscribe)
+        self.assertEqual(self.walk(URL), self.naive_feed(self.user))
+        self.assertFalse(FeedEntry.objects.filter(
+            user_id=self.user, recipe_id__author=self.stranger
+        ).exists())
+
+    def test_followers_count(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.user, following=self.stranger)
+        Follow.objects.filter(following=self.stranger).first().delete()
+        for author in FoodgramUser.objects.all():
+            self.assertEqual(
+                author.followers_count, author.following.count(), author.pk
+            )
+
+    def test_prolific_author_read_on_request(self):
+        author = Follow.objects.filter(user=self.user).first().following
+        with override_settings(
+            FEED_FANOUT_MAX_FOLLOWERS=author.followers_count - 1
+        ):
+            recipe = self.create_recipe(author)
+            self.assertFalse(
+                FeedEntry.objects.filter(recipe_id=recipe).exists()
+            )
+            self.assertEqual(self.walk(URL), self.naive_feed(self.user))
+
+    @override_settings(FEED_MAX_LENGTH=5, FEED_TRIM_INTERVAL=1)
+    def test_feed_length_bounded(self):
+        author = Follow.objects.filter(user=self.user).first().following
+        recipe_ids = [self.create_recipe(author).pk for _ in range(3)]
+        fan_out_recipes(recipe_ids)
+        self.assertEqual(self.walk(URL), self.naive_feed(self.user)[:5])
+        self.assertLessEqual(
+            FeedEntry.objects.filter(user_id=self.user).count(), 5
+        )
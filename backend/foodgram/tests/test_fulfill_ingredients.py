@@ -0,0 +1,100 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes import ingredient_loader
+from recipes.ingredient_index import ingredient_index
+from recipes.ingredient_loader import load_ingredients_file
+from recipes.models import Ingredient
+
+DATA_DIR = os.path.join(settings.BASE_DIR, '..', '..', 'data')
+INGREDIENTS_COUNT = 2188
+
+
+class FulfillIngredientsTest(TestCase):
+
+    def write(self, content, suffix):
+        file = tempfile.NamedTemporaryFile(
+            'w', suffix=suffix, encoding='utf-8', delete=False
+        )
+        with file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_data_files_load_the_same_ingredients(self):
+        for name in ('ingredients.csv', 'ingredients.json'):
+            with self.subTest(name=name):
+                Ingredient.objects.all().delete()
+                stats = load_ingredients_file(os.path.join(DATA_DIR, name))
+                self.assertEqual(stats['read'], INGREDIENTS_COUNT)
+                self.assertEqual(stats['created'], INGREDIENTS_COUNT)
+                self.assertTrue(Ingredient.objects.filter(
+                    name='абрикосовое варенье', measurement_unit='г'
+                ).exists())
+
+    def test_rerun_does_not_duplicate(self):
+        out = StringIO()
+        call_command('fulfill_ingredients', stdout=out)
+        call_command('fulfill_ingredients', batch_size=100, stdout=out)
+        self.assertEqual(Ingredient.objects.count(), INGREDIENTS_COUNT)
+        self.assertIn('создано: 0, уже было: 2188', out.getvalue())
+
+    def test_csv_dialects_and_header(self):
+        for content in (
+            'name,measurement_unit\nсоль,г\n"мука, пшеничная",г\n',
+            'name;measurement_unit\nсоль;г\nмука, пшеничная;г\n',
+        ):
+            with self.subTest(content=content):
+                Ingredient.objects.all().delete()
+                load_ingredients_file(self.write(content, '.csv'))
+                self.assertCountEqual(
+                    Ingredient.objects.values_list(
+                        'name', 'measurement_unit'
+                    ),
+                    [('соль', 'г'), ('мука, пшеничная', 'г')]
+                )
+
+    def test_invalid_rows_are_counted(self):
+        path = self.write('соль;г\nбез единицы\n;г\nперец;щепотка\n', '.csv')
+        stats = load_ingredients_file(path, batch_size=2)
+        self.assertEqual(stats['read'], 4)
+        self.assertEqual(stats['invalid'], 2)
+        self.assertEqual(stats['created'], 2)
+
+    def test_json_lines_across_chunks(self):
+        path = self.write(
+            '{"name": "соль", "measurement_unit": "г"}\n'
+            '{"name": "перец", "measurement_unit": "щепотка"}\n',
+            '.jsonl'
+        )
+        with mock.patch.object(ingredient_loader, 'JSON_CHUNK_SIZE', 7):
+            stats = load_ingredients_file(path)
+        self.assertEqual(stats['created'], 2)
+
+    def test_json_array_of_pairs(self):
+        path = self.write(
+            '[["соль", "г"],\n ["перец", "щепотка"], ["мука", "г"]]\n',
+            '.json'
+        )
+        with mock.patch.object(ingredient_loader, 'JSON_CHUNK_SIZE', 5):
+            stats = load_ingredients_file(path)
+        self.assertEqual(stats['read'], 3)
+        self.assertEqual(stats['invalid'], 0)
+        self.assertCountEqual(
+            Ingredient.objects.values_list('name', 'measurement_unit'),
+            [('соль', 'г'), ('перец', 'щепотка'), ('мука', 'г')]
+        )
+
+    def test_ingredient_index_is_invalidated(self):
+        ingredient_index.invalidate()
+        self.assertEqual(ingredient_index.search(''), [])
+        load_ingredients_file(os.path.join(DATA_DIR, 'ingredients.json'))
+        self.assertEqual(
+            len(ingredient_index.search('')), INGREDIENTS_COUNT
+        )
@@ -0,0 +1,143 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from recipes.images import process_in_worker, process_recipe_image
+from recipes.models import Ingredient, Recipe, Tag
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data(width=1600, height=1000, color='orange'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_WORKERS=0)
+class RecipeImageVariantsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=2, recipes=2, follows_per_user=0,
+            favorites_per_user=0, cart_per_user=0
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/recipes/', {
+                'name': 'Блины',
+                'text': 'Смешать и пожарить.',
+                'cooking_time': 20,
+                'image': image,
+                'tags': [Tag.objects.first().id],
+                'ingredients': [
+                    {'id': Ingredient.objects.first().id, 'amount': 100}
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(pk=response.data['id'])
+
+    def test_variants_are_built_after_commit(self):
+        recipe = self.create_recipe(image_data())
+        variants = recipe.image_variants
+        self.assertEqual(variants['source'], recipe.image.name)
+        self.assertEqual(
+            [width for width, _ in variants['webp']], [320, 640, 1280]
+        )
+        for _, name in variants['webp']:
+            self.assertTrue(default_storage.exists(name))
+        with default_storage.open(variants['webp'][0][1]) as variant:
+            self.assertEqual(Image.open(variant).size, (320, 200))
+
+        data = self.client.get(f'/api/recipes/{recipe.id}/').data
+        self.assertTrue(data['thumbnail'].endswith('-320.webp'))
+        self.assertIn('640w', data['srcset']['image/webp'])
+
+    def test_small_image_keeps_its_width(self):
+        recipe = self.create_recipe(image_data(200, 100))
+        self.assertEqual(
+            [width for width, _ in recipe.image_variants['webp']], [200]
+        )
+
+    def test_variant_names_depend_on_content(self):
+        first = self.create_recipe(image_data())
+        second = self.create_recipe(image_data())
+        third = self.create_recipe(image_data(color='green'))
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            first.image_variants['webp'], second.image_variants['webp']
+        )
+        self.assertNotEqual(
+            first.image_variants['webp'], third.image_variants['webp']
+        )
+
+    def test_without_variants_thumbnail_is_original(self):
+        recipe = Recipe.objects.first()
+        data = self.client.get(f'/api/recipes/{recipe.id}/').data
+        self.assertEqual(data['thumbnail'], data['image'])
+        self.assertEqual(data['srcset'], {})
+
+    def test_replaced_image_is_not_overwritten(self):
+        recipe = self.create_recipe(image_data())
+        variants = recipe.image_variants
+        with mock.patch(
+            'recipes.images.build_variants',
+            side_effect=lambda name: Recipe.objects.filter(
+                pk=recipe.pk
+            ).update(image='images/other.png') and {'source': name}
+        ):
+            process_recipe_image(recipe.pk)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, variants)
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=2)
+    def test_processing_is_queued_to_workers(self):
+        with mock.patch('recipes.images.get_executor') as executor:
+            recipe = self.create_recipe(image_data())
+        executor.return_value.submit.assert_called_once_with(
+            process_in_worker, recipe.pk
+        )
+        self.assertEqual(recipe.image_variants, {})
+
+    def test_inline_processing_keeps_connections(self):
+        recipe = self.create_recipe(image_data())
+        with override_settings(IMAGE_PROCESSING_WORKERS=2), mock.patch(
+            'recipes.images.connections'
+        ) as connections:
+            process_recipe_image(recipe.pk)
+            connections.close_all.assert_not_called()
+            process_in_worker(recipe.pk)
+            connections.close_all.assert_called_once_with()
+
+    def test_command_processes_missing_variants(self):
+        recipe = self.create_recipe(image_data())
+        Recipe.objects.filter(pk=recipe.pk).update(image_variants={})
+        Recipe.objects.exclude(pk=recipe.pk).update(image='')
+        out = StringIO()
+        call_command('process_recipe_images', stdout=out)
+        recipe.refresh_from_db()
+        self.assertIn('webp', recipe.image_variants)
+        self.assertIn('Обработано изображений: 1', out.getvalue())
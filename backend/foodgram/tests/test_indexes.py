@@ -0,0 +1,33 @@
+import unittest
+
+from django.db import IntegrityError, connection
+from django.test import TestCase
+
+from api.benchmark import seed_dataset
+from api.explain import check_index_usage
+from recipes.models import Tag
+
+
+class IndexPlanTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(
+            users=30, recipes=120, follows_per_user=5,
+            favorites_per_user=5, cart_per_user=5
+        )
+
+    def test_tag_slug_is_unique(self):
+        tag = Tag.objects.first()
+        with self.assertRaises(IntegrityError):
+            Tag.objects.create(name='Копия', slug=tag.slug)
+
+    @unittest.skipUnless(
+        connection.vendor == 'postgresql', 'EXPLAIN проверяется в PostgreSQL'
+    )
+    def test_hot_queries_use_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        for name, expected, used, ok in check_index_usage():
+            with self.subTest(query=name):
+                self.assertTrue(ok, f'ожидается {expected}, план: {used}')
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+URL = '/api/ingredients/'
+
+
+class IngredientAutocompleteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create([
+            Ingredient(name=name, measurement_unit='г') for name in (
+                'молоко', 'молоко сгущенное', 'кокосовое молоко',
+                'мёд', 'медовик', 'сметана', 'соль',
+            )
+        ])
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+        self.client = APIClient()
+
+    def names(self, query):
+        response = self.client.get(URL, {'name': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_prefix_matches_rank_before_substring(self):
+        self.assertEqual(
+            self.names('Молоко'),
+            ['молоко', 'молоко сгущенное', 'кокосовое молоко']
+        )
+
+    def test_yo_is_treated_as_ye(self):
+        self.assertEqual(self.names('мед'), ['мёд', 'медовик'])
+        self.assertEqual(self.names('мЁд'), ['мёд', 'медовик'])
+
+    def test_typo_fallback(self):
+        self.assertEqual(self.names('смитана'), ['сметана'])
+
+    def test_answers_without_database(self):
+        self.client.get(URL, {'name': 'с'})
+        with self.assertNumQueries(0), self.settings(
+            RESPONSE_CACHE_TIMEOUT=0
+        ):
+            self.client.get(URL, {'name': 'сол'})
+            self.client.get(URL)
+
+    def test_write_invalidates_index(self):
+        self.assertEqual(self.names('перец'), [])
+        Ingredient.objects.create(name='перец', measurement_unit='г')
+        self.assertEqual(self.names('перец'), ['перец'])
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from recipes.models import Recipe
+
+
+class InteractionFlagsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=12, recipes=30, follows_per_user=4,
+            favorites_per_user=5, cart_per_user=5
+        )
+        cls.recipe = Recipe.objects.exclude(
+            favorited__user_id=cls.user
+        ).exclude(shopping_cart__user_id=cls.user).exclude(
+            author__following__user=cls.user
+        ).exclude(author=cls.user).first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/recipes/{self.recipe.id}/'
+
+    def flags(self):
+        data = self.client.get(self.url).data
+        return (
+            data['is_favorited'],
+            data['is_in_shopping_cart'],
+            data['author']['is_subscribed'],
+        )
+
+    def toggle_everything(self):
+        self.assertEqual(self.flags(), (False, False, False))
+        self.client.post(self.url + 'favorite/')
+        self.client.post(self.url + 'shopping_cart/')
+        self.client.post(f'/api/users/{self.recipe.author_id}/subscribe/')
+        self.assertEqual(self.flags(), (True, True, True))
+        self.client.delete(self.url + 'favorite/')
+        self.client.delete(self.url + 'shopping_cart/')
+        self.client.delete(f'/api/users/{self.recipe.author_id}/subscribe/')
+        self.assertEqual(self.flags(), (False, False, False))
+
+    def test_flags_follow_actions(self):
+        self.toggle_everything()
+
+    @override_settings(INTERACTIONS_CACHE_TIMEOUT=60)
+    def test_cached_flags_are_invalidated_by_actions(self):
+        self.toggle_everything()
+
+    @override_settings(INTERACTIONS_CACHE_TIMEOUT=60)
+    def test_cached_flags_skip_queries(self):
+        self.client.get('/api/recipes/')
+        with self.assertNumQueries(4):
+            self.client.get('/api/recipes/')
+
+    def test_anonymous_flags_are_false(self):
+        response = APIClient().get('/api/recipes/')
+        for recipe in response.data['results']:
+            self.assertFalse(recipe['is_favorited'])
+            self.assertFalse(recipe['is_in_shopping_cart'])
+            self.assertFalse(recipe['author']['is_subscribed'])
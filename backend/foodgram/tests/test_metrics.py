@@ -0,0 +1,115 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from api.metrics import registry
+
+RECIPES = '/api/recipes/?limit=6'
+
+
+def server_timing(response):
+    return {
+        name: params for name, *params in (
+            [part.strip() for part in entry.split(';')]
+            for entry in response['Server-Timing'].split(',')
+        )
+    }
+
+
+@override_settings(METRICS_SAMPLE_RATE=1, METRICS_TOKEN='')
+class MetricsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=6, recipes=12, follows_per_user=2,
+            favorites_per_user=2, cart_per_user=2
+        )
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_breakdown(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(RECIPES)
+        timing = server_timing(response)
+        self.assertEqual(
+            set(timing), {'db', 'auth', 'view', 'render', 'total'}
+        )
+        self.assertIn(
+            f'desc="{len(queries)} queries"', timing['db']
+        )
+        durations = {
+            name: float(params[0].split('=')[1])
+            for name, params in timing.items()
+        }
+        self.assertLessEqual(
+            durations['db'] + durations['view'] + durations['render'],
+            durations['total'] + 0.5
+        )
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request_has_total_only(self):
+        response = self.client.get(RECIPES)
+        self.assertEqual(set(server_timing(response)), {'total'})
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        self.assertFalse(self.client.get(RECIPES).has_header('Server-Timing'))
+
+    def test_metrics_endpoint(self):
+        self.client.get(RECIPES)
+        self.client.get(RECIPES)
+        self.client.get('/api/tags/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn(
+            'foodgram_http_requests_total'
+            '{route="recipes-list",method="GET",status="200"} 2',
+            text
+        )
+        self.assertIn(
+            'foodgram_http_request_duration_seconds_count'
+            '{route="recipes-list",method="GET"} 2',
+            text
+        )
+        self.assertIn(
+            'foodgram_http_request_duration_seconds_bucket'
+            '{route="tags-list",method="GET",le="+Inf"} 1',
+            text
+        )
+        self.assertRegex(
+            text, r'foodgram_db_queries_count\{route="recipes-list"\} 2'
+        )
+        for phase in ('db', 'auth', 'view', 'render'):
+            self.assertRegex(text, re.escape(
+                'foodgram_request_phase_seconds_total'
+                f'{{route="recipes-list",phase="{phase}"}} '
+            ) + r'[0-9.e-]+')
+        self.assertIn('foodgram_response_cache_total', text)
+        self.assertIn('foodgram_token_cache_total', text)
+
+    def test_unknown_methods_share_a_label(self):
+        for method in ('BREW', 'PROPFIND'):
+            self.client.generic(method, RECIPES)
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('method="other"', text)
+        self.assertNotIn('BREW', text)
+        self.assertNotIn('PROPFIND', text)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        client = APIClient()
+        self.assertEqual(client.get('/metrics').status_code, 401)
+        client.credentials(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(client.get('/metrics').status_code, 200)
@@ -0,0 +1,53 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from recipes.models import Recipe
+
+from .utils import PaginationMixin
+
+
+class RecipePaginationTest(PaginationMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=12, recipes=25, follows_per_user=5,
+            favorites_per_user=3, cart_per_user=3
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_mode_walks_feed_by_id(self):
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=4'),
+            list(Recipe.objects.order_by('-id').values_list('id', flat=True))
+        )
+
+    def test_cursor_mode_skips_count(self):
+        response = self.client.get('/api/recipes/?cursor=')
+        self.assertNotIn('count', response.data)
+
+    def test_cursor_mode_for_subscriptions(self):
+        ids = self.walk('/api/users/subscriptions/?cursor=&limit=2')
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), 5)
+
+    def test_page_mode_without_count(self):
+        response = self.client.get('/api/recipes/?count=none&limit=10')
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(
+            self.walk('/api/recipes/?count=none&limit=10'),
+            self.walk('/api/recipes/?limit=10')
+        )
+
+    def test_page_mode_with_estimated_count(self):
+        response = self.client.get('/api/recipes/?count=estimate')
+        self.assertGreater(response.data['count'], 0)
+
+    def test_default_mode_is_unchanged(self):
+        response = self.client.get('/api/recipes/?page=2&limit=10')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
@@ -0,0 +1,110 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import FoodgramUser
+
+from .utils import PaginationMixin
+
+URL = '/api/recipes/'
+
+
+class RecipePopularityTest(PaginationMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=15, recipes=30, follows_per_user=2,
+            favorites_per_user=6, cart_per_user=4
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_counters_match(self):
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                (recipe.favorites_count, recipe.cart_count),
+                (Favorite.objects.filter(recipe_id=recipe).count(),
+                 ShoppingCart.objects.filter(recipe_id=recipe).count()),
+                recipe.pk
+            )
+
+    def test_seeded_counters_match(self):
+        self.assert_counters_match()
+
+    def test_actions_update_counters(self):
+        recipe = Recipe.objects.exclude(favorited__user_id=self.user).exclude(
+            shopping_cart__user_id=self.user
+        ).first()
+        before = (recipe.favorites_count, recipe.cart_count)
+        for action in ('favorite', 'shopping_cart'):
+            self.client.post(f'{URL}{recipe.id}/{action}/')
+        recipe.refresh_from_db()
+        self.assertEqual(
+            (recipe.favorites_count, recipe.cart_count),
+            (before[0] + 1, before[1] + 1)
+        )
+        for action in ('favorite', 'shopping_cart'):
+            self.client.delete(f'{URL}{recipe.id}/{action}/')
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.favorites_count, recipe.cart_count), before)
+
+    def test_user_deletion_updates_counters(self):
+        FoodgramUser.objects.exclude(pk=self.user.pk).filter(
+            favorited__isnull=False
+        ).first().delete()
+        self.assert_counters_match()
+
+    def test_orderings(self):
+        recipes = Recipe.objects.all()
+        expected = {
+            'popular': recipes.order_by(
+                '-favorites_count', '-cart_count', '-id'
+            ),
+            'newest': recipes.order_by('-id'),
+            'cooking_time': recipes.order_by('cooking_time', '-id'),
+        }
+        for ordering, queryset in expected.items():
+            ids = list(queryset.values_list('id', flat=True))
+            with self.subTest(ordering=ordering):
+                self.assertEqual(
+                    self.walk(f'{URL}?ordering={ordering}&limit=7'), ids
+                )
+                self.assertEqual(
+                    self.walk(f'{URL}?ordering={ordering}&cursor=&limit=7'),
+                    ids
+                )
+
+    def test_anonymous_popular_pages_follow_counters(self):
+        client = APIClient()
+        popular, newest = f'{URL}?ordering=popular', f'{URL}?ordering=newest'
+        for url in (popular, newest):
+            self.assertEqual(client.get(url)['X-Cache'], 'MISS')
+        recipe = Recipe.objects.order_by(
+            'favorites_count', 'cart_count', 'id'
+        ).first()
+        for user in FoodgramUser.objects.exclude(favorited__recipe_id=recipe):
+            Favorite.objects.create(user_id=user, recipe_id=recipe)
+        response = client.get(popular)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['id'], recipe.id)
+        self.assertEqual(client.get(newest)['X-Cache'], 'HIT')
+
+    def test_unknown_ordering_is_rejected(self):
+        response = self.client.get(f'{URL}?ordering=rating')
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_changelist_uses_columns(self):
+        admin = FoodgramUser.objects.create_superuser(
+            email='admin@example.com', username='admin', password='pass',
+            first_name='Админ', last_name='Админов'
+        )
+        self.client.force_login(admin)
+        response = self.client.get('/admin/recipes/recipe/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Добавлений в избранное')
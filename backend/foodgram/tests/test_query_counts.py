@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from api.benchmark import ENDPOINTS, query_growth, run_benchmark, seed_dataset
+
+
+class QueryCountTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=40, recipes=120, follows_per_user=12,
+            favorites_per_user=30, cart_per_user=10
+        )
+
+    def run_endpoint(self, name):
+        endpoints = [item for item in ENDPOINTS if item[0] == name]
+        return run_benchmark(self.user, endpoints=endpoints)
+
+    def test_endpoints_respond(self):
+        for row in run_benchmark(self.user):
+            with self.subTest(endpoint=row['endpoint']):
+                self.assertLess(row['status'], 400)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for name, _, _, paginated in ENDPOINTS:
+            if not paginated:
+                continue
+            with self.subTest(endpoint=name):
+                self.assertEqual(query_growth(self.run_endpoint(name)), [])
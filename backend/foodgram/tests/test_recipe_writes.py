@@ -0,0 +1,179 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api import serializers
+from api.benchmark import seed_dataset
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredientAmount,
+    Tag
+)
+from users.models import FoodgramUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data_uri():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'teal').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeWriteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(
+            users=3, recipes=3, follows_per_user=0,
+            favorites_per_user=0, cart_per_user=0
+        )
+        cls.recipe = Recipe.objects.first()
+        cls.recipe.image = ''
+        cls.recipe.save()
+        cls.ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)[:25]
+        )
+        cls.tag_ids = list(Tag.objects.values_list('id', flat=True))
+        RecipeIngredientAmount.objects.filter(recipe_id=cls.recipe).delete()
+        RecipeIngredientAmount.objects.bulk_create([
+            RecipeIngredientAmount(
+                recipe_id=cls.recipe, ingredient_id_id=pk, amount=10
+            ) for pk in cls.ingredient_ids[:20]
+        ])
+        cls.recipe.tags.set(cls.tag_ids[:2])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.recipe.author)
+
+    def patch(self, ingredients, tags):
+        return self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {'ingredients': ingredients, 'tags': tags},
+            format='json'
+        )
+
+    def amounts(self):
+        return dict(RecipeIngredientAmount.objects.filter(
+            recipe_id=self.recipe
+        ).values_list('ingredient_id', 'amount'))
+
+    def test_update_applies_only_the_diff(self):
+        rows = dict(RecipeIngredientAmount.objects.filter(
+            recipe_id=self.recipe
+        ).values_list('ingredient_id', 'id'))
+        ingredients = [
+            {'id': pk, 'amount': 10} for pk in self.ingredient_ids[2:20]
+        ]
+        ingredients[0]['amount'] = 15
+        ingredients.append({'id': self.ingredient_ids[20], 'amount': 5})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch(ingredients, self.tag_ids[1:3])
+        self.assertEqual(response.status_code, 200, response.data)
+        expected = {item['id']: item['amount'] for item in ingredients}
+        self.assertEqual(self.amounts(), expected)
+        kept = dict(RecipeIngredientAmount.objects.filter(
+            recipe_id=self.recipe
+        ).values_list('ingredient_id', 'id'))
+        for pk in self.ingredient_ids[2:20]:
+            self.assertEqual(kept[pk], rows[pk])
+        self.assertCountEqual(
+            self.recipe.tags.values_list('id', flat=True), self.tag_ids[1:3]
+        )
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if 'recipeingredientamount' in query['sql'].lower()
+            and not query['sql'].startswith('SELECT')
+        ]
+        # Вставка, обновление и удаление — по одному запросу.
+        self.assertEqual(len(writes), 3)
+
+    def test_unchanged_update_writes_no_ingredients(self):
+        ingredients = [
+            {'id': pk, 'amount': 10} for pk in self.ingredient_ids[:20]
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch(ingredients, self.tag_ids[:2])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'recipeingredientamount' in query['sql'].lower()
+            and not query['sql'].startswith('SELECT')
+        ])
+
+    def test_update_keeps_concurrent_counters(self):
+        fan = FoodgramUser.objects.exclude(pk=self.recipe.author_id).first()
+        update_shopping_lists = serializers.update_shopping_lists
+
+        def favorite_meanwhile(*args):
+            Favorite.objects.create(user_id=fan, recipe_id=self.recipe)
+            update_shopping_lists(*args)
+
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            similar_computed_at=self.recipe.updated_at
+        )
+        with mock.patch.object(
+            serializers, 'update_shopping_lists',
+            side_effect=favorite_meanwhile
+        ):
+            response = self.patch(
+                [{'id': self.ingredient_ids[0], 'amount': 1}],
+                self.tag_ids[:2]
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertIsNone(recipe.similar_computed_at)
+
+    def test_unknown_ingredient_is_rejected(self):
+        response = self.patch(
+            [{'id': max(self.ingredient_ids) + 10 ** 6, 'amount': 1}],
+            self.tag_ids[:1]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+        self.assertEqual(len(self.amounts()), 20)
+
+    def test_create_resolves_ingredients_in_one_query(self):
+        ingredients = [
+            {'id': pk, 'amount': 3} for pk in self.ingredient_ids[:20]
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/recipes/', {
+                'name': 'Салат',
+                'text': 'Нарезать.',
+                'cooking_time': 5,
+                'image': image_data_uri(),
+                'tags': self.tag_ids[:2],
+                'ingredients': ingredients,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(len(recipe.ingredients.all()), 20)
+        self.assertEqual(recipe.tags.count(), 2)
+        ingredient_selects = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "recipes_ingredient"' in query['sql']
+            and 'INNER JOIN' not in query['sql']
+        ]
+        self.assertLessEqual(len(ingredient_selects), 1)
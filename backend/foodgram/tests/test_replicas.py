@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from foodgram.db.routers import read_from
+from recipes.models import Recipe
+
+# Отдельная пустая база вместо реплики: всё, что записано в основную
+# базу, на ней «ещё не появилось», поэтому видно, откуда читал запрос.
+# Псевдоним существует только на время этих тестов.
+REPLICA = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTest(TransactionTestCase):
+    # Псевдонима реплики ещё нет, когда раннер создаёт тестовые базы,
+    # поэтому её база создаётся в setUpClass, а '__all__' включает её
+    # в список баз теста.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        default = connections[DEFAULT_DB_ALIAS].settings_dict
+        connections.settings[REPLICA] = {
+            **default,
+            'TEST': {
+                **default['TEST'],
+                'MIRROR': None,
+                'NAME': None if connections[DEFAULT_DB_ALIAS].vendor == (
+                    'sqlite'
+                ) else f'{default["NAME"]}_{REPLICA}',
+            },
+        }
+        cls.replica_name = connections[REPLICA].creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].creation.destroy_test_db(
+            cls.replica_name, verbosity=0
+        )
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        cache.clear()
+        self.user = seed_dataset(
+            users=5, recipes=10, follows_per_user=1,
+            favorites_per_user=0, cart_per_user=0
+        )
+        self.recipe = Recipe.objects.exclude(author=self.user).first()
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_safe_requests_read_from_replica(self):
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(queries.captured_queries)
+
+    def test_token_is_read_from_primary(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+
+    def test_reads_stick_to_primary_after_write(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        response = self.client.post(self.url + 'favorite/')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+        # Другие клиенты по-прежнему читают с реплики.
+        self.assertEqual(APIClient().get(self.url).status_code, 404)
+
+    def test_stickiness_expires(self):
+        self.client.post(self.url + 'shopping_cart/')
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            self.client.post(self.url + 'favorite/')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_failed_write_does_not_stick(self):
+        response = self.client.post('/api/recipes/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_router_outside_requests(self):
+        self.assertEqual(Recipe.objects.all().db, DEFAULT_DB_ALIAS)
+        with read_from(REPLICA):
+            self.assertEqual(Recipe.objects.all().db, REPLICA)
+            self.assertFalse(Recipe.objects.exists())
+            with transaction.atomic():
+                self.assertEqual(Recipe.objects.all().db, DEFAULT_DB_ALIAS)
+            self.assertEqual(Token.objects.all().db, DEFAULT_DB_ALIAS)
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        recipe._state.db = REPLICA
+        self.assertEqual(
+            router.db_for_write(Recipe, instance=recipe), DEFAULT_DB_ALIAS
+        )
@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from api.cache import response_cache_stats
+from recipes.models import Ingredient, Recipe, RecipeIngredientAmount, Tag
+from users.models import FoodgramUser
+
+
+class AnonymousResponseCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=12, recipes=20, follows_per_user=3,
+            favorites_per_user=3, cart_per_user=3
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, url, expected_cache):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], expected_cache)
+        return response.data
+
+    def test_second_request_is_served_from_cache(self):
+        self.get('/api/recipes/?limit=3&page=2', 'MISS')
+        with self.assertNumQueries(0):
+            self.get('/api/recipes/?page=2&limit=3', 'HIT')
+        self.assertEqual(
+            response_cache_stats(), {'hits': 1, 'misses': 1}
+        )
+
+    def test_query_params_are_part_of_key(self):
+        self.get('/api/recipes/?limit=3', 'MISS')
+        self.get('/api/recipes/?limit=4', 'MISS')
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/recipes/')
+        self.assertNotIn('X-Cache', response)
+
+    def test_writes_invalidate_dependent_responses(self):
+        recipe = Recipe.objects.first()
+        url = f'/api/recipes/{recipe.id}/'
+        self.get(url, 'MISS')
+        recipe.name = 'Новое название'
+        recipe.save()
+        self.assertEqual(self.get(url, 'MISS')['name'], 'Новое название')
+
+        amount = RecipeIngredientAmount.objects.filter(
+            recipe_id=recipe
+        ).first()
+        amount.amount = 12345
+        amount.save()
+        self.assertIn(12345, [
+            item['amount'] for item in self.get(url, 'MISS')['ingredients']
+        ])
+
+        tag = recipe.tags.first()
+        tag.name = 'Перекус'
+        tag.save()
+        self.assertIn('Перекус', [
+            item['name'] for item in self.get(url, 'MISS')['tags']
+        ])
+        self.get('/api/tags/', 'MISS')
+
+        recipe.tags.clear()
+        self.assertEqual(self.get(url, 'MISS')['tags'], [])
+
+    def test_ingredient_write_invalidates_ingredients(self):
+        ingredient = Ingredient.objects.first()
+        url = f'/api/ingredients/{ingredient.id}/'
+        self.get(url, 'MISS')
+        self.get(url, 'HIT')
+        ingredient.measurement_unit = 'шт'
+        ingredient.save()
+        self.assertEqual(self.get(url, 'MISS')['measurement_unit'], 'шт')
+
+    def test_tags_namespace_is_independent(self):
+        self.get('/api/tags/', 'MISS')
+        Recipe.objects.first().save()
+        self.get('/api/tags/', 'HIT')
+        Tag.objects.create(name='Десерт', slug='dessert')
+        self.get('/api/tags/', 'MISS')
+
+    def test_user_saves_invalidate_only_author_changes(self):
+        url = '/api/recipes/'
+        self.get(url, 'MISS')
+        password = 'Secret-password-42'
+        FoodgramUser.objects.create_user(
+            email='new@example.com', username='new', first_name='Новый',
+            last_name='Пользователь', password=password
+        )
+        response = APIClient().post(
+            '/api/auth/token/login/',
+            {'email': 'new@example.com', 'password': password}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.get(url, 'HIT')
+
+        author = Recipe.objects.first().author
+        author.set_password(password)
+        author.save()
+        self.get(url, 'HIT')
+        author.first_name = 'Другое имя'
+        author.save()
+        self.get(url, 'MISS')
@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredientAmount
+from users.models import FoodgramUser
+
+
+class RecipeSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = FoodgramUser.objects.create(
+            email='cook@example.com', username='cook',
+            first_name='Повар', last_name='Поваров'
+        )
+        cabbage = Ingredient.objects.create(
+            name='капуста', measurement_unit='г'
+        )
+        recipes = {}
+        for name, text in (
+            ('борщ', 'варить долго'),
+            ('щи', 'похоже на борщ'),
+            ('омлет', 'взбить яйца'),
+        ):
+            recipes[name] = Recipe.objects.create(
+                author=author, name=name, text=text, cooking_time=10,
+                image='images/recipe.jpg'
+            )
+        RecipeIngredientAmount.objects.create(
+            recipe_id=recipes['щи'], ingredient_id=cabbage, amount=300
+        )
+        cls.recipes = recipes
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = APIClient().get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_name_match_ranks_before_text_match(self):
+        self.assertEqual(self.search('борщ'), ['борщ', 'щи'])
+
+    def test_matches_ingredient_names(self):
+        self.assertEqual(self.search('капуста'), ['щи'])
+
+    def test_ingredient_changes_are_searchable(self):
+        RecipeIngredientAmount.objects.create(
+            recipe_id=self.recipes['омлет'],
+            ingredient_id=Ingredient.objects.get(name='капуста'),
+            amount=50
+        )
+        self.assertEqual(set(self.search('капуста')), {'щи', 'омлет'})
+
+    def test_empty_search_returns_everything(self):
+        self.assertEqual(len(self.search(' ')), 3)
@@ -0,0 +1,143 @@
+import json
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredientAmount,
+    ShoppingListItem
+)
+from recipes.services import shopping_lists_drift
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingCartDownloadTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=12, recipes=40, follows_per_user=3,
+            favorites_per_user=3, cart_per_user=8
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, query=''):
+        response = self.client.get(URL + query)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf8')
+
+    def expected_totals(self):
+        return {
+            (row['ingredient_id__name'],
+             row['ingredient_id__measurement_unit']): row['total']
+            for row in RecipeIngredientAmount.objects.filter(
+                recipe_id__shopping_cart__user_id=self.user
+            ).values(
+                'ingredient_id__name', 'ingredient_id__measurement_unit'
+            ).annotate(total=Sum('amount'))
+        }
+
+    def test_json_totals_match_cart(self):
+        rows = json.loads(self.download('?format=json'))
+        self.assertEqual(
+            {(row['name'], row['measurement_unit']): row['amount']
+             for row in rows},
+            self.expected_totals()
+        )
+
+    def test_csv_is_default_format(self):
+        content = self.download()
+        self.assertTrue(content.startswith('\ufeff'))
+        self.assertEqual(
+            len(content.strip().splitlines()), len(self.expected_totals())
+        )
+
+    def test_recipe_breakdown_lists_every_cart_recipe(self):
+        rows = json.loads(self.download('?format=json&group=recipe'))
+        self.assertEqual(len({row['recipe'] for row in rows}), 8)
+
+    def test_text_grouped_by_unit(self):
+        content = self.download('?format=txt&group=unit')
+        units = {unit for _, unit in self.expected_totals()}
+        headers = [line for line in content.splitlines()
+                   if line.endswith(':')]
+        self.assertEqual(set(headers), {f'{unit}:' for unit in units})
+
+    def test_unknown_group_is_rejected(self):
+        response = self.client.get(URL + '?group=shop')
+        self.assertEqual(response.status_code, 400)
+
+
+class ShoppingListMaintenanceTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=12, recipes=40, follows_per_user=3,
+            favorites_per_user=3, cart_per_user=8
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_no_drift(self):
+        self.assertEqual(shopping_lists_drift(), {})
+
+    def test_seeded_lists_match_carts(self):
+        self.assert_no_drift()
+
+    def test_cart_add_and_remove(self):
+        recipe = Recipe.objects.exclude(shopping_cart__user_id=self.user)[0]
+        url = f'/api/recipes/{recipe.id}/shopping_cart/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assert_no_drift()
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assert_no_drift()
+
+    def test_recipe_edit_updates_every_cart(self):
+        recipe = Recipe.objects.filter(shopping_cart__isnull=False)[0]
+        self.client.force_authenticate(recipe.author)
+        ingredients = list(RecipeIngredientAmount.objects.filter(
+            recipe_id=recipe
+        ).values_list('ingredient_id', 'amount'))
+        ingredients = [
+            {'id': ingredient_id, 'amount': amount * 2}
+            for ingredient_id, amount in ingredients[1:]
+        ] + [{'id': Ingredient.objects.last().id, 'amount': 7}]
+        response = self.client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {
+                'ingredients': ingredients,
+                'tags': list(recipe.tags.values_list('id', flat=True)),
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_no_drift()
+
+    def test_recipe_delete_updates_every_cart(self):
+        Recipe.objects.filter(shopping_cart__isnull=False)[0].delete()
+        self.assert_no_drift()
+
+    def test_check_command_reports_drift(self):
+        ShoppingListItem.objects.filter(user_id=self.user).delete()
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_shopping_lists', '--check', stdout=StringIO()
+            )
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        self.assert_no_drift()
@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredientAmount,
+    SimilarRecipe
+)
+from recipes.similarity import (
+    SimilarityModel,
+    build_similar_recipes,
+    stale_recipes,
+    top
+)
+
+URL = '/api/recipes/{}/similar/'
+
+
+@override_settings(SIMILAR_RECIPES_COUNT=5)
+class SimilarRecipesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(
+            users=10, recipes=30, ingredients_per_recipe=4,
+            follows_per_user=1, favorites_per_user=4, cart_per_user=1
+        )
+        cls.first, cls.second, cls.third = Recipe.objects.order_by('id')[:3]
+        cls.copy_ingredients(cls.first, cls.second)
+
+    @staticmethod
+    def copy_ingredients(source, target):
+        RecipeIngredientAmount.objects.filter(recipe_id=target).delete()
+        RecipeIngredientAmount.objects.bulk_create([
+            RecipeIngredientAmount(
+                recipe_id=target, ingredient_id_id=ingredient_id, amount=1
+            )
+            for ingredient_id in source.ingredients.values_list(
+                'id', flat=True
+            )
+        ])
+        target.save()
+
+    def neighbours(self, recipe):
+        return list(SimilarRecipe.objects.filter(
+            recipe_id=recipe
+        ).order_by('-score', '-similar_id_id').values_list(
+            'similar_id', flat=True
+        ))
+
+    def test_same_ingredients_are_most_similar(self):
+        build_similar_recipes(full=True, favorites_weight=0)
+        client = APIClient()
+        with self.assertNumQueries(1):
+            response = client.get(URL.format(self.first.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.data), 5)
+        self.assertEqual(response.data[0]['id'], self.second.pk)
+        self.assertAlmostEqual(response.data[0]['score'], 1)
+        scores = [item['score'] for item in response.data]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_missing_recipe(self):
+        SimilarRecipe.objects.all().delete()
+        client = APIClient()
+        self.assertEqual(client.get(URL.format(self.first.pk)).data, [])
+        self.assertEqual(client.get(URL.format(0)).status_code, 404)
+
+    def test_co_favorites(self):
+        Favorite.objects.all().delete()
+        users = Recipe.objects.values_list('author', flat=True)[:2]
+        for user_id in users:
+            for recipe in (self.first, self.third):
+                Favorite.objects.create(user_id_id=user_id, recipe_id=recipe)
+        build_similar_recipes(full=True, favorites_weight=1)
+        self.assertEqual(self.neighbours(self.first), [self.third.pk])
+
+    def test_incremental_refresh(self):
+        build_similar_recipes(full=True, favorites_weight=0)
+        self.assertFalse(stale_recipes().exists())
+        self.copy_ingredients(self.first, self.third)
+        self.assertEqual(list(stale_recipes()), [self.third])
+
+        stats = build_similar_recipes(favorites_weight=0)
+        self.assertEqual(stats['computed'], 1)
+        self.assertGreater(stats['merged'], 0)
+        model = SimilarityModel(favorites_weight=0)
+        self.assertEqual(
+            self.neighbours(self.third),
+            [other for _, other in top(model.scores(self.third.pk), 5)]
+        )
+        self.assertIn(self.third.pk, self.neighbours(self.first)[:2])
+        self.assertIn(self.third.pk, self.neighbours(self.second)[:2])
+        self.assertEqual(build_similar_recipes()['computed'], 0)
+
+    def test_incremental_refresh_after_favorites(self):
+        Favorite.objects.all().delete()
+        build_similar_recipes(full=True, favorites_weight=1)
+        self.assertEqual(self.neighbours(self.first), [])
+        users = Recipe.objects.values_list('author', flat=True)[:2]
+        for user_id in users:
+            for recipe in (self.first, self.third):
+                Favorite.objects.create(user_id_id=user_id, recipe_id=recipe)
+        self.assertCountEqual(stale_recipes(), [self.first, self.third])
+
+        stats = build_similar_recipes(favorites_weight=1)
+        self.assertEqual(stats['computed'], 2)
+        self.assertEqual(self.neighbours(self.first), [self.third.pk])
+        self.assertEqual(self.neighbours(self.third), [self.first.pk])
+
+        Favorite.objects.filter(recipe_id=self.third).delete()
+        self.assertEqual(list(stale_recipes()), [self.third])
+        build_similar_recipes(favorites_weight=1)
+        self.assertEqual(self.neighbours(self.first), [])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('build_similar_recipes', '--full', stdout=out)
+        self.assertIn('Пересчитано рецептов: 30', out.getvalue())
+        self.assertFalse(stale_recipes().exists())
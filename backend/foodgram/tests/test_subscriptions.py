@@ -0,0 +1,66 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from recipes.models import Recipe
+from users.models import Follow, FoodgramUser
+
+
+class SubscriptionsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=15, recipes=90, follows_per_user=5,
+            favorites_per_user=3, cart_per_user=3
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_recipes_count_follows_create_and_delete(self):
+        author = Follow.objects.filter(user=self.user).first().following
+        before = author.recipes_count
+        recipe = Recipe.objects.create(
+            author=author, name='Новый', text='Текст', cooking_time=1,
+            image='images/new.jpg'
+        )
+        author.refresh_from_db()
+        self.assertEqual(author.recipes_count, before + 1)
+        recipe.delete()
+        author.refresh_from_db()
+        self.assertEqual(author.recipes_count, before)
+
+    def test_full_save_keeps_counters(self):
+        author = Follow.objects.filter(user=self.user).first().following
+        stale = FoodgramUser.objects.get(pk=author.pk)
+        Recipe.objects.create(
+            author=author, name='Новый', text='Текст', cooking_time=1,
+            image='images/new.jpg'
+        )
+        Follow.objects.filter(following=author).delete()
+        stale.first_name = 'Новое имя'
+        stale.save()
+        author.refresh_from_db()
+        self.assertEqual(author.first_name, 'Новое имя')
+        self.assertEqual(author.recipes_count, author.author.count())
+        self.assertEqual(author.followers_count, 0)
+
+    def test_recipes_limit_keeps_latest_recipes_per_author(self):
+        response = self.client.get(
+            '/api/users/subscriptions/?recipes_limit=2&limit=50'
+        )
+        self.assertEqual(response.status_code, 200)
+        for author in response.data['results']:
+            expected = list(Recipe.objects.filter(
+                author=author['id']
+            ).values_list('id', flat=True)[:2])
+            self.assertEqual(
+                [recipe['id'] for recipe in author['recipes']], expected
+            )
+            self.assertEqual(
+                author['recipes_count'],
+                Recipe.objects.filter(author=author['id']).count()
+            )
+            self.assertTrue(author['is_subscribed'])
@@ -0,0 +1,125 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import shared_key, token_cache
+from users.models import Follow, FoodgramUser
+
+ME = '/api/users/me/'
+PASSWORD = 'Secret-password-42'
+
+
+class CachedTokenAuthenticationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = FoodgramUser.objects.create_user(
+            email='cook@example.com', username='cook', first_name='Повар',
+            last_name='Поваров', password=PASSWORD
+        )
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/token/login/',
+            {'email': self.user.email, 'password': PASSWORD}
+        )
+        self.key = response.data['auth_token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.key}')
+
+    def queries(self, method='get', url=ME, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+        return response, [
+            query['sql'] for query in queries.captured_queries
+            if 'authtoken_token' in query['sql']
+        ]
+
+    def test_token_lookup_is_cached(self):
+        response, first = self.queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(first), 1)
+        response, second = self.queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], self.user.email)
+        self.assertEqual(second, [])
+
+    def test_logout(self):
+        self.client.get(ME)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(ME).status_code, 401)
+
+    def test_password_change(self):
+        self.client.get(ME)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/users/set_password/', {
+                'current_password': PASSWORD,
+                'new_password': 'Another-password-42',
+            })
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(token_cache.get(self.key))
+        _, queries = self.queries()
+        self.assertEqual(len(queries), 1)
+
+    def test_cached_user_save_keeps_counters(self):
+        self.client.get(ME)
+        follower = FoodgramUser.objects.create_user(
+            email='fan@example.com', username='fan', first_name='Фанат',
+            last_name='Фанатов', password=PASSWORD
+        )
+        Follow.objects.create(user=follower, following=self.user)
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': PASSWORD,
+            'new_password': 'Another-password-42',
+        })
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.followers_count, 1)
+        self.assertTrue(self.user.check_password('Another-password-42'))
+
+    def test_deactivation(self):
+        self.client.get(ME)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(ME).status_code, 401)
+
+    def test_login_keeps_cache(self):
+        self.client.get(ME)
+        self.client.post(
+            '/api/auth/token/login/',
+            {'email': self.user.email, 'password': PASSWORD}
+        )
+        self.assertIsNotNone(token_cache.get(self.key))
+
+    @override_settings(TOKEN_CACHE_SIZE=2)
+    def test_size_is_bounded(self):
+        for key in ('a', 'b', 'c'):
+            token_cache.set(key, self.user)
+        self.assertIsNone(token_cache.get('a'))
+        self.assertEqual(token_cache.get('c'), self.user)
+
+    @override_settings(TOKEN_CACHE_LOCAL_TTL=0)
+    def test_local_ttl(self):
+        self.client.get(ME)
+        _, queries = self.queries()
+        self.assertEqual(len(queries), 1)
+
+    @override_settings(TOKEN_CACHE_SHARED_TTL=60)
+    def test_shared_tier(self):
+        self.client.get(ME)
+        token_cache.clear()
+        _, queries = self.queries()
+        self.assertEqual(queries, [])
+        self.assertIsNotNone(cache.get(shared_key(self.key)))
+        self.assertNotIn(self.key, shared_key(self.key))
+        Token.objects.filter(key=self.key).delete()
+        token_cache.clear()
+        self.assertEqual(self.client.get(ME).status_code, 401)
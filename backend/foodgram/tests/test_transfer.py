@@ -0,0 +1,174 @@
+import json
+import os
+import shutil
+import base64
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from api.benchmark import seed_dataset
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Recipe, RecipeIngredientAmount
+from recipes.transfer import RecipeImporter, export_recipes
+from users.models import FoodgramUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def snapshot():
+    return sorted(
+        (recipe['author']['email'], recipe['name'],
+         tuple(tag['slug'] for tag in recipe['tags']),
+         tuple(sorted(
+             (item['name'], item['amount'])
+             for item in recipe['ingredients']
+         )))
+        for recipe in export_recipes()
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeTransferTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(
+            users=5, recipes=30, follows_per_user=0,
+            favorites_per_user=0, cart_per_user=0
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def export_lines(self, *args):
+        out = StringIO()
+        call_command('export_recipes', *args, stdout=out, stderr=StringIO())
+        return out.getvalue().splitlines()
+
+    def test_round_trip(self):
+        expected = snapshot()
+        lines = self.export_lines('--batch-size', '7')
+        self.assertEqual(len(lines), 30)
+        Recipe.objects.all().delete()
+        FoodgramUser.objects.filter(username__startswith='bench').delete()
+
+        stats = RecipeImporter(batch_size=8).run(lines)
+        self.assertEqual(
+            stats, {'imported': 30, 'skipped': 0, 'errors': 0}
+        )
+        self.assertEqual(snapshot(), expected)
+        for author in FoodgramUser.objects.all():
+            self.assertEqual(author.recipes_count, author.author.count())
+
+    def test_reimport_is_idempotent(self):
+        lines = self.export_lines()
+        stats = RecipeImporter().run(lines + ['', 'не json', '{}'])
+        self.assertEqual(stats, {'imported': 0, 'skipped': 30, 'errors': 2})
+        self.assertEqual(Recipe.objects.count(), 30)
+
+    def test_queries_do_not_grow_with_batch(self):
+        lines = self.export_lines()
+        Recipe.objects.all().delete()
+        counts = []
+        for chunk in (lines[:10], lines[10:30]):
+            with CaptureQueriesContext(connection) as queries:
+                RecipeImporter(batch_size=100).run(chunk)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(RecipeIngredientAmount.objects.filter(
+            recipe_id__in=Recipe.objects.all()
+        ).count(), 30 * 8)
+
+    def test_embedded_images_are_decoded_in_threads(self):
+        recipe = Recipe.objects.first()
+        name = default_storage.save('images/photo.png', ContentFile(b'png'))
+        Recipe.objects.filter(pk=recipe.pk).update(image=name)
+        Recipe.objects.exclude(pk=recipe.pk).delete()
+
+        path = os.path.join(MEDIA_ROOT, 'recipes.jsonl')
+        call_command(
+            'export_recipes', '--embed-images', '--output', path,
+            stderr=StringIO()
+        )
+        with open(path, encoding='utf8') as file:
+            self.assertTrue(
+                json.loads(file.readline())['image'].startswith(
+                    'data:image/png;base64,'
+                )
+            )
+        Recipe.objects.all().delete()
+        default_storage.delete(name)
+
+        out = StringIO()
+        call_command('import_recipes', path, '--workers', '2', stdout=out)
+        self.assertIn('Загружено: 1', out.getvalue())
+        imported = Recipe.objects.get()
+        self.assertNotEqual(imported.image.name, name)
+        with imported.image.open('rb') as image:
+            self.assertEqual(image.read(), b'png')
+
+    def test_invalid_image_is_reported(self):
+        lines = self.export_lines()
+        Recipe.objects.all().delete()
+        broken = json.loads(lines[0])
+        broken['image'] = 'data:image/png;base64,не base64'
+        stats = RecipeImporter().run([json.dumps(broken), *lines[1:]])
+        self.assertEqual(stats, {'imported': 29, 'skipped': 0, 'errors': 1})
+        self.assertFalse(Recipe.objects.filter(name=broken['name']).exists())
+
+    def test_new_ingredients_invalidate_index(self):
+        recipe = json.loads(self.export_lines()[0])
+        recipe['name'] = 'Новый рецепт'
+        recipe['ingredients'].append(
+            {'name': 'новый ингредиент', 'measurement_unit': 'г', 'amount': 1}
+        )
+        self.assertEqual(ingredient_index.search('новый ингредиент'), [])
+        RecipeImporter().run([json.dumps(recipe, ensure_ascii=False)])
+        self.assertEqual(
+            len(ingredient_index.search('новый ингредиент')), 1
+        )
+
+    def test_invalid_values_are_reported(self):
+        lines = self.export_lines()
+        Recipe.objects.all().delete()
+        broken = []
+        for field, value in (
+            ('amount', 'abc'), ('amount', -1), ('amount', 0),
+            ('cooking_time', 0), ('cooking_time', 'долго'),
+        ):
+            recipe = json.loads(lines[len(broken)])
+            if field == 'amount':
+                recipe['ingredients'][0]['amount'] = value
+            else:
+                recipe['cooking_time'] = value
+            broken.append(json.dumps(recipe))
+        stats = RecipeImporter(batch_size=100).run(
+            broken + lines[len(broken):]
+        )
+        self.assertEqual(stats, {'imported': 25, 'skipped': 0, 'errors': 5})
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_imported_images_get_variants(self):
+        buffer = BytesIO()
+        Image.new('RGB', (800, 500), 'orange').save(buffer, 'PNG')
+        recipe = json.loads(self.export_lines()[0])
+        Recipe.objects.all().delete()
+        recipe['image'] = 'data:image/png;base64,' + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeImporter().run([json.dumps(recipe)])
+        imported = Recipe.objects.get()
+        self.assertEqual(
+            imported.image_variants['source'], imported.image.name
+        )
+        self.assertIn('webp', imported.image_variants)
@@ -0,0 +1,163 @@
+import base64
+import json
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.benchmark import seed_dataset
+from api.parsers import StreamingJSONParser
+from recipes.models import Ingredient, Recipe, Tag
+
+MEDIA_ROOT = tempfile.mkdtemp()
+URL = '/api/recipes/'
+
+
+def png_bytes(width=64, height=48):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'teal').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def data_uri(content):
+    return 'data:image/png;base64,' + base64.b64encode(content).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=2, recipes=2, follows_per_user=0,
+            favorites_per_user=0, cart_per_user=0
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def payload(self, image):
+        return {
+            'name': 'Оладьи',
+            'text': 'Цитата: "data:image/png;base64,AAAA" — это не картинка.',
+            'cooking_time': 15,
+            'image': image,
+            'tags': [Tag.objects.first().id],
+            'ingredients': [
+                {'id': Ingredient.objects.first().id, 'amount': 50}
+            ],
+        }
+
+    def post_json(self, body):
+        return self.client.post(
+            URL, body, content_type='application/json'
+        )
+
+    def assert_saved(self, response, content):
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        with recipe.image.open('rb') as image:
+            self.assertEqual(image.read(), content)
+        return recipe
+
+    def test_json_base64_upload(self):
+        content = png_bytes()
+        recipe = self.assert_saved(
+            self.post_json(json.dumps(self.payload(data_uri(content)))),
+            content
+        )
+        self.assertTrue(recipe.image.name.endswith('.png'))
+        self.assertIn('"data:image', recipe.text)
+
+    def test_small_chunks_and_escaped_slashes(self):
+        content = png_bytes(300, 200)
+        body = json.dumps(self.payload(data_uri(content)))
+        with mock.patch('api.parsers.CHUNK_SIZE', 7):
+            response = self.post_json(body.replace('/', '\\/'))
+        self.assert_saved(response, content)
+
+    def test_multipart_upload(self):
+        content = png_bytes()
+        data = self.payload(SimpleUploadedFile(
+            'photo.png', content, content_type='image/png'
+        ))
+        data['ingredients'] = json.dumps(data['ingredients'])
+        response = self.client.post(URL, data, format='multipart')
+        self.assert_saved(response, content)
+
+    def test_urlencoded_form(self):
+        content = png_bytes()
+        data = self.payload(data_uri(content))
+        data['ingredients'] = json.dumps(data['ingredients'])
+        response = self.client.post(
+            URL, urlencode(data, doseq=True),
+            content_type='application/x-www-form-urlencoded'
+        )
+        self.assert_saved(response, content)
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=1024)
+    def test_byte_limit(self):
+        response = self.post_json(json.dumps(
+            self.payload(data_uri(png_bytes(600, 600)))
+        ))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+        self.assertFalse(Recipe.objects.filter(name='Оладьи').exists())
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=1000)
+    def test_pixel_limit_is_checked_from_header(self):
+        content = png_bytes(100, 100)
+        with mock.patch(
+            'api.fields.Base64ImageWriter.close'
+        ) as close:
+            response = self.post_json(json.dumps(
+                self.payload(data_uri(content))
+            ))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('100x100', str(response.data['image']))
+        close.assert_not_called()
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=1000)
+    def test_pixel_limit_for_multipart(self):
+        data = self.payload(SimpleUploadedFile(
+            'photo.png', png_bytes(100, 100), content_type='image/png'
+        ))
+        data['ingredients'] = json.dumps(data['ingredients'])
+        response = self.client.post(URL, data, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+
+    def test_invalid_images(self):
+        for image in (
+            'data:image/png;base64,не base64',
+            data_uri(b'not an image at all'),
+            'plain text',
+        ):
+            with self.subTest(image=image):
+                response = self.post_json(json.dumps(self.payload(image)))
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('image', response.data)
+
+    def test_parser_keeps_other_values(self):
+        body = json.dumps({
+            'list': ['"data:image/png;base64,AAAA', 'data:x', {'n': 1}],
+            'image': data_uri(png_bytes()),
+        }).encode()
+        with mock.patch('api.parsers.CHUNK_SIZE', 5):
+            data = StreamingJSONParser().parse(BytesIO(body))
+        self.assertEqual(
+            data['list'], ['"data:image/png;base64,AAAA', 'data:x', {'n': 1}]
+        )
+        self.assertEqual(data['image'].read(), png_bytes())
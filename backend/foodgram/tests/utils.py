@@ -0,0 +1,11 @@
+class PaginationMixin:
+    """Обход всех страниц списка по ссылкам next."""
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_recipes_count(apps, schema_editor):
+    FoodgramUser = apps.get_model('users', 'FoodgramUser')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    counts = Recipe.objects.filter(author=OuterRef('pk')).order_by().values(
+        'author'
+    ).annotate(total=Count('id')).values('total')
+    FoodgramUser.objects.update(
+        recipes_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_auto_20220831_1034'),
+        ('recipes', '0006_auto_20220831_1034'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.RunPython(fill_recipes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_followers_count(apps, schema_editor):
+    FoodgramUser = apps.get_model('users', 'FoodgramUser')
+    Follow = apps.get_model('users', 'Follow')
+    counts = Follow.objects.filter(following=OuterRef('pk')).order_by().values(
+        'following'
+    ).annotate(total=Count('id')).values('total')
+    FoodgramUser.objects.update(
+        followers_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_follow_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.RunPython(fill_followers_count, migrations.RunPython.noop),
+    ]
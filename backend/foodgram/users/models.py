@@ -2,6 +2,9 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
 
+# Счётчики меняются только через UPDATE с F() в сигналах.
+COUNTER_FIELDS = ('recipes_count', 'followers_count')
+
 
 class FoodgramUser(AbstractUser):
     email = models.EmailField(max_length=254, unique=True)
@@ -18,6 +21,16 @@ class FoodgramUser(AbstractUser):
     )
     first_name = models.CharField(max_length=150)
     last_name = models.CharField(max_length=150)
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -30,17 +43,30 @@ class FoodgramUser(AbstractUser):
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        # Полное сохранение (админка, djoser, пользователь из кеша
+        # токенов) записало бы прочитанные раньше значения счётчиков
+        # поверх актуальных, поэтому они пишутся только явно.
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
         FoodgramUser,
         on_delete=models.CASCADE,
-        related_name='follower'
+        related_name='follower',
+        db_index=False
     )
     following = models.ForeignKey(
         FoodgramUser,
         on_delete=models.CASCADE,
-        related_name='following'
+        related_name='following',
+        db_index=False
     )
 
     class Meta:
@@ -52,6 +78,13 @@ class Follow(models.Model):
                 name='unique_follow'
             ),
         )
+        # Подписчики автора: обратный порядок к unique_follow.
+        indexes = (
+            models.Index(
+                fields=['following', 'user'],
+                name='follow_following_user_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.user_id} подписан на {self.author_id}'
@@ -0,0 +1,20 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Follow, FoodgramUser
+
+
+def change_followers_count(author_id, delta):
+    FoodgramUser.objects.filter(pk=author_id).update(
+        followers_count=F('followers_count') + delta
+    )
+
+
+def refresh_followers_count(authors=None):
+    """Пересчитывает число подписчиков одним UPDATE."""
+    counts = Follow.objects.filter(following=OuterRef('pk')).order_by().values(
+        'following'
+    ).annotate(total=Count('id')).values('total')
+    if authors is None:
+        authors = FoodgramUser.objects.all()
+    authors.update(followers_count=Coalesce(Subquery(counts), 0))